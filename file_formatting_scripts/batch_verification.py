@@ -0,0 +1,275 @@
+"""
+Batch verification runner.
+
+Runs the existing document checks for every entry of a manifest on a
+process pool and merges the per-check results into one run summary.
+
+Manifest (JSON list, {"entries": [...]}, or CSV with a header row), one
+entry per document set:
+    id                optional, defaults to "<index>_<locale>"
+    locale            e.g. "de"
+    pdf               PDF file       -> image_counts, md_pdf_content
+    pptx              PowerPoint deck -> ppt_markdown
+    md_folder         Markdown folder produced from the PDF/PPTX
+    source_md_folder  source-language Markdown folder -> codeblocks
+    page_offset       optional PAGE_OFFSET for image_counts, or "auto" to detect it
+
+Checks that touch the same document run together in one task, so each
+worker parses a PDF once (through the shared page model) and reuses it
+for every check on that document.
+
+Usage:
+    python file_formatting_scripts/batch_verification.py manifest.json --output-dir reports
+"""
+
+import argparse
+import contextlib
+import csv
+import importlib
+import io
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Any, Dict, List
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+for _sub in ("", "comparison_scripts", "format_verification_scripts"):
+    _path = os.path.join(BASE_DIR, _sub)
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+from common.instrumentation import stage, tracing_enabled, write_trace  # noqa: E402
+
+ALL_CHECKS = ("image_counts", "md_pdf_content", "ppt_markdown", "codeblocks")
+
+# Checks grouped by the document they open; one task per (entry, group)
+CHECK_GROUPS = {
+    "pdf": ("image_counts", "md_pdf_content"),
+    "pptx": ("ppt_markdown",),
+    "md": ("codeblocks",),
+}
+
+# Parsed PDF models kept alive per worker process
+WORKER_MAX_MODELS = 4
+
+_worker_models: List[str] = []
+
+
+def load_manifest(manifest_path: str) -> List[Dict[str, Any]]:
+    """Read manifest entries from JSON or CSV and assign stable ids."""
+    if manifest_path.lower().endswith(".csv"):
+        with open(manifest_path, newline="", encoding="utf-8") as f:
+            entries = [{k: v for k, v in row.items() if v not in (None, "")} for row in csv.DictReader(f)]
+    else:
+        with open(manifest_path, encoding="utf-8") as f:
+            data = json.load(f)
+        entries = data.get("entries", []) if isinstance(data, dict) else data
+
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    for idx, entry in enumerate(entries, start=1):
+        entry.setdefault("id", f"{idx:04d}_{entry.get('locale', 'entry')}")
+        # Relative paths are resolved against the manifest location
+        for key in ("pdf", "pptx", "md_folder", "source_md_folder"):
+            if entry.get(key) and not os.path.isabs(entry[key]):
+                entry[key] = os.path.join(base, entry[key])
+    return entries
+
+
+def _shared_model(pdf_path: str):
+    """Return the worker's page model for pdf_path, keeping at most WORKER_MAX_MODELS alive."""
+    from common.pdf_page_model import clear_pdf_model_cache, load_pdf_model
+
+    model = load_pdf_model(pdf_path)
+    key = os.path.realpath(pdf_path)
+    if key in _worker_models:
+        _worker_models.remove(key)
+    _worker_models.append(key)
+    while len(_worker_models) > WORKER_MAX_MODELS:
+        clear_pdf_model_cache(_worker_models.pop(0))
+    return model
+
+
+# --- individual checks: each gets its checker module and returns (status, metrics, report_path) ---
+
+def _check_image_counts(iv, entry, out_dir):
+    report = os.path.join(out_dir, "image_verification_report.html")
+    summary = iv.verify_document(entry["pdf"], entry["md_folder"], report, entry.get("page_offset", 0),
+                                 model=_shared_model(entry["pdf"]), verbose=False)
+    metrics = {key: summary[key] for key in ("pdf_total", "md_total", "pages_compared", "mismatched_pages",
+                                             "images_not_found", "missing_image_files", "md_prefix_collisions",
+                                             "page_offset", "method")}
+    return summary["status"], metrics, report
+
+
+def _check_md_pdf_content(mpv, entry, out_dir):
+    model = _shared_model(entry["pdf"])
+    md_content = mpv.extract_md_content(entry["md_folder"])
+    pdf_content = mpv.extract_pdf_content(entry["pdf"], model=model)
+    report = os.path.join(out_dir, "md_pdf_comparison_report.html")
+    results = mpv.compare_md_and_pdf(md_content, pdf_content, report)
+    unmatched = sum(1 for r in results if r["confidence"] == "unmatched")
+    low = sum(1 for r in results if r["confidence"] == "low")
+    metrics = {"md_files": len(results), "unmatched": unmatched, "low_confidence": low}
+    return ("issues" if unmatched or low else "ok"), metrics, report
+
+
+def _check_ppt_markdown(pmv, entry, out_dir):
+    report = os.path.join(out_dir, "ppt_markdown_report.html")
+    all_match = pmv.verify_ppt_to_markdown_conversion(entry["pptx"], entry["md_folder"], html_filename=report)
+    return ("ok" if all_match else "issues"), {"all_slides_match": bool(all_match)}, report
+
+
+def _check_codeblocks(cbv, entry, out_dir):
+    report = os.path.join(out_dir, "codeblocks_comparison_report.txt")
+    differing = cbv.generate_comparison_report(entry["source_md_folder"], entry["md_folder"], report)
+    metrics = {"differing_files": len(differing)}
+    return ("issues" if differing else "ok"), metrics, report
+
+
+# check -> (function, checker module, required manifest fields)
+CHECK_FUNCTIONS = {
+    "image_counts": (_check_image_counts, "image_verification", ("pdf", "md_folder")),
+    "md_pdf_content": (_check_md_pdf_content, "markdown_pdf_verification", ("pdf", "md_folder")),
+    "ppt_markdown": (_check_ppt_markdown, "ppt_markdown_verification", ("pptx", "md_folder")),
+    "codeblocks": (_check_codeblocks, "codeblocks_verification", ("source_md_folder", "md_folder")),
+}
+
+
+def run_entry_group(entry: Dict[str, Any], checks: List[str], output_dir: str, verbose: bool = False) -> List[Dict[str, Any]]:
+    """Worker task: run the given checks for one manifest entry, reusing the open document."""
+    out_dir = os.path.join(output_dir, entry["id"])
+    os.makedirs(out_dir, exist_ok=True)
+    results = []
+    for check in checks:
+        func, module_name, required = CHECK_FUNCTIONS[check]
+        result = {"entry": entry["id"], "locale": entry.get("locale"), "check": check,
+                  "status": "skipped", "metrics": {}, "report": None, "seconds": 0.0, "pid": os.getpid()}
+        missing = [k for k in required if not entry.get(k) or not os.path.exists(entry[k])]
+        if missing:
+            result["error"] = f"missing input(s): {', '.join(missing)}"
+            results.append(result)
+            continue
+        start = time.perf_counter()
+        log = io.StringIO()
+        try:
+            # Checker modules are imported lazily in the worker
+            module = importlib.import_module(module_name)
+            # The checkers print progress; keep worker output out of the console unless asked
+            with contextlib.redirect_stdout(sys.stdout if verbose else log), stage(f"batch_verification.{check}", entry=entry["id"]):
+                status, metrics, report = func(module, entry, out_dir)
+            result.update(status=status, metrics=metrics, report=report)
+        except Exception as e:
+            result.update(status="error", error=f"{type(e).__name__}: {e}",
+                          traceback=traceback.format_exc(limit=5))
+        result["seconds"] = round(time.perf_counter() - start, 3)
+        results.append(result)
+    if tracing_enabled():
+        # Pool workers exit without running atexit handlers, so flush this process's trace now
+        write_trace(quiet=True)
+    return results
+
+
+def build_tasks(entries: List[Dict[str, Any]], checks: List[str]):
+    """One task per (entry, document group), largest PDFs first so long tasks start early."""
+    tasks = []
+    for entry in entries:
+        for group, group_checks in CHECK_GROUPS.items():
+            selected = [c for c in group_checks if c in checks]
+            if selected:
+                tasks.append((entry, selected))
+
+    def _size(task):
+        entry, _ = task
+        path = entry.get("pdf") or entry.get("pptx") or ""
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+    tasks.sort(key=_size, reverse=True)
+    return tasks
+
+
+def merge_results(results: List[Dict[str, Any]], entries: List[Dict[str, Any]], started: str, workers: int) -> Dict[str, Any]:
+    """Merge per-check results into one summary, ordered like the manifest."""
+    summary = {
+        "started": started,
+        "finished": datetime.now().isoformat(timespec="seconds"),
+        "workers": workers,
+        "totals": {"ok": 0, "issues": 0, "error": 0, "skipped": 0},
+        "entries": {},
+    }
+    for entry in entries:
+        summary["entries"][entry["id"]] = {"locale": entry.get("locale"), "checks": {}}
+    for r in sorted(results, key=lambda r: (r["entry"], ALL_CHECKS.index(r["check"]))):
+        summary["entries"][r["entry"]]["checks"][r["check"]] = r
+        summary["totals"][r["status"]] += 1
+    return summary
+
+
+def run_batch(manifest_path: str, output_dir: str, workers: int = None, checks: List[str] = None,
+              verbose: bool = False) -> Dict[str, Any]:
+    """
+    Run every selected check for every manifest entry on a process pool.
+    Args:
+        manifest_path (str): JSON or CSV manifest.
+        output_dir (str): Folder for per-entry reports and run_summary.json.
+        workers (int): Pool size (defaults to the CPU count).
+        checks (list): Subset of ALL_CHECKS to run (defaults to all).
+        verbose (bool): Let checker output through to the console.
+    Returns:
+        dict: The merged run summary.
+    """
+    entries = load_manifest(manifest_path)
+    checks = list(checks or ALL_CHECKS)
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(output_dir, exist_ok=True)
+    started = datetime.now().isoformat(timespec="seconds")
+    tasks = build_tasks(entries, checks)
+    print(f"Running {len(tasks)} task(s) for {len(entries)} manifest entries on {workers} worker(s)...")
+
+    results: List[Dict[str, Any]] = []
+    if workers == 1:
+        for entry, group_checks in tasks:
+            results.extend(run_entry_group(entry, group_checks, output_dir, verbose))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(run_entry_group, entry, group_checks, output_dir, verbose): entry["id"]
+                       for entry, group_checks in tasks}
+            for done, future in enumerate(as_completed(futures), start=1):
+                group_results = future.result()
+                results.extend(group_results)
+                for r in group_results:
+                    print(f"  [{done}/{len(futures)}] {r['entry']} {r['check']}: {r['status']} ({r['seconds']}s)")
+
+    summary = merge_results(results, entries, started, workers)
+    summary_path = os.path.join(output_dir, "run_summary.json")
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False, default=str)
+
+    totals = summary["totals"]
+    print(f"\nOK: {totals['ok']} | Issues: {totals['issues']} | Errors: {totals['error']} | Skipped: {totals['skipped']}")
+    for entry_id, data in summary["entries"].items():
+        for check, r in data["checks"].items():
+            if r["status"] in ("issues", "error"):
+                print(f"  {entry_id} [{check}] {r['status']}: {r.get('error') or r['metrics']}")
+    print(f"Run summary written to {summary_path}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run document checks for every entry of a manifest in parallel.")
+    parser.add_argument("manifest", help="JSON or CSV manifest of (pdf, pptx, md_folder, locale) entries")
+    parser.add_argument("--output-dir", default="batch_reports", help="folder for reports and run_summary.json")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    parser.add_argument("--checks", nargs="+", choices=ALL_CHECKS, default=None, help="subset of checks to run")
+    parser.add_argument("--verbose", action="store_true", help="show checker output")
+    args = parser.parse_args()
+    run_batch(args.manifest, args.output_dir, args.workers, args.checks, args.verbose)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,446 @@
+"""
+Scaling benchmark suite for the verification scripts.
+
+Generates synthetic corpora of several sizes (see synthetic_corpus.py),
+times each benchmarked function across those sizes and records its peak
+Python allocation (tracemalloc), then writes a JSON baseline. A previous
+baseline can be passed with --compare to print per-benchmark ratios and
+flag regressions.
+
+The on-disk extraction cache is disabled for the run so every timing is a
+cold extraction.
+
+Usage:
+    python file_formatting_scripts/benchmarks/run_benchmarks.py --sizes 10 50 100 --output baseline.json
+    python file_formatting_scripts/benchmarks/run_benchmarks.py --compare baseline.json --output current.json
+"""
+
+import argparse
+import contextlib
+import copy
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+os.environ["QA_EXTRACTION_CACHE"] = "0"
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.dirname(BENCH_DIR)
+for _sub in ("", "comparison_scripts", "format_verification_scripts"):
+    sys.path.insert(0, os.path.join(BASE_DIR, _sub))
+sys.path.insert(0, BENCH_DIR)
+
+from synthetic_corpus import DEFAULT_SEED, generate_corpus  # noqa: E402
+
+DEFAULT_SIZES = [10, 50, 100]
+DEFAULT_REPEATS = 3
+# Ratio of current/baseline median time above which --compare reports a regression
+REGRESSION_RATIO = 1.25
+# Timings below this (seconds) are too noisy to flag as regressions
+MIN_COMPARE_SECONDS = 0.005
+# Markdown files matched per find_best_pdf_match run (each match scans every PDF page)
+MATCH_SAMPLE = 10
+
+BENCHMARKS: Dict[str, Callable] = {}
+
+
+def benchmark(name: str):
+    """
+    Register a setup function: setup(corpus) -> (run, before) where before may be None,
+    or (run, before, extra) where extra() returns more metrics to record (e.g. result quality).
+    """
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def _md_texts(md_folder: str) -> Dict[str, str]:
+    texts = {}
+    for name in sorted(os.listdir(md_folder)):
+        if not name.endswith(".md"):
+            continue
+        with open(os.path.join(md_folder, name), encoding="utf-8") as f:
+            texts[name] = f.read()
+    return texts
+
+
+# --- PDF ---
+
+@benchmark("image_verification.count_pdf_images")
+def _bench_count_pdf_images(corpus):
+    import image_verification
+    from common.pdf_page_model import clear_pdf_model_cache
+    return (lambda: image_verification.count_pdf_images(corpus["pdf"])), clear_pdf_model_cache
+
+
+@benchmark("image_verification.count_pdf_images.parallel")
+def _bench_count_pdf_images_parallel(corpus):
+    import image_verification
+    from common.pdf_page_model import clear_pdf_model_cache
+    # One worker per CPU; corpora shorter than IMAGE_COUNT_PAGES_PER_TASK still run in-process
+    return (lambda: image_verification.count_pdf_images(corpus["pdf"], workers=0)), clear_pdf_model_cache
+
+
+@benchmark("image_verification.count_images_pypdf2.forms")
+def _bench_count_images_pypdf2_forms(corpus):
+    import image_verification
+    import PyPDF2
+    reader = PyPDF2.PdfReader(corpus["forms_pdf"])
+    pages = range(1, len(reader.pages) + 1)
+
+    def run():
+        # One memo for the document, as count_pdf_images uses it
+        memo = {}
+        return [image_verification._count_images_pypdf2_for_page(reader, p, memo) for p in pages]
+    return run, None
+
+
+@benchmark("image_verification.count_images_pypdf2.forms_unmemoized")
+def _bench_count_images_pypdf2_forms_unmemoized(corpus):
+    import image_verification
+    import PyPDF2
+    reader = PyPDF2.PdfReader(corpus["forms_pdf"])
+    pages = range(1, len(reader.pages) + 1)
+    # A fresh memo per page: every page re-walks the logo Form (the previous behaviour)
+    return (lambda: [image_verification._count_images_pypdf2_for_page(reader, p, {}) for p in pages]), None
+
+
+@benchmark("image_verification.find_md_images")
+def _bench_find_md_images(corpus):
+    import image_verification
+    from common.markdown_tokens import clear_markdown_tokens_cache
+    return (lambda: image_verification.find_md_images(corpus["md_folder"])), clear_markdown_tokens_cache
+
+
+@benchmark("image_verification.match_page_images")
+def _bench_match_page_images(corpus):
+    import image_verification
+    from common.image_hashes import clear_hash_cache
+    from common.pdf_page_model import load_pdf_model
+    model = load_pdf_model(corpus["pdf"])
+    md_page_map = image_verification.map_md_files_to_pages(image_verification.find_md_images(corpus["md_folder"]))
+    # Cold hashes every run: all PDF and MD images are decoded and hashed
+    return (lambda: image_verification.match_page_images(corpus["pdf"], corpus["md_folder"], md_page_map,
+                                                         model=model)), clear_hash_cache
+
+
+@benchmark("markdown_pdf_verification.extract_pdf_content")
+def _bench_extract_pdf_content(corpus):
+    import markdown_pdf_verification
+    from common.pdf_page_model import clear_pdf_model_cache
+    return (lambda: markdown_pdf_verification.extract_pdf_content(corpus["pdf"])), clear_pdf_model_cache
+
+
+@benchmark("markdown_pdf_verification.find_best_pdf_match")
+def _bench_find_best_pdf_match(corpus):
+    import markdown_pdf_verification as mpv
+    pdf_content = mpv.extract_pdf_content(corpus["pdf"])
+    md_content = mpv.extract_md_content(corpus["md_folder"])
+    sample = list(md_content.values())[:MATCH_SAMPLE]
+
+    def run():
+        return [mpv.find_best_pdf_match(text, pdf_content) for text in sample]
+    return run, None
+
+
+@benchmark("markdown_pdf_verification.find_best_pdf_matches")
+def _bench_find_best_pdf_matches(corpus):
+    import markdown_pdf_verification as mpv
+    pdf_content = mpv.extract_pdf_content(corpus["pdf"])
+    md_content = mpv.extract_md_content(corpus["md_folder"])
+    # Every Markdown file, not a sample: the corpus mode fits and multiplies once for all of them
+    return (lambda: mpv.find_best_pdf_matches(md_content, pdf_content, lsh=False, prefix_window=False)), None
+
+
+@benchmark("markdown_pdf_verification.find_best_pdf_matches.lsh")
+def _bench_find_best_pdf_matches_lsh(corpus):
+    import markdown_pdf_verification as mpv
+    pdf_content = mpv.extract_pdf_content(corpus["pdf"])
+    md_content = mpv.extract_md_content(corpus["md_folder"])
+    exhaustive = mpv.find_best_pdf_matches(md_content, pdf_content, lsh=False, prefix_window=False)
+
+    def agreement():
+        # Share of files matched to the same page as the exhaustive path
+        matches = mpv.find_best_pdf_matches(md_content, pdf_content, lsh=True, prefix_window=False)
+        same = sum(1 for f, match in matches.items() if match[0] == exhaustive[f][0])
+        return {"agreement": round(same / max(len(matches), 1), 4)}
+    return (lambda: mpv.find_best_pdf_matches(md_content, pdf_content, lsh=True, prefix_window=False)), None, agreement
+
+
+@benchmark("markdown_pdf_verification.find_best_pdf_matches.prefix_window")
+def _bench_find_best_pdf_matches_prefix_window(corpus):
+    import markdown_pdf_verification as mpv
+    pdf_content = mpv.extract_pdf_content(corpus["pdf"])
+    md_content = mpv.extract_md_content(corpus["md_folder"])
+    exhaustive = mpv.find_best_pdf_matches(md_content, pdf_content, lsh=False, prefix_window=False)
+
+    def agreement():
+        # Share of files matched to the same page as the exhaustive path
+        matches = mpv.find_best_pdf_matches(md_content, pdf_content, prefix_window=True)
+        same = sum(1 for f, match in matches.items() if match[0] == exhaustive[f][0])
+        return {"agreement": round(same / max(len(matches), 1), 4)}
+    return (lambda: mpv.find_best_pdf_matches(md_content, pdf_content, prefix_window=True)), None, agreement
+
+
+@benchmark("markdown_pdf_verification.generate_diff_html")
+def _bench_generate_diff_html(corpus):
+    import markdown_pdf_verification as mpv
+    pdf_content = mpv.extract_pdf_content(corpus["pdf"])
+    md_content = mpv.extract_md_content(corpus["md_folder"])
+    pairs = [(text, pdf_content.get(mpv.expected_pdf_page(name), "")) for name, text in md_content.items()]
+    return (lambda: [mpv.generate_diff_html(md_text, pdf_text) for md_text, pdf_text in pairs]), None
+
+
+@benchmark("markdown_pdf_verification.find_pdf_page_assignment")
+def _bench_find_pdf_page_assignment(corpus):
+    import markdown_pdf_verification as mpv
+    pdf_content = mpv.extract_pdf_content(corpus["pdf"])
+    md_content = mpv.extract_md_content(corpus["md_folder"])
+    return (lambda: mpv.find_pdf_page_assignment(md_content, pdf_content)), None
+
+
+@benchmark("pdf_markdown_verification.calculate_similarity")
+def _bench_calculate_similarity(corpus):
+    import pdf_markdown_verification as pmv
+    pdf_text = "\n".join(pmv.extract_pdf_content(corpus["pdf"]).values())
+    md_text = "\n".join(_md_texts(corpus["md_folder"]).values())
+    return (lambda: pmv.calculate_similarity(pdf_text, md_text)), None
+
+
+@benchmark("markdown_links_formatting.extract_all_links")
+def _bench_extract_all_links(corpus):
+    from markdown_links_formatting import PDFLinkExtractor
+    from common.pdf_page_model import clear_pdf_model_cache
+
+    def run():
+        extractor = PDFLinkExtractor(corpus["pdf"])
+        extractor.open_pdf()
+        try:
+            return extractor.extract_all_links()
+        finally:
+            extractor.close_pdf()
+    return run, clear_pdf_model_cache
+
+
+@benchmark("markdown_links_formatting._match_pdf_with_md_links")
+def _bench_match_pdf_with_md_links(corpus):
+    from markdown_links_formatting import PDFLinkExtractor
+    extractor = PDFLinkExtractor(corpus["pdf"])
+    extractor.open_pdf()
+    pdf_links = extractor.extract_all_links()
+    md_files = [os.path.join(corpus["md_folder"], n) for n in sorted(os.listdir(corpus["md_folder"]))
+                if n.endswith(".md")]
+    md_links = extractor._extract_markdown_links(md_files)
+    inputs = {}
+
+    def before():
+        # The matcher annotates the link dicts in place; give every run fresh copies
+        inputs["pdf"] = copy.deepcopy(pdf_links)
+        inputs["md"] = copy.deepcopy(md_links)
+    return (lambda: extractor._match_pdf_with_md_links(inputs["pdf"], inputs["md"])), before
+
+
+# --- PPTX ---
+
+@benchmark("ppt_markdown_verification.extract_slide_content")
+def _bench_ppt_md_extract_slide_content(corpus):
+    from pptx import Presentation
+    import ppt_markdown_verification
+    prs = Presentation(corpus["pptx"])
+
+    def run():
+        return [ppt_markdown_verification.extract_slide_content(slide, i)
+                for i, slide in enumerate(prs.slides, start=1)]
+    return run, None
+
+
+@benchmark("ppt_format_verification.extract_slide_content")
+def _bench_ppt_format_extract_slide_content(corpus):
+    from pptx import Presentation
+    import ppt_format_verification
+    prs = Presentation(corpus["pptx"])
+    return (lambda: [ppt_format_verification.extract_slide_content(slide) for slide in prs.slides]), None
+
+
+@benchmark("ppt_markdown_verification.extract_ppt_content_with_notes_and_formatting")
+def _bench_extract_ppt_content(corpus):
+    import ppt_markdown_verification
+    return (lambda: ppt_markdown_verification.extract_ppt_content_with_notes_and_formatting(corpus["pptx"])), None
+
+
+# --- Markdown ---
+
+@benchmark("markdown_tokens.tokenize_markdown")
+def _bench_tokenize_markdown(corpus):
+    from common.markdown_tokens import tokenize_markdown
+    texts = list(_md_texts(corpus["md_folder"]).values())
+    return (lambda: [tokenize_markdown(text) for text in texts]), None
+
+
+@benchmark("markdown_checks.all_consumers")
+def _bench_markdown_checks(corpus):
+    # Every Markdown consumer over the same folder, as a full run does
+    import codeblocks_verification
+    import image_verification
+    import markdown_format_verification
+    from markdown_links_formatting import PDFLinkExtractor
+    from common.markdown_tokens import clear_markdown_tokens_cache
+    folder = corpus["md_folder"]
+    md_files = [os.path.join(folder, n) for n in sorted(os.listdir(folder)) if n.endswith(".md")]
+    extractor = PDFLinkExtractor(corpus["pdf"])
+
+    def run():
+        image_verification.find_md_images(folder)
+        for path in md_files:
+            codeblocks_verification.extract_text_from_markdown(path)
+            markdown_format_verification.check_md_file(path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            extractor._extract_markdown_links(md_files)
+        extractor._validate_markdown_files(md_files)
+    return run, clear_markdown_tokens_cache
+
+
+@benchmark("markdown_format_verification.find_tables")
+def _bench_find_tables(corpus):
+    import markdown_format_verification
+    text = "\n".join(_md_texts(corpus["md_folder"]).values())
+    return (lambda: markdown_format_verification.find_tables(text)), None
+
+
+@benchmark("markdown_pdf_verification.extract_md_content")
+def _bench_extract_md_content(corpus):
+    import markdown_pdf_verification
+    return (lambda: markdown_pdf_verification.extract_md_content(corpus["md_folder"])), None
+
+
+def measure(run: Callable[[], Any], before: Optional[Callable[[], Any]], repeats: int) -> Dict[str, float]:
+    """
+    Time run() `repeats` times, then once more under tracemalloc for peak memory.
+    Args:
+        run (callable): The benchmarked call.
+        before (callable): Untimed reset executed before every call (or None).
+        repeats (int): Timed repetitions.
+    Returns:
+        dict: min/median seconds and peak allocated KiB.
+    """
+    times = []
+    for _ in range(repeats):
+        if before:
+            before()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+
+    if before:
+        before()
+    tracemalloc.start()
+    try:
+        run()
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "seconds_min": round(min(times), 6),
+        "seconds_median": round(statistics.median(times), 6),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def run_suite(sizes: List[int], repeats: int = DEFAULT_REPEATS, seed: int = DEFAULT_SEED,
+              only: Optional[List[str]] = None, corpus_root: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Generate a corpus per size and run every (selected) benchmark on it.
+    Returns:
+        dict: {"meta": {...}, "benchmarks": {name: {size: metrics}}}
+    """
+    names = [n for n in BENCHMARKS if not only or any(sel in n for sel in only)]
+    results: Dict[str, Dict[str, Any]] = {name: {} for name in names}
+    with contextlib.ExitStack() as stack:
+        root = corpus_root or stack.enter_context(tempfile.TemporaryDirectory(prefix="qa_bench_"))
+        for size in sizes:
+            corpus = generate_corpus(os.path.join(root, f"size_{size}"), size, seed)
+            print(f"\nSize {size}:")
+            for name in names:
+                try:
+                    # The checkers print progress; keep it out of the benchmark output
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        run, before, *extra = BENCHMARKS[name](corpus)
+                        metrics = measure(run, before, repeats)
+                        if extra:
+                            metrics.update(extra[0]())
+                except Exception as e:
+                    metrics = {"error": f"{type(e).__name__}: {e}"}
+                results[name][str(size)] = metrics
+                if "error" in metrics:
+                    print(f"  {name:<70} ERROR {metrics['error']}")
+                else:
+                    extras = "".join(f" {key}={value}" for key, value in metrics.items()
+                                     if key not in ("seconds_min", "seconds_median", "peak_kib"))
+                    print(f"  {name:<70} {metrics['seconds_median'] * 1000:10.2f} ms {metrics['peak_kib']:10.1f} KiB{extras}")
+    return {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sizes": sizes,
+            "repeats": repeats,
+            "seed": seed,
+        },
+        "benchmarks": results,
+    }
+
+
+def compare_baselines(baseline: Dict[str, Any], current: Dict[str, Any],
+                      ratio_limit: float = REGRESSION_RATIO) -> List[Tuple[str, str, float]]:
+    """Print current/baseline median-time ratios and return the regressions."""
+    regressions = []
+    print("\nComparison with baseline (current / baseline median time):")
+    for name, sizes in current["benchmarks"].items():
+        for size, metrics in sizes.items():
+            old = baseline.get("benchmarks", {}).get(name, {}).get(size)
+            if not old or "error" in old or "error" in metrics or not old["seconds_median"]:
+                continue
+            ratio = metrics["seconds_median"] / old["seconds_median"]
+            slow_enough = max(metrics["seconds_median"], old["seconds_median"]) >= MIN_COMPARE_SECONDS
+            flag = "  REGRESSION" if ratio > ratio_limit and slow_enough else ""
+            print(f"  {name:<70} n={size:<5} x{ratio:6.2f}{flag}")
+            if flag:
+                regressions.append((name, size, ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the verification scripts across input sizes.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="corpus sizes (pages)")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--only", nargs="+", default=None, help="run benchmarks whose name contains any of these")
+    parser.add_argument("--corpus-dir", default=None, help="keep generated corpora here (default: temp dir)")
+    parser.add_argument("--output", default="benchmark_baseline.json", help="JSON baseline to write")
+    parser.add_argument("--compare", default=None, help="previous baseline JSON to compare against")
+    args = parser.parse_args()
+
+    report = run_suite(args.sizes, args.repeats, args.seed, args.only, args.corpus_dir)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nBaseline written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_baselines(baseline, report)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+Reproducible synthetic inputs for the benchmark suite.
+
+Every generator is driven by a seeded random.Random, so the same
+(size, seed) always produces byte-identical content. The corpus mimics the
+real inputs the checkers see:
+    - a PDF with N pages, each with text paragraphs, images and links
+    - a Markdown folder with one "<page>_<topic>.md" file per page, carrying
+      the same text, image references, links and a table, plus the
+      referenced figures (the same images as in the PDF)
+    - a PPTX deck with N slides, each with a title, bullets, a table,
+      a picture and speaker notes
+    - a Form-heavy PDF with N pages that all draw the same nested logo
+      Form XObject
+
+Usage:
+    python file_formatting_scripts/benchmarks/synthetic_corpus.py --pages 50 --out corpus_50
+"""
+
+import argparse
+import io
+import os
+import random
+import struct
+import zlib
+from typing import Dict, List, Optional
+
+try:
+    import fitz  # PyMuPDF
+    PYMUPDF_AVAILABLE = True
+except Exception:
+    PYMUPDF_AVAILABLE = False
+
+try:
+    from pptx import Presentation
+    from pptx.util import Inches, Pt
+    PPTX_AVAILABLE = True
+except Exception:
+    PPTX_AVAILABLE = False
+
+DEFAULT_SEED = 1234
+
+WORDS = (
+    "document verification pipeline page image link table slide content format check "
+    "report system process data value result output input source target file folder "
+    "section title paragraph heading bullet note text layout render export version "
+    "update release module configure install network server client request response "
+    "security account user access policy storage backup restore monitor alert metric"
+).split()
+
+DOMAINS = ("example.com", "docs.example.org", "support.example.net", "learn.example.io")
+
+
+def _sentence(rng: random.Random, min_words: int = 6, max_words: int = 16) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))]
+    return " ".join(words).capitalize() + "."
+
+
+def _paragraph(rng: random.Random, sentences: int = 4) -> str:
+    return " ".join(_sentence(rng) for _ in range(sentences))
+
+
+def _png_bytes(rng: random.Random, size: int = 16) -> bytes:
+    """Small solid-colour PNG, unique per call so images are not de-duplicated."""
+    color = bytes(rng.randrange(256) for _ in range(3))
+    raw = b"".join(b"\x00" + color * size for _ in range(size))
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        body = tag + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b"")
+
+
+def figure_png(seed: int, page: int, index: int, size: int = 32) -> bytes:
+    """
+    Patterned PNG for figure `index` of `page`: an 8x8 grid of random colour blocks,
+    so perceptual hashes of different figures differ. The same (seed, page, index)
+    gives the same bytes, which lets the PDF and the Markdown folder share figures.
+    """
+    rng = random.Random(f"{seed}:{page}:{index}")
+    blocks = [[bytes(rng.randrange(256) for _ in range(3)) for _ in range(8)] for _ in range(8)]
+    cell = size // 8
+    rows = [b"\x00" + b"".join(blocks[y // cell][x // cell] for x in range(size)) for y in range(size)]
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        body = tag + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(b"".join(rows))) + chunk(b"IEND", b"")
+
+
+def build_page_specs(pages: int, seed: int = DEFAULT_SEED) -> List[Dict]:
+    """
+    Describe the content of every page once, so the PDF and the Markdown
+    folder generated from it agree (as real converted output would).
+    """
+    rng = random.Random(seed)
+    specs = []
+    for page in range(1, pages + 1):
+        links = []
+        for _ in range(rng.randint(1, 3)):
+            domain = rng.choice(DOMAINS)
+            path = "/".join(rng.choice(WORDS) for _ in range(2))
+            links.append({"text": f"{rng.choice(WORDS)} {rng.choice(WORDS)}", "url": f"https://{domain}/{path}"})
+        specs.append({
+            "page": page,
+            "topic": f"{rng.choice(WORDS)}_{rng.choice(WORDS)}",
+            "title": " ".join(rng.choice(WORDS) for _ in range(3)).title(),
+            "paragraphs": [_paragraph(rng, rng.randint(2, 5)) for _ in range(rng.randint(2, 4))],
+            "images": rng.randint(0, 3),
+            "links": links,
+            "table": [[rng.choice(WORDS) for _ in range(3)] for _ in range(rng.randint(2, 4))],
+        })
+    return specs
+
+
+def generate_pdf(path: str, specs: List[Dict], seed: int = DEFAULT_SEED) -> str:
+    """Write a PDF with one page per spec: title, paragraphs, images and URI links."""
+    if not PYMUPDF_AVAILABLE:
+        raise ImportError("PyMuPDF is required to generate benchmark PDFs (pip install pymupdf)")
+    doc = fitz.open()
+    for spec in specs:
+        page = doc.new_page()
+        y = 60
+        page.insert_text((50, y), spec["title"], fontsize=16)
+        y += 30
+        for para in spec["paragraphs"]:
+            rect = fitz.Rect(50, y, 545, y + 90)
+            page.insert_textbox(rect, para, fontsize=10)
+            y += 95
+        for i in range(spec["images"]):
+            rect = fitz.Rect(50 + i * 120, y, 150 + i * 120, y + 80)
+            page.insert_image(rect, stream=figure_png(seed, spec["page"], i + 1))
+        y += 95
+        for link in spec["links"]:
+            page.insert_text((50, y), link["text"], fontsize=10, color=(0, 0, 1))
+            page.insert_link({"kind": fitz.LINK_URI, "from": fitz.Rect(50, y - 10, 250, y + 2), "uri": link["url"]})
+            y += 16
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def generate_form_pdf(path: str, specs: List[Dict], seed: int = DEFAULT_SEED, logo_images: int = 8) -> str:
+    """
+    Write a Form-heavy PDF: every page draws the same nested logo Form XObject
+    (a Form holding `logo_images` images plus a Form with one more) above its
+    title and its own images, as branded headers in converted documents do.
+    """
+    if not PYMUPDF_AVAILABLE:
+        raise ImportError("PyMuPDF is required to generate benchmark PDFs (pip install pymupdf)")
+    rng = random.Random(seed + 3)
+    badge = fitz.open()
+    badge_page = badge.new_page(width=40, height=40)
+    badge_page.insert_image(fitz.Rect(0, 0, 40, 40), stream=_png_bytes(rng))
+    logo = fitz.open()
+    logo_page = logo.new_page(width=40 * (logo_images + 1), height=40)
+    for i in range(logo_images):
+        logo_page.insert_image(fitz.Rect(i * 40, 0, i * 40 + 36, 36), stream=_png_bytes(rng))
+    logo_page.show_pdf_page(fitz.Rect(logo_images * 40, 0, logo_images * 40 + 40, 40), badge, 0)
+
+    doc = fitz.open()
+    for spec in specs:
+        page = doc.new_page()
+        # The logo is copied once; every page's wrapper Form points at the same nested Forms
+        page.show_pdf_page(fitz.Rect(50, 20, 545, 50), logo, 0)
+        page.insert_text((50, 80), spec["title"], fontsize=16)
+        for i in range(spec["images"]):
+            page.insert_image(fitz.Rect(50 + i * 120, 100, 150 + i * 120, 180), stream=_png_bytes(rng))
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    doc.save(path)
+    for d in (doc, logo, badge):
+        d.close()
+    return path
+
+
+def markdown_for_spec(spec: Dict) -> str:
+    lines = [f"# {spec['title']}", ""]
+    for para in spec["paragraphs"]:
+        lines += [para, ""]
+    for i in range(spec["images"]):
+        lines += [f"![figure {i + 1}](images/page{spec['page']}_img{i + 1}.png)", ""]
+    for link in spec["links"]:
+        lines += [f"See [{link['text']}]({link['url']}).", ""]
+    table = spec["table"]
+    lines.append("| " + " | ".join(f"col{c + 1}" for c in range(len(table[0]))) + " |")
+    lines.append("|" + "---|" * len(table[0]))
+    for row in table:
+        lines.append("| " + " | ".join(row) + " |")
+    lines.append("")
+    return "\n".join(lines)
+
+
+def generate_markdown_folder(folder: str, specs: List[Dict], seed: int = DEFAULT_SEED) -> str:
+    """
+    Write one "<page>_<topic>.md" file per spec (the converter's naming scheme),
+    and the figures they reference under images/ (the same bytes as in the PDF).
+    """
+    os.makedirs(os.path.join(folder, "images"), exist_ok=True)
+    for spec in specs:
+        name = f"{spec['page']}_{spec['topic']}.md"
+        with open(os.path.join(folder, name), "w", encoding="utf-8") as f:
+            f.write(markdown_for_spec(spec))
+        for i in range(spec["images"]):
+            with open(os.path.join(folder, "images", f"page{spec['page']}_img{i + 1}.png"), "wb") as f:
+                f.write(figure_png(seed, spec["page"], i + 1))
+    return folder
+
+
+def generate_pptx(path: str, specs: List[Dict], seed: int = DEFAULT_SEED) -> str:
+    """Write a deck with one slide per spec: title, bullets, table, picture and notes."""
+    if not PPTX_AVAILABLE:
+        raise ImportError("python-pptx is required to generate benchmark decks (pip install python-pptx)")
+    rng = random.Random(seed + 2)
+    prs = Presentation()
+    layout = prs.slide_layouts[1]  # title and content
+    for spec in specs:
+        slide = prs.slides.add_slide(layout)
+        slide.shapes.title.text = spec["title"]
+        body = slide.placeholders[1].text_frame
+        body.text = spec["paragraphs"][0]
+        for para in spec["paragraphs"][1:]:
+            p = body.add_paragraph()
+            p.text = para
+            p.level = 1
+            if p.runs:
+                p.runs[0].font.bold = rng.random() < 0.3
+                p.runs[0].font.size = Pt(14)
+        table = spec["table"]
+        shape = slide.shapes.add_table(len(table), len(table[0]), Inches(0.5), Inches(5), Inches(6), Inches(1.5))
+        for r, row in enumerate(table):
+            for c, value in enumerate(row):
+                shape.table.cell(r, c).text = value
+        if spec["images"]:
+            slide.shapes.add_picture(io.BytesIO(_png_bytes(rng)), Inches(7), Inches(5), Inches(1), Inches(1))
+        slide.notes_slide.notes_text_frame.text = _sentence(rng)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    prs.save(path)
+    return path
+
+
+def generate_corpus(out_dir: str, pages: int, seed: int = DEFAULT_SEED,
+                    kinds: Optional[List[str]] = None) -> Dict[str, str]:
+    """
+    Generate a full corpus of the given size under out_dir.
+    Args:
+        out_dir (str): Target folder (created if missing).
+        pages (int): Number of PDF pages / Markdown files / slides.
+        seed (int): Random seed; the same seed reproduces the same corpus.
+        kinds (list): Subset of "pdf", "md", "pptx", "forms" to generate (default all).
+    Returns:
+        dict: Paths keyed by kind ("pdf", "md_folder", "pptx", "forms_pdf").
+    """
+    kinds = kinds or ["pdf", "md", "pptx", "forms"]
+    specs = build_page_specs(pages, seed)
+    paths: Dict[str, str] = {}
+    os.makedirs(out_dir, exist_ok=True)
+    if "pdf" in kinds:
+        paths["pdf"] = generate_pdf(os.path.join(out_dir, "document.pdf"), specs, seed)
+    if "md" in kinds:
+        paths["md_folder"] = generate_markdown_folder(os.path.join(out_dir, "markdown"), specs, seed)
+    if "pptx" in kinds:
+        paths["pptx"] = generate_pptx(os.path.join(out_dir, "deck.pptx"), specs, seed)
+    if "forms" in kinds:
+        paths["forms_pdf"] = generate_form_pdf(os.path.join(out_dir, "forms.pdf"), specs, seed)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a reproducible synthetic PDF/Markdown/PPTX corpus.")
+    parser.add_argument("--pages", type=int, default=20, help="pages / Markdown files / slides")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--out", default="synthetic_corpus", help="output folder")
+    parser.add_argument("--kinds", nargs="+", choices=["pdf", "md", "pptx", "forms"], default=None)
+    args = parser.parse_args()
+    paths = generate_corpus(args.out, args.pages, args.seed, args.kinds)
+    for kind, path in paths.items():
+        print(f"{kind}: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+"""
+Shared helpers used by the comparison and format verification scripts.
+"""
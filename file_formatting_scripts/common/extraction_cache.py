@@ -0,0 +1,237 @@
+"""
+Persistent, content-addressed cache for extracted document content.
+
+Entries are keyed by the SHA-256 of the input file plus the extractor name
+and version, so an edited file (or a bumped extractor version) always misses
+while untouched inputs are served from disk. Values are pickled; the cache
+directory is trimmed to a byte cap by evicting least-recently-used entries
+(a hit refreshes the entry's mtime).
+
+Environment overrides:
+    QA_EXTRACTION_CACHE          set to "0" to disable caching
+    QA_EXTRACTION_CACHE_DIR      cache directory (default ~/.cache/qa_extraction)
+    QA_EXTRACTION_CACHE_MAX_MB   byte cap in MB (default 1024)
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+from typing import Any, Callable, Dict, Optional, Tuple
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "qa_extraction")
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+_HASH_CHUNK = 1024 * 1024
+_MISSING = object()
+
+# In-process memo: realpath -> (size, mtime_ns, sha256)
+_DIGEST_MEMO: Dict[str, Tuple[int, int, str]] = {}
+
+
+def file_digest(path: str) -> str:
+    """Return the SHA-256 hex digest of a file, memoized by size and mtime."""
+    key = os.path.realpath(path)
+    st = os.stat(key)
+    memo = _DIGEST_MEMO.get(key)
+    if memo and memo[0] == st.st_size and memo[1] == st.st_mtime_ns:
+        return memo[2]
+    h = hashlib.sha256()
+    with open(key, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    _DIGEST_MEMO[key] = (st.st_size, st.st_mtime_ns, digest)
+    return digest
+
+
+class ExtractionCache:
+    """Size-capped LRU cache of pickled extraction results on disk."""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.cache_dir = cache_dir or os.environ.get("QA_EXTRACTION_CACHE_DIR") or DEFAULT_CACHE_DIR
+        if max_bytes is None:
+            env_mb = os.environ.get("QA_EXTRACTION_CACHE_MAX_MB")
+            max_bytes = int(float(env_mb) * 1024 * 1024) if env_mb else DEFAULT_MAX_BYTES
+        self.max_bytes = max_bytes
+        self.entries_dir = os.path.join(self.cache_dir, "entries")
+        self.stat_dir = os.path.join(self.cache_dir, "stat")
+        self.hits = 0
+        self.misses = 0
+        # Running size estimate so puts only walk the directory when near the cap
+        self._approx_bytes: Optional[int] = None
+
+    # --- keys ---
+    def _digest(self, path: str) -> str:
+        """
+        Content digest of path. A small stat index (size + mtime -> digest)
+        lets unchanged files skip re-hashing across runs.
+        """
+        real = os.path.realpath(path)
+        st = os.stat(real)
+        memo = _DIGEST_MEMO.get(real)
+        if memo and memo[0] == st.st_size and memo[1] == st.st_mtime_ns:
+            return memo[2]
+        stat_file = os.path.join(self.stat_dir, hashlib.sha1(real.encode("utf-8")).hexdigest())
+        try:
+            with open(stat_file, "r", encoding="utf-8") as f:
+                size, mtime_ns, digest = f.read().split()
+            if int(size) == st.st_size and int(mtime_ns) == st.st_mtime_ns:
+                _DIGEST_MEMO[real] = (st.st_size, st.st_mtime_ns, digest)
+                return digest
+        except Exception:
+            pass
+        digest = file_digest(real)
+        try:
+            os.makedirs(self.stat_dir, exist_ok=True)
+            self._atomic_write(stat_file, f"{st.st_size} {st.st_mtime_ns} {digest}".encode("utf-8"))
+        except OSError:
+            pass
+        return digest
+
+    def make_key(self, path: str, extractor: str, version: str) -> str:
+        """Cache key for (file content, extractor, extractor version)."""
+        raw = f"{self._digest(path)}:{extractor}:{version}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.entries_dir, key[:2], key + ".pkl")
+
+    # --- storage ---
+    def _atomic_write(self, path: str, data: bytes):
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except Exception:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    def get(self, key: str, default: Any = None) -> Any:
+        path = self._entry_path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except Exception:
+            self.misses += 1
+            return default
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: Any):
+        path = self._entry_path(key)
+        try:
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return  # unpicklable results are simply not cached
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._atomic_write(path, data)
+        except OSError:
+            return
+        if self._approx_bytes is None:
+            self._approx_bytes = self._scan()[1]
+        else:
+            self._approx_bytes += len(data)
+        if self._approx_bytes > self.max_bytes:
+            self.evict()
+
+    def _scan(self):
+        """Return ([(mtime_ns, size, path), ...], total_bytes) for all entries."""
+        entries = []
+        total = 0
+        for root, _dirs, files in os.walk(self.entries_dir):
+            for name in files:
+                if not name.endswith(".pkl"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime_ns, st.st_size, path))
+                total += st.st_size
+        return entries, total
+
+    def evict(self):
+        """Delete least-recently-used entries until the cache fits max_bytes."""
+        entries, total = self._scan()
+        self._approx_bytes = total
+        if total <= self.max_bytes:
+            return
+        # Trim a little below the cap so the next few puts don't rescan
+        target = int(self.max_bytes * 0.9)
+        entries.sort()
+        for _mtime, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._approx_bytes = total
+
+    def clear(self):
+        for root, _dirs, files in os.walk(self.cache_dir):
+            for name in files:
+                try:
+                    os.remove(os.path.join(root, name))
+                except OSError:
+                    pass
+        self._approx_bytes = 0
+
+    # --- convenience ---
+    def cached_extract(self, path: str, extractor: str, version: str, func: Callable[[], Any]) -> Any:
+        """
+        Return func()'s result for path, computing it only on a cache miss.
+        Args:
+            path (str): Input file whose content identifies the entry.
+            extractor (str): Name of the extraction routine.
+            version (str): Extractor version; bump it when the output format changes.
+            func (callable): Zero-argument function performing the extraction.
+        """
+        try:
+            key = self.make_key(path, extractor, version)
+        except OSError:
+            return func()
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = func()
+            self.put(key, value)
+        return value
+
+
+_DEFAULT_CACHE: Optional[ExtractionCache] = None
+
+
+def cache_enabled() -> bool:
+    return os.environ.get("QA_EXTRACTION_CACHE", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def get_default_cache() -> ExtractionCache:
+    global _DEFAULT_CACHE
+    if _DEFAULT_CACHE is None:
+        _DEFAULT_CACHE = ExtractionCache()
+    return _DEFAULT_CACHE
+
+
+def set_default_cache(cache: Optional[ExtractionCache]):
+    """Replace the process-wide cache (e.g. with a custom directory or cap)."""
+    global _DEFAULT_CACHE
+    _DEFAULT_CACHE = cache
+
+
+def cached_extract(path: str, extractor: str, version: str, func: Callable[[], Any]) -> Any:
+    """Module-level shortcut using the default cache; bypasses it when disabled."""
+    if not cache_enabled():
+        return func()
+    return get_default_cache().cached_extract(path, extractor, version, func)
@@ -0,0 +1,174 @@
+"""
+Batched perceptual hashes for image identity checks.
+
+Images are compared by a 64-bit difference hash (dHash): the image is
+reduced to 9x8 grey pixels and every bit records whether a pixel is
+brighter than its left neighbour. Re-encoding, rescaling and mild colour
+changes keep the hash within a few bits, while a different picture lands
+about 32 bits away, so two images are "the same" when the Hamming
+distance of their hashes is small.
+
+Decoding is the only per-image Python work (Pillow releases the GIL while
+decoding and resizing, so it runs on a thread pool; JPEGs are decoded at
+reduced scale). The hash bits of a whole batch are computed in one NumPy
+expression, and distances between all image pairs of two sets are one
+broadcast XOR plus popcount.
+
+Hashes are cached by the SHA-256 of the encoded image bytes, in process
+and in one index entry of the extraction cache (common/extraction_cache.py),
+so unchanged images are never decoded again on later runs.
+"""
+
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+
+from common.extraction_cache import cache_enabled, file_digest, get_default_cache
+from common.lazy_import import lazy_import
+
+np = lazy_import("numpy")
+Image = lazy_import("PIL.Image")
+
+HASH_VERSION = "dhash64-v1"
+# Images decoded and hashed per batch, and decoding threads
+HASH_BATCH_SIZE = 512
+HASH_WORKERS = min(8, os.cpu_count() or 1)
+# Hash grid: HASH_SIZE x HASH_SIZE bits from a (HASH_SIZE + 1) x HASH_SIZE grey thumbnail
+HASH_SIZE = 8
+# JPEGs are decoded at the smallest scale that is still at least this many pixels per side
+_DRAFT_SIDE = HASH_SIZE * 8
+
+ImageLoader = Callable[[], object]  # returns an opened PIL image
+
+# In-process hash index: content digest -> hash (None if the image could not be decoded)
+_HASHES: Dict[str, Optional[int]] = {}
+_LOADED_PERSISTED = False
+
+
+def content_digest(data: bytes) -> str:
+    """SHA-256 hex digest of encoded image bytes (matches file_digest of the same bytes on disk)."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _index_key() -> str:
+    return hashlib.sha256(f"image_hashes:{HASH_VERSION}".encode("utf-8")).hexdigest()
+
+
+def _load_persisted():
+    global _LOADED_PERSISTED
+    if _LOADED_PERSISTED:
+        return
+    _LOADED_PERSISTED = True
+    if not cache_enabled():
+        return
+    stored = get_default_cache().get(_index_key(), {})
+    if isinstance(stored, dict):
+        for digest, value in stored.items():
+            _HASHES.setdefault(digest, value)
+
+
+def _save_persisted():
+    if not cache_enabled():
+        return
+    cache = get_default_cache()
+    # Other processes (e.g. batch workers) may have stored hashes since this one loaded the index
+    stored = cache.get(_index_key(), {})
+    merged = dict(stored) if isinstance(stored, dict) else {}
+    merged.update(_HASHES)
+    cache.put(_index_key(), merged)
+
+
+def clear_hash_cache():
+    """Forget the in-process hashes (the on-disk index is re-read on next use)."""
+    global _LOADED_PERSISTED
+    _HASHES.clear()
+    _LOADED_PERSISTED = False
+
+
+def _thumbnail(loader: ImageLoader):
+    """(HASH_SIZE, HASH_SIZE + 1) uint8 grey thumbnail of the loaded image, or None if it cannot be decoded."""
+    try:
+        image = loader()
+        # JPEG only: let the decoder scale down by up to 8x instead of decoding every pixel
+        image.draft("L", (_DRAFT_SIDE, _DRAFT_SIDE))
+        gray = image.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.BOX, reducing_gap=2.0)
+        return np.asarray(gray, dtype=np.uint8)
+    except Exception:
+        return None
+
+
+def dhash_pixels(thumbnails) -> "np.ndarray":
+    """
+    Difference hashes of a stack of grey thumbnails.
+    Args:
+        thumbnails (ndarray): uint8 array of shape (N, HASH_SIZE, HASH_SIZE + 1).
+    Returns:
+        ndarray: uint64 array of N hashes.
+    """
+    bits = thumbnails[:, :, 1:] > thumbnails[:, :, :-1]
+    packed = np.packbits(bits.reshape(len(thumbnails), HASH_SIZE * HASH_SIZE), axis=1)
+    return packed.view(">u8").ravel().astype(np.uint64)
+
+
+def hash_images(loaders: Dict[str, ImageLoader]) -> Dict[str, Optional[int]]:
+    """
+    Perceptual hashes for images keyed by content digest, decoding only cache misses.
+    Args:
+        loaders (dict): content digest -> zero-argument function opening the image with Pillow.
+    Returns:
+        dict: content digest -> 64-bit hash (None if the image could not be decoded).
+    """
+    _load_persisted()
+    missing = [digest for digest in loaders if digest not in _HASHES]
+    if missing:
+        with ThreadPoolExecutor(max_workers=HASH_WORKERS) as pool:
+            for start in range(0, len(missing), HASH_BATCH_SIZE):
+                batch = missing[start:start + HASH_BATCH_SIZE]
+                thumbnails = list(pool.map(_thumbnail, (loaders[digest] for digest in batch)))
+                decoded = [i for i, thumb in enumerate(thumbnails) if thumb is not None]
+                hashes = dhash_pixels(np.stack([thumbnails[i] for i in decoded])) if decoded else []
+                for digest in batch:
+                    _HASHES[digest] = None
+                for i, value in zip(decoded, hashes):
+                    _HASHES[batch[i]] = int(value)
+        _save_persisted()
+    return {digest: _HASHES[digest] for digest in loaders}
+
+
+def hash_image_files(paths: Iterable[str]) -> Dict[str, Optional[int]]:
+    """
+    Perceptual hashes of image files.
+    Args:
+        paths (iterable): Image file paths.
+    Returns:
+        dict: path -> 64-bit hash (None if the file is missing or not a decodable image).
+    """
+    digests: Dict[str, Optional[str]] = {}
+    loaders: Dict[str, ImageLoader] = {}
+    for path in paths:
+        try:
+            digest = file_digest(path)
+        except OSError:
+            digests[path] = None
+            continue
+        digests[path] = digest
+        loaders.setdefault(digest, lambda p=path: Image.open(p))
+    hashes = hash_images(loaders)
+    return {path: (hashes[digest] if digest is not None else None) for path, digest in digests.items()}
+
+
+def hamming_distances(a: List[int], b: List[int]) -> "np.ndarray":
+    """
+    Bit distances between every pair of hashes.
+    Args:
+        a (list): m hashes.
+        b (list): n hashes.
+    Returns:
+        ndarray: (m, n) uint8 array; entry [i, j] is the distance of a[i] and b[j].
+    """
+    x = np.asarray(a, dtype=np.uint64)[:, None] ^ np.asarray(b, dtype=np.uint64)[None, :]
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(x)
+    bits = np.unpackbits(x.reshape(-1, 1).view(np.uint8), axis=1)
+    return bits.sum(axis=1, dtype=np.uint8).reshape(x.shape)
@@ -0,0 +1,310 @@
+"""
+Persisted, array-backed index of every image placement in a PDF.
+
+Each time an image is drawn on a page it gets one row: the 1-based page,
+the image's xref (0 for inline images), its bounding box in page points,
+its pixel size and the SHA-256 of its encoded stream bytes. The columns are
+NumPy arrays sorted by page, and each distinct digest is stored once, so
+the index of a document with tens of thousands of placements is a few
+hundred KB. Page queries are a binary search and document-wide queries
+(counts per page, pages showing an image, the difference between two builds
+of a PDF) are vectorized.
+
+The index is written next to the PDF as "<name>.pdf.images.npz" and
+records the SHA-256 of the PDF it describes, so a stale file is ignored and
+rebuilt. Where the PDF's folder is not writable, or sidecars are disabled
+with QA_IMAGE_INDEX_SIDECAR=0, the index is stored in the extraction cache
+instead (common/extraction_cache.py, keyed by the same content hash).
+QA_EXTRACTION_CACHE=0 disables both.
+
+Digests of xref images are the same content digests common/image_hashes.py
+uses, so a consumer can look up perceptual hashes without reading the
+image streams again.
+"""
+
+import hashlib
+import os
+import tempfile
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from common.extraction_cache import cache_enabled, file_digest, get_default_cache
+from common.instrumentation import traced
+from common.lazy_import import lazy_import, module_available
+
+np = lazy_import("numpy")
+fitz = lazy_import("fitz")
+PYMUPDF_AVAILABLE = module_available("fitz")
+
+# Bump when the stored columns or how they are extracted change so persisted indexes are rebuilt
+PLACEMENTS_VERSION = "1"
+SIDECAR_SUFFIX = ".images.npz"
+
+_COLUMNS = ("page", "xref", "bbox", "width", "height", "digest_id", "digests")
+
+# In-process memo: realpath -> (size, mtime_ns, index)
+_INDEX_CACHE: Dict[str, Tuple[int, int, "ImagePlacementIndex"]] = {}
+
+
+class ImagePlacement(NamedTuple):
+    page: int
+    xref: int                                    # 0 for inline images
+    bbox: Tuple[float, float, float, float]      # x0, y0, x1, y1 in page points
+    width: int                                   # image pixels
+    height: int
+    digest: str                                  # SHA-256 hex of the encoded image
+
+
+def sidecar_enabled() -> bool:
+    return os.environ.get("QA_IMAGE_INDEX_SIDECAR", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def sidecar_path(pdf_path: str) -> str:
+    """Where the index of pdf_path is written next to it."""
+    return pdf_path + SIDECAR_SUFFIX
+
+
+class ImagePlacementIndex:
+    """Column arrays of one PDF's image placements, sorted by page."""
+
+    def __init__(self, pdf_digest: str, page_count: int, page, xref, bbox, width, height, digest_id, digests):
+        self.pdf_digest = pdf_digest
+        self.page_count = page_count
+        self.page = page              # int32 (n,)
+        self.xref = xref              # int32 (n,)
+        self.bbox = bbox              # float32 (n, 4)
+        self.width = width            # int32 (n,)
+        self.height = height          # int32 (n,)
+        self.digest_id = digest_id    # int32 (n,) row of `digests`
+        self.digests = digests        # uint8 (d, 32) raw SHA-256 of each distinct image
+
+    def __len__(self) -> int:
+        return len(self.page)
+
+    def __repr__(self) -> str:
+        return f"ImagePlacementIndex({len(self)} placements, {len(self.digests)} images, {self.page_count} pages)"
+
+    def _rows(self, rows) -> List[ImagePlacement]:
+        hexes = self.digest_hexes()
+        return [ImagePlacement(int(p), int(x), tuple(float(v) for v in b), int(w), int(h), hexes[d])
+                for p, x, b, w, h, d in zip(self.page[rows], self.xref[rows], self.bbox[rows],
+                                            self.width[rows], self.height[rows], self.digest_id[rows])]
+
+    def digest_hexes(self) -> List[str]:
+        """Hex content digest of each distinct image, by digest_id."""
+        return [row.tobytes().hex() for row in self.digests]
+
+    def placements(self, page: Optional[int] = None) -> List[ImagePlacement]:
+        """Placements on one 1-based page in drawing order, or all of them."""
+        if page is None:
+            return self._rows(slice(None))
+        lo, hi = np.searchsorted(self.page, [page, page + 1])
+        return self._rows(slice(int(lo), int(hi)))
+
+    def page_counts(self) -> Dict[int, int]:
+        """1-based page -> images drawn on it, for every page of the document."""
+        counts = np.bincount(self.page, minlength=self.page_count + 1)
+        return {p: int(c) for p, c in enumerate(counts.tolist()[1:], start=1)}
+
+    def xref_digests(self) -> Dict[int, str]:
+        """xref -> content digest of every image object drawn somewhere (inline images excluded)."""
+        xrefs, first = np.unique(self.xref, return_index=True)
+        hexes = self.digest_hexes()
+        return {int(x): hexes[self.digest_id[i]] for x, i in zip(xrefs, first) if x > 0}
+
+    def digest_pages(self) -> Dict[str, List[int]]:
+        """content digest -> sorted pages the image is drawn on (with repeats per placement)."""
+        order = np.lexsort((self.page, self.digest_id))
+        ids, starts = np.unique(self.digest_id[order], return_index=True)
+        pages = np.split(self.page[order], starts[1:])
+        hexes = self.digest_hexes()
+        return {hexes[i]: p.tolist() for i, p in zip(ids, pages)}
+
+    def pages_of(self, digest: str) -> List[int]:
+        """Sorted pages drawing the image with this content digest (with repeats per placement)."""
+        hit = np.flatnonzero((self.digests == np.frombuffer(bytes.fromhex(digest), dtype=np.uint8)).all(axis=1))
+        if not len(hit):
+            return []
+        return self.page[self.digest_id == hit[0]].tolist()
+
+    # --- persistence ---
+    def arrays(self) -> Dict[str, "np.ndarray"]:
+        columns = {name: getattr(self, name) for name in _COLUMNS}
+        columns["meta"] = np.array([PLACEMENTS_VERSION, self.pdf_digest, str(self.page_count)])
+        return columns
+
+    @classmethod
+    def from_arrays(cls, arrays) -> Optional["ImagePlacementIndex"]:
+        """Rebuild an index from arrays(); None if they were written by another PLACEMENTS_VERSION."""
+        version, pdf_digest, page_count = (str(v) for v in arrays["meta"])
+        if version != PLACEMENTS_VERSION:
+            return None
+        return cls(pdf_digest, int(page_count), *(arrays[name] for name in _COLUMNS))
+
+    def save(self, path: str):
+        """Write the index as a compressed .npz file (atomically)."""
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez_compressed(f, **self.arrays())
+            os.chmod(tmp, 0o644)  # mkstemp creates owner-only files; the sidecar is shared like the PDF
+            os.replace(tmp, path)
+        except Exception:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> Optional["ImagePlacementIndex"]:
+        """Read an index written by save(); None if the file is missing, unreadable or outdated."""
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                return cls.from_arrays({name: data[name] for name in data.files})
+        except Exception:
+            return None
+
+
+def _placement_digest(doc, xref: int, info: Dict, memo: Dict[int, bytes]) -> bytes:
+    """Raw SHA-256 of an image's stream bytes; inline images are keyed by PyMuPDF's pixel digest."""
+    if xref <= 0:
+        return hashlib.sha256(b"inline:" + bytes(info.get("digest") or b"")).digest()
+    if xref not in memo:
+        try:
+            raw = doc.xref_stream_raw(xref) or b""
+        except Exception:
+            raw = b""
+        memo[xref] = hashlib.sha256(raw).digest()
+    return memo[xref]
+
+
+@traced()
+def build_placement_index(pdf_path: str, model=None) -> ImagePlacementIndex:
+    """
+    Extract the placement index of a PDF.
+    Args:
+        pdf_path (str): Path to the PDF file.
+        model (PdfDocumentModel): Optional page model already parsed for this PDF;
+            its image_info is used instead of re-reading the pages.
+    Returns:
+        ImagePlacementIndex: One row per drawn image.
+    """
+    if not PYMUPDF_AVAILABLE:
+        raise ImportError("PyMuPDF is required to index image placements (pip install pymupdf)")
+
+    pages: List[int] = []
+    xrefs: List[int] = []
+    bboxes: List[Tuple[float, ...]] = []
+    sizes: List[Tuple[int, int]] = []
+    digest_ids: List[int] = []
+    distinct: Dict[bytes, int] = {}
+    stream_memo: Dict[int, bytes] = {}
+
+    with fitz.open(pdf_path) as doc:
+        page_count = doc.page_count
+        if model is not None:
+            page_infos = ((page.number, page.image_info) for page in model)
+        else:
+            page_infos = ((number, page.get_image_info(xrefs=True)) for number, page in enumerate(doc, start=1))
+        for number, infos in page_infos:
+            for info in infos:
+                xref = int(info.get("xref") or 0)
+                digest = _placement_digest(doc, xref, info, stream_memo)
+                pages.append(number)
+                xrefs.append(xref)
+                bboxes.append(tuple(info.get("bbox") or (0.0, 0.0, 0.0, 0.0)))
+                sizes.append((int(info.get("width") or 0), int(info.get("height") or 0)))
+                digest_ids.append(distinct.setdefault(digest, len(distinct)))
+
+    sizes_array = np.array(sizes, dtype=np.int32).reshape(-1, 2)
+    return ImagePlacementIndex(
+        pdf_digest=file_digest(pdf_path),
+        page_count=page_count,
+        page=np.array(pages, dtype=np.int32),
+        xref=np.array(xrefs, dtype=np.int32),
+        bbox=np.array(bboxes, dtype=np.float32).reshape(-1, 4),
+        width=np.ascontiguousarray(sizes_array[:, 0]),
+        height=np.ascontiguousarray(sizes_array[:, 1]),
+        digest_id=np.array(digest_ids, dtype=np.int32),
+        digests=np.frombuffer(b"".join(distinct), dtype=np.uint8).reshape(-1, 32),
+    )
+
+
+def _cache_key(pdf_digest: str) -> str:
+    return hashlib.sha256(f"{pdf_digest}:image_placements:{PLACEMENTS_VERSION}".encode("utf-8")).hexdigest()
+
+
+def _load_persisted(pdf_path: str, pdf_digest: str) -> Optional[ImagePlacementIndex]:
+    if sidecar_enabled():
+        index = ImagePlacementIndex.load(sidecar_path(pdf_path))
+        if index is not None and index.pdf_digest == pdf_digest:
+            return index
+    stored = get_default_cache().get(_cache_key(pdf_digest))
+    return ImagePlacementIndex.from_arrays(stored) if isinstance(stored, dict) else None
+
+
+def _persist(pdf_path: str, index: ImagePlacementIndex):
+    if sidecar_enabled():
+        try:
+            index.save(sidecar_path(pdf_path))
+            return
+        except OSError:
+            pass  # read-only folder: keep it in the extraction cache instead
+    get_default_cache().put(_cache_key(index.pdf_digest), index.arrays())
+
+
+def load_placement_index(pdf_path: str, model=None, refresh: bool = False) -> ImagePlacementIndex:
+    """
+    Return the placement index of pdf_path, extracting it only if no current one is persisted.
+    Args:
+        pdf_path (str): Path to the PDF file.
+        model (PdfDocumentModel): Optional page model to build from on a miss.
+        refresh (bool): Rebuild (and re-persist) even if a current index exists.
+    Returns:
+        ImagePlacementIndex: The index.
+    """
+    key = os.path.realpath(pdf_path)
+    st = os.stat(key)
+    cached = _INDEX_CACHE.get(key)
+    if cached and not refresh and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+        return cached[2]
+
+    index = None
+    persist = cache_enabled()
+    if persist and not refresh:
+        index = _load_persisted(pdf_path, file_digest(pdf_path))
+    if index is None:
+        index = build_placement_index(pdf_path, model)
+        if persist:
+            _persist(pdf_path, index)
+    _INDEX_CACHE[key] = (st.st_size, st.st_mtime_ns, index)
+    return index
+
+
+def clear_placement_index_cache(pdf_path: Optional[str] = None):
+    """Drop one in-process index (or all of them); persisted indexes are kept."""
+    if pdf_path is None:
+        _INDEX_CACHE.clear()
+    else:
+        _INDEX_CACHE.pop(os.path.realpath(pdf_path), None)
+
+
+def diff_placement_indexes(old: ImagePlacementIndex, new: ImagePlacementIndex) -> Dict[str, Dict]:
+    """
+    Compare the images of two builds of a document by content, not by xref.
+    Args:
+        old (ImagePlacementIndex): Index of the earlier build.
+        new (ImagePlacementIndex): Index of the later build.
+    Returns:
+        dict: 'added' and 'removed' map content digest -> pages in the build that has
+        the image; 'moved' maps digest -> (old pages, new pages) for images drawn in both
+        builds whose pages differ.
+    """
+    old_pages = old.digest_pages()
+    new_pages = new.digest_pages()
+    return {
+        'added': {d: pages for d, pages in new_pages.items() if d not in old_pages},
+        'removed': {d: pages for d, pages in old_pages.items() if d not in new_pages},
+        'moved': {d: (old_pages[d], pages) for d, pages in new_pages.items()
+                  if d in old_pages and old_pages[d] != pages},
+    }
@@ -0,0 +1,204 @@
+"""
+Opt-in per-stage timing and peak-memory instrumentation.
+
+Scripts mark their stages (extraction, cleaning, matching, diffing, report
+writing) with the @traced decorator or the stage() context manager. When
+tracing is off these are a single flag check. When it is on, every stage
+records wall time and its tracemalloc peak (bytes allocated above the level
+at stage entry, including nested stages), and the run is written out as:
+    <prefix>.<pid>.jsonl        one JSON record per stage
+    <prefix>.<pid>.trace.json   Chrome trace-event format (chrome://tracing, Perfetto)
+
+Enable with the QA_TRACE environment variable (the output prefix, e.g.
+QA_TRACE=traces/run) or by calling enable_tracing(prefix). Set
+QA_TRACE_MEMORY=0 to record wall time only (tracemalloc slows Python code
+down noticeably).
+"""
+
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+_enabled = False
+_track_memory = True
+_prefix: Optional[str] = None
+_events: List[Dict[str, Any]] = []
+_lock = threading.Lock()
+_local = threading.local()
+_atexit_registered = False
+
+
+def tracing_enabled() -> bool:
+    return _enabled
+
+
+def enable_tracing(prefix: str, track_memory: bool = True):
+    """
+    Start recording stages; the trace is written at exit (or by write_trace()).
+    Args:
+        prefix (str): Output path prefix; ".<pid>.jsonl" / ".<pid>.trace.json" are appended.
+        track_memory (bool): Record tracemalloc peaks per stage.
+    """
+    global _enabled, _track_memory, _prefix, _atexit_registered
+    _prefix = prefix
+    _track_memory = track_memory
+    _enabled = True
+    if track_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if not _atexit_registered:
+        atexit.register(write_trace)
+        _atexit_registered = True
+
+
+def disable_tracing():
+    global _enabled
+    _enabled = False
+
+
+def _stack() -> List[Dict[str, Any]]:
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+@contextmanager
+def stage(name: str, **attrs):
+    """Record one stage (no-op unless tracing is enabled)."""
+    if not _enabled:
+        yield
+        return
+    stack = _stack()
+    frame = {"peak_seen": 0, "mem_start": 0}
+    if _track_memory and tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            # Keep the enclosing stage's peak before resetting it for this one
+            stack[-1]["peak_seen"] = max(stack[-1]["peak_seen"], peak)
+        tracemalloc.reset_peak()
+        frame["mem_start"] = current
+    stack.append(frame)
+    start_wall = time.time()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        stack.pop()
+        event = {
+            "name": name,
+            "start": start_wall,
+            "duration_s": round(duration, 6),
+            "depth": len(stack),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+        if _track_memory and tracemalloc.is_tracing():
+            _current, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, frame["peak_seen"])
+            event["peak_kib"] = round(max(peak - frame["mem_start"], 0) / 1024, 1)
+            if stack:
+                stack[-1]["peak_seen"] = max(stack[-1]["peak_seen"], peak)
+        if attrs:
+            event["attrs"] = attrs
+        with _lock:
+            _events.append(event)
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """
+    Decorator recording every call of a function as a stage.
+    The default stage name is "<script>.<qualname>", so it is stable whether
+    the script runs as __main__ or is imported.
+    """
+    def decorate(func):
+        stage_name = name or "{}.{}".format(
+            os.path.splitext(os.path.basename(func.__code__.co_filename))[0], func.__qualname__)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with stage(stage_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def get_events() -> List[Dict[str, Any]]:
+    with _lock:
+        return list(_events)
+
+
+def summarize(events: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Dict[str, float]]:
+    """Aggregate events per stage name: calls, total/max seconds, max peak KiB."""
+    summary: Dict[str, Dict[str, float]] = {}
+    for e in events if events is not None else get_events():
+        s = summary.setdefault(e["name"], {"calls": 0, "total_s": 0.0, "max_s": 0.0, "max_peak_kib": 0.0})
+        s["calls"] += 1
+        s["total_s"] += e["duration_s"]
+        s["max_s"] = max(s["max_s"], e["duration_s"])
+        s["max_peak_kib"] = max(s["max_peak_kib"], e.get("peak_kib", 0.0))
+    return summary
+
+
+def to_chrome_trace(events: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Convert stage events to Chrome trace-event "complete" (ph=X) events."""
+    trace_events = []
+    for e in events:
+        args = dict(e.get("attrs", {}))
+        if "peak_kib" in e:
+            args["peak_kib"] = e["peak_kib"]
+        trace_events.append({
+            "name": e["name"],
+            "cat": e["name"].split(".", 1)[0],
+            "ph": "X",
+            "ts": int(e["start"] * 1_000_000),
+            "dur": int(e["duration_s"] * 1_000_000),
+            "pid": e["pid"],
+            "tid": e["tid"],
+            "args": args,
+        })
+    return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+
+def write_trace(prefix: Optional[str] = None, quiet: bool = False) -> Optional[Dict[str, str]]:
+    """
+    Write every stage recorded so far in this process as JSONL and Chrome trace
+    JSON (rewriting the files, so it is safe to call repeatedly, e.g. from pool
+    workers that never reach atexit) and print a per-stage summary.
+    Returns:
+        dict: {"jsonl": path, "chrome": path}, or None if nothing was recorded.
+    """
+    prefix = prefix or _prefix
+    events = get_events()
+    if not prefix or not events:
+        return None
+    base = f"{prefix}.{os.getpid()}"
+    directory = os.path.dirname(os.path.abspath(base))
+    os.makedirs(directory, exist_ok=True)
+    paths = {"jsonl": base + ".jsonl", "chrome": base + ".trace.json"}
+    with open(paths["jsonl"], "w", encoding="utf-8") as f:
+        for e in events:
+            f.write(json.dumps(e, default=str) + "\n")
+    with open(paths["chrome"], "w", encoding="utf-8") as f:
+        json.dump(to_chrome_trace(events), f, default=str)
+
+    if quiet:
+        return paths
+    print(f"\nStage timings ({len(events)} events) written to {paths['jsonl']} and {paths['chrome']}")
+    rows = sorted(summarize(events).items(), key=lambda kv: kv[1]["total_s"], reverse=True)
+    for stage_name, s in rows[:15]:
+        print(f"  {stage_name:<60} {int(s['calls']):>6}x {s['total_s']:9.3f}s total {s['max_peak_kib']:10.1f} KiB peak")
+    return paths
+
+
+_env_prefix = os.environ.get("QA_TRACE")
+if _env_prefix:
+    enable_tracing(_env_prefix, track_memory=os.environ.get("QA_TRACE_MEMORY", "1") != "0")
@@ -0,0 +1,51 @@
+"""
+Deferred imports for heavy dependencies.
+
+lazy_import("fitz") returns a stand-in module that performs the real import
+on first attribute access, so importing a checker as a library costs nothing
+until the dependency is actually used. module_available() answers "is it
+installed?" without importing it, replacing the try/import/AVAILABLE pattern
+where the import itself is the expensive part.
+"""
+
+import importlib
+import importlib.util
+import types
+
+
+class LazyModule(types.ModuleType):
+    """Module proxy that imports the real module on first attribute access."""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lazy_target"] = None
+
+    def _load(self) -> types.ModuleType:
+        module = self.__dict__["_lazy_target"]
+        if module is None:
+            module = importlib.import_module(self.__name__)
+            self.__dict__["_lazy_target"] = module
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.__dict__["_lazy_target"] is not None else "not loaded"
+        return f"<lazy module {self.__name__!r} ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    """Return a proxy for module `name` that is imported on first use."""
+    return LazyModule(name)
+
+
+def module_available(name: str) -> bool:
+    """True if `name` can be imported, checked without importing it."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
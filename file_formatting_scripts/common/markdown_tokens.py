@@ -0,0 +1,277 @@
+"""
+Single-pass Markdown tokenizer shared by every Markdown-consuming checker.
+
+A Markdown file is read once and scanned once, line by line, into a compact
+token stream: headings, links, images, code (fenced blocks and inline
+spans), tables, HTML id anchors and the trailing parent-topic reference,
+each tagged with its 1-based line number. Image, link, table, code-block and
+anchor checks all consume this stream instead of re-reading the file and
+re-running their own regexes over it.
+
+Inline constructs are matched with one combined pattern, so a span is
+claimed by exactly one construct: an image is not also a link, and the URL
+inside an <a href> is not also a bare URL. The one exception is an image
+inside link text ("[![logo](logo.png)](url)", "<a href=...><img ...></a>"),
+which is reported both as the link and as the image. Content inside fenced code blocks
+is code only (no links, images, headings or tables are reported from it).
+
+Token streams are memoized in-process by (path, size, mtime) and persisted
+through the extraction cache, so later checks and later runs skip both the
+read and the scan for unchanged files.
+"""
+
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from common.extraction_cache import cached_extract
+from common.instrumentation import traced
+
+# Bump when the token layout or the tokenizing rules change so cached streams are invalidated
+MARKDOWN_TOKENS_VERSION = "2"
+
+# Token streams kept in the in-process memo (least recently used are dropped first)
+MEMO_MAX_FILES = 4096
+
+
+class Heading(NamedTuple):
+    line: int
+    level: int
+    text: str
+
+
+class Link(NamedTuple):
+    line: int
+    kind: str  # "standard", "reference", "autolink", "bare_url" or "html"
+    text: str
+    url: str
+
+
+class Image(NamedTuple):
+    line: int
+    kind: str  # "markdown" or "html"
+    src: str
+
+
+class Code(NamedTuple):
+    line: int
+    end_line: int
+    kind: str  # "fence" or "inline"
+    lang: str
+    text: str
+
+
+class Table(NamedTuple):
+    line: int
+    end_line: int
+    text: str
+
+
+class MarkdownTokens(NamedTuple):
+    headings: Tuple[Heading, ...]
+    links: Tuple[Link, ...]
+    images: Tuple[Image, ...]
+    code: Tuple[Code, ...]
+    tables: Tuple[Table, ...]
+    anchors: Tuple[str, ...]            # values of HTML id="..." attributes
+    parent_ref: Optional[str]           # "[text](file.md)" ending the document, if any
+    digest: str                         # MD5 of the whitespace-stripped text (duplicate detection)
+
+
+_FENCE = "```"
+_ID_ATTR = re.compile(r'\bid=["\']([^"\']+)["\']', re.IGNORECASE)
+_PARENT_REF = re.compile(r'\[.+\]\(.+\.md\)\s*$')
+# Images inside the text of a link or <a> element (linked logos and badges)
+_LINKED_IMAGE = re.compile(
+    r'!\[[^\]\n]*\]\((?P<src>[^)\n]+)\)'
+    r'|(?P<tag>(?i:<img\b[^>\n]*?\bsrc\s*=\s*["\'](?P<html>[^"\'\n]+)["\'][^>\n]*>))'
+)
+# One pattern for the whole document. Alternatives are tried in order at each
+# position; the zero-width "table" lookahead comes first so a table line is
+# still recorded when another construct starts at the beginning of the line.
+# No alternative crosses a line break.
+_TOKEN = re.compile(
+    r'^(?:(?P<table>(?![ \t]*```)(?=[^\n]*\|))'
+    r'|[ \t]*```(?P<fence>[^\n]*)'
+    r'|[ \t]*\[(?P<def_id>[^\]\n]+)\]:[ \t]*(?P<def_url>[^\n]+)'
+    r'|(?P<heading>#{1,6})[ \t]+(?=\S))'
+    # Inline constructs; the lookahead rejects most positions on their first character
+    r'|(?=[`!<\[hHiI])(?:`(?P<code>[^`\n]+)`'
+    r'|!\[(?P<img_alt>[^\]\n]*)\]\((?P<img_src>[^)\n]+)\)'
+    r'|(?P<img_tag>(?i:<img\b[^>\n]*?\bsrc\s*=\s*["\'](?P<img_html>[^"\'\n]+)["\'][^>\n]*>))'
+    r'|(?P<a_tag>(?i:<a\s+[^>\n]*href=["\'](?P<a_href>[^"\'\n]+)["\'][^>\n]*>(?P<a_text>[^\n]*?)</a>))'
+    # Link text may hold a whole image ("[![logo](logo.png)](url)"); a "![" in it starts one
+    r'|\[(?P<link_text>(?:!\[[^\]\n]*\]\([^)\n]*\)|!(?!\[)|[^\]\n!])*)\]\((?P<link_url>[^)\n]+)\)'
+    r'|\[(?P<ref_text>[^\]\n]*)\]\[(?P<ref_id>[^\]\n]*)\]'
+    r'|<(?P<autolink>https?://[^>\s]+)>'
+    r'|(?<![\[\(<])(?P<bare>https?://[^\s\)>\]]+)'
+    r'|\b(?i:id)=["\'](?P<id>[^"\'\n]+)["\'])',
+    re.MULTILINE,
+)
+
+
+@traced()
+def tokenize_markdown(content: str) -> MarkdownTokens:
+    """Scan Markdown text once and return its token stream."""
+    digest = hashlib.md5(content.strip().encode('utf-8')).hexdigest()
+    if '\r' in content:
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
+
+    headings: List[Heading] = []
+    links: List[Optional[Link]] = []
+    images: List[Image] = []
+    inline_code: List[Code] = []
+    blocks: List[Code] = []
+    tables: List[Table] = []
+    anchors: List[str] = []
+    ref_definitions: Dict[str, str] = {}
+    pending_refs: List[Tuple[int, int, str, str]] = []  # (slot in links, line, text, ref id)
+
+    table_start = table_end = 0
+    table_lines: List[str] = []
+
+    def close_table():
+        if len(table_lines) >= 2:  # header + separator at least
+            tables.append(Table(table_start, table_end, "\n".join(table_lines)))
+        table_lines.clear()
+
+    def linked_images(text: str, number: int, html_link: bool):
+        # The link claims its whole span, so images inside its text are reported here
+        for image in _LINKED_IMAGE.finditer(text):
+            if image.group('src') is not None:
+                images.append(Image(number, "markdown", image.group('src')))
+            else:
+                images.append(Image(number, "html", image.group('html')))
+                if not html_link:  # ids inside an <a> element were taken with the element
+                    anchors.extend(_ID_ATTR.findall(image.group('tag')))
+
+    def line_text(start: int) -> str:
+        end = content.find('\n', start)
+        return content[start:] if end == -1 else content[start:end]
+
+    line = 1
+    counted = 0      # content[:counted] has been scanned for line breaks
+    skip_to = 0      # matches before this offset are inside a fenced block
+    for m in _TOKEN.finditer(content):
+        pos = m.start()
+        if pos < skip_to:
+            continue
+        line += content.count('\n', counted, pos)
+        counted = pos
+        kind = m.lastgroup  # the alternative that matched (its last closed group)
+
+        if kind == 'table':
+            # Runs of consecutive lines containing a pipe
+            if not table_lines or line != table_end + 1:
+                close_table()
+                table_start = line
+            table_lines.append(line_text(pos))
+            table_end = line
+        elif kind == 'fence':
+            info = m.group('fence').strip()
+            close = info.find(_FENCE)
+            if close != -1:  # ```code``` on one line
+                blocks.append(Code(line, line, "fence", "", info[:close]))
+                continue
+            body_start = m.end() + 1
+            lang = info if re.fullmatch(r'\w+', info) else ""
+            close = content.find(_FENCE, body_start)
+            body_end = close if close != -1 else len(content)
+            body = content[body_start:body_end]
+            if info and not lang:
+                body = info + "\n" + body  # not a language tag: part of the code
+            end_line = line + content.count('\n', pos, body_end)
+            blocks.append(Code(line, end_line, "fence", lang, body))
+            # Skip the body and the closing fence; the rest of the closing line is not scanned
+            line_end = content.find('\n', close) if close != -1 else -1
+            skip_to = len(content) if line_end == -1 else line_end
+        elif kind == 'def_url':
+            ref_definitions[m.group('def_id')] = m.group('def_url').strip()
+        elif kind == 'heading':
+            headings.append(Heading(line, len(m.group('heading')), line_text(m.end()).strip()))
+        elif kind == 'code':
+            inline_code.append(Code(line, line, "inline", "", m.group('code')))
+        elif kind == 'img_src':
+            images.append(Image(line, "markdown", m.group('img_src')))
+        elif kind == 'img_tag':
+            images.append(Image(line, "html", m.group('img_html')))
+            anchors.extend(_ID_ATTR.findall(m.group('img_tag')))
+        elif kind == 'a_tag':
+            links.append(Link(line, "html", m.group('a_text'), m.group('a_href')))
+            anchors.extend(_ID_ATTR.findall(m.group('a_tag')))
+            linked_images(m.group('a_text'), line, True)
+        elif kind == 'link_url':
+            links.append(Link(line, "standard", m.group('link_text'), m.group('link_url')))
+            linked_images(m.group('link_text'), line, False)
+        elif kind == 'ref_id':
+            # Resolved once all definitions are known; keep the slot so links stay in document order
+            pending_refs.append((len(links), line, m.group('ref_text'), m.group('ref_id') or m.group('ref_text')))
+            links.append(None)
+        elif kind == 'autolink':
+            links.append(Link(line, "autolink", m.group('autolink'), m.group('autolink')))
+        elif kind == 'bare':
+            links.append(Link(line, "bare_url", m.group('bare'), m.group('bare')))
+        else:
+            anchors.append(m.group('id'))
+    close_table()
+
+    # Reference links resolve against definitions anywhere in the file; unresolved ones are dropped
+    for slot, number, text, ref_id in pending_refs:
+        if ref_id in ref_definitions:
+            links[slot] = Link(number, "reference", text, ref_definitions[ref_id])
+
+    last_line = content.strip().rsplit('\n', 1)[-1]
+    parent = _PARENT_REF.search(last_line)
+    return MarkdownTokens(
+        headings=tuple(headings),
+        links=tuple(link for link in links if link is not None),
+        images=tuple(images),
+        code=tuple(inline_code + blocks),
+        tables=tuple(tables),
+        anchors=tuple(anchors),
+        parent_ref=parent.group(0) if parent else None,
+        digest=digest,
+    )
+
+
+# In-process memo: absolute path -> (size, mtime_ns, tokens)
+_MEMO: "OrderedDict[str, Tuple[int, int, MarkdownTokens]]" = OrderedDict()
+# Checkers read Markdown files on thread pools; the memo's LRU bookkeeping is not atomic
+_MEMO_LOCK = threading.Lock()
+
+
+def load_markdown_tokens(path: str) -> MarkdownTokens:
+    """
+    Token stream of a Markdown file, read and scanned at most once per content.
+    Raises OSError / UnicodeDecodeError like open() + read() would.
+    """
+    key = os.path.abspath(path)
+    st = os.stat(key)
+    with _MEMO_LOCK:
+        memo = _MEMO.get(key)
+        if memo and memo[0] == st.st_size and memo[1] == st.st_mtime_ns:
+            _MEMO.move_to_end(key)
+            return memo[2]
+
+    def _scan():
+        with open(key, 'r', encoding='utf-8') as f:
+            return tokenize_markdown(f.read())
+
+    tokens = cached_extract(key, "markdown_tokens", MARKDOWN_TOKENS_VERSION, _scan)
+    with _MEMO_LOCK:
+        _MEMO[key] = (st.st_size, st.st_mtime_ns, tokens)
+        if len(_MEMO) > MEMO_MAX_FILES:
+            _MEMO.popitem(last=False)
+    return tokens
+
+
+def clear_markdown_tokens_cache(path: Optional[str] = None):
+    """Drop memoized token streams (all, or one file's)."""
+    with _MEMO_LOCK:
+        if path is None:
+            _MEMO.clear()
+        else:
+            _MEMO.pop(os.path.abspath(path), None)
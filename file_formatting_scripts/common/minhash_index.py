@@ -0,0 +1,210 @@
+"""
+MinHash / LSH index for finding similar texts without comparing every pair.
+
+Each text is reduced to its set of word shingles (SHINGLE_WORDS consecutive
+words). A MinHash signature of NUM_PERM values estimates the Jaccard
+similarity of two shingle sets: the fraction of positions where the
+signatures agree. Locality-sensitive hashing splits the signature into
+bands of rows; two texts become candidates when all rows of at least one
+band agree. The chance of that is 1 - (1 - J^rows)^bands for Jaccard J, an
+S-curve whose midpoint is about (1 / bands)^(1 / rows). lsh_bands() picks
+bands and rows for a target threshold. A lower threshold gives higher
+recall and more candidates to score.
+
+Texts are tokenized once by the caller (tokenize() yields the same tokens
+as the TF-IDF vectorizer's pattern, so one pass can feed both). Everything
+after tokenizing is NumPy over all texts at once: shingles are hashed by
+multiply-add over the concatenated token hashes, all permutations are
+applied in one broadcast multiply-shift per block of shingles, band keys
+are sorted once per band, and queries are resolved with searchsorted.
+"""
+
+import re
+import zlib
+from itertools import chain
+from typing import Dict, List, Optional, Tuple
+
+from common.instrumentation import traced
+from common.lazy_import import lazy_import
+
+np = lazy_import("numpy")
+
+# Signature length, shingle size, and the seed of the hash permutations
+NUM_PERM = 64
+SHINGLE_WORDS = 3
+SEED = 1
+# Shingles hashed per NumPy block (bounds the (shingles x NUM_PERM) array held at once)
+SIGNATURE_CHUNK = 4096
+
+_WORD = re.compile(r"(?u)\b\w+\b")
+# Token hashes are stable across runs and processes (unlike hash())
+_TOKEN_HASHES: Dict[str, int] = {}
+_EMPTY = 0xFFFFFFFF
+_SHINGLE_MIX = 0x9E3779B97F4A7C15
+
+
+def _token_ids(tokens: List[str]) -> List[int]:
+    ids = list(map(_TOKEN_HASHES.get, tokens))
+    if None in ids:
+        for token in set(tokens).difference(_TOKEN_HASHES):
+            _TOKEN_HASHES[token] = zlib.crc32(token.encode("utf-8"))
+        ids = list(map(_TOKEN_HASHES.__getitem__, tokens))
+    return ids
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word tokens of a text (runs of word characters, as the TF-IDF token pattern splits them)."""
+    return _WORD.findall(text.lower())
+
+
+def shingle_hashes(token_lists: List[List[str]]) -> Tuple["np.ndarray", "np.ndarray"]:
+    """
+    32-bit hashes of the SHINGLE_WORDS-word shingles of many token lists, in one pass.
+    A text shorter than SHINGLE_WORDS words is one shingle; a text without words has none.
+    Returns:
+        tuple: (hashes of every text's shingles, concatenated in text order; shingles per text).
+    """
+    width = SHINGLE_WORDS
+    lengths = np.array([len(tokens) for tokens in token_lists], dtype=np.int64)
+    ids = np.array(_token_ids(list(chain.from_iterable(token_lists))), dtype=np.uint64)
+    # Hash every window of the concatenated tokens; windows crossing a text boundary are not used
+    windows = max(len(ids) - width + 1, 0)
+    h = ids[:windows].copy()
+    for j in range(1, width):
+        h *= np.uint64(_SHINGLE_MIX)
+        h += ids[j:windows + j]
+    full = lengths >= width
+    counts = np.where(full, lengths - width + 1, np.minimum(lengths, 1))
+    starts = np.cumsum(lengths) - lengths
+    first = np.cumsum(counts) - counts
+    hashes = np.empty(int(counts.sum()), dtype=np.uint64)
+    within = np.arange(int(counts[full].sum())) - np.repeat(np.cumsum(counts[full]) - counts[full], counts[full])
+    hashes[np.repeat(first[full], counts[full]) + within] = h[np.repeat(starts[full], counts[full]) + within]
+    for i in np.flatnonzero((lengths > 0) & ~full):
+        value = 0
+        for token_id in ids[starts[i]:starts[i] + lengths[i]].tolist():
+            value = (value * _SHINGLE_MIX + token_id) & 0xFFFFFFFFFFFFFFFF
+        hashes[first[i]] = value
+    return (hashes >> np.uint64(32)) ^ (hashes & np.uint64(0xFFFFFFFF)), counts
+
+
+def _permutations(num_perm: int):
+    rng = np.random.default_rng(SEED)
+    a = rng.integers(1, 2 ** 63, num_perm, dtype=np.uint64) | np.uint64(1)  # odd multipliers
+    b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+    return a, b
+
+
+@traced()
+def minhash_signatures(token_lists: List[List[str]], num_perm: Optional[int] = None) -> "np.ndarray":
+    """
+    MinHash signatures of many tokenized texts.
+    Args:
+        token_lists (list): tokenize() result of every text.
+        num_perm (int): Signature length (defaults to NUM_PERM).
+    Returns:
+        ndarray: (len(token_lists), num_perm) uint32; a text without words gets all 0xFFFFFFFF.
+    """
+    num_perm = NUM_PERM if num_perm is None else num_perm
+    a, b = _permutations(num_perm)
+    signatures = np.full((len(token_lists), num_perm), _EMPTY, dtype=np.uint32)
+    hashes, counts = shingle_hashes(token_lists)
+    ends = np.cumsum(counts)
+    start = 0
+    while start < len(token_lists):
+        # Whole texts per block, about SIGNATURE_CHUNK shingles (at least one text)
+        first = int(ends[start] - counts[start])
+        stop = max(int(np.searchsorted(ends, first + SIGNATURE_CHUNK, side="right")), start + 1)
+        rows = start + np.flatnonzero(counts[start:stop])
+        if len(rows):
+            # Multiply-shift hashing: the top 32 bits of a * x + b (mod 2^64), one column per permutation
+            hashed = hashes[first:int(ends[stop - 1]), None] * a[None, :]
+            hashed += b
+            hashed >>= np.uint64(32)
+            hashed = hashed.astype(np.uint32)
+            signatures[rows] = np.minimum.reduceat(hashed, ends[rows] - counts[rows] - first, axis=0)
+        start = stop
+    return signatures
+
+
+def lsh_bands(threshold: float, num_perm: Optional[int] = None) -> Tuple[int, int]:
+    """
+    (bands, rows) with bands * rows <= num_perm whose S-curve midpoint is closest to threshold.
+    Bands have at least two rows: one-row bands make nearly every pair of texts that share a
+    common phrase a candidate.
+    """
+    num_perm = NUM_PERM if num_perm is None else num_perm
+    options = [(num_perm // rows, rows) for rows in range(2, num_perm + 1)]
+    return min(options, key=lambda br: abs((1.0 / br[0]) ** (1.0 / br[1]) - threshold))
+
+
+def _band_keys(signatures, bands: int, rows: int) -> "np.ndarray":
+    """(n, bands) uint64 key of every band of every signature."""
+    rng = np.random.default_rng(SEED + 1)
+    mix = rng.integers(1, 2 ** 63, rows, dtype=np.uint64) | np.uint64(1)
+    cut = signatures[:, :bands * rows].astype(np.uint64).reshape(len(signatures), bands, rows)
+    return (cut * mix).sum(axis=2, dtype=np.uint64)
+
+
+class MinHashLSH:
+    """LSH index over the signatures of a fixed set of texts (e.g. the pages of a PDF)."""
+
+    def __init__(self, signatures, bands: int, rows: int):
+        self.signatures = signatures
+        self.bands = bands
+        self.rows = rows
+        keys = _band_keys(signatures, bands, rows)
+        self._order = np.argsort(keys, axis=0, kind="stable").T       # (bands, n)
+        self._sorted = np.take_along_axis(keys, self._order.T, axis=0).T
+        # Texts without words would all share one key; they are never candidates
+        self._empty = (signatures == _EMPTY).all(axis=1)
+
+    @classmethod
+    def from_tokens(cls, token_lists: List[List[str]], threshold: float,
+                    num_perm: Optional[int] = None) -> "MinHashLSH":
+        """Index tokenized texts with the bands and rows lsh_bands() picks for threshold."""
+        bands, rows = lsh_bands(threshold, num_perm)
+        return cls(minhash_signatures(token_lists, num_perm), bands, rows)
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def query(self, signatures, max_candidates: Optional[int] = None) -> Tuple["np.ndarray", "np.ndarray"]:
+        """
+        Candidate pairs for many query signatures at once.
+        Args:
+            signatures (ndarray): (q, num_perm) query signatures.
+            max_candidates (int): Keep at most this many candidates per query, those with
+                the highest estimated Jaccard similarity (ties: lowest index).
+        Returns:
+            tuple: (query rows, indexed rows) int64 arrays of candidate pairs, grouped by
+            query row and ordered by decreasing estimated similarity.
+        """
+        keys = _band_keys(signatures, self.bands, self.rows)
+        pairs = []
+        for band in range(self.bands):
+            lo = np.searchsorted(self._sorted[band], keys[:, band], side="left")
+            hi = np.searchsorted(self._sorted[band], keys[:, band], side="right")
+            counts = hi - lo
+            total = int(counts.sum())
+            if not total:
+                continue
+            query_rows = np.repeat(np.arange(len(keys)), counts)
+            # Position of each pair inside its query's [lo, hi) run of the sorted keys
+            within = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            pairs.append(query_rows * len(self) + self._order[band][np.repeat(lo, counts) + within])
+        if not pairs:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty
+        flat = np.unique(np.concatenate(pairs))
+        q_rows, i_rows = flat // len(self), flat % len(self)
+        keep = ~self._empty[i_rows] & ~(signatures[q_rows] == _EMPTY).all(axis=1)
+        q_rows, i_rows = q_rows[keep], i_rows[keep]
+        estimate = (signatures[q_rows] == self.signatures[i_rows]).mean(axis=1)
+        order = np.lexsort((i_rows, -estimate, q_rows))
+        q_rows, i_rows = q_rows[order], i_rows[order]
+        if max_candidates is not None and len(q_rows):
+            starts = np.flatnonzero(np.r_[True, q_rows[1:] != q_rows[:-1]])
+            rank = np.arange(len(q_rows)) - np.repeat(starts, np.diff(np.r_[starts, len(q_rows)]))
+            q_rows, i_rows = q_rows[rank < max_candidates], i_rows[rank < max_candidates]
+        return q_rows, i_rows
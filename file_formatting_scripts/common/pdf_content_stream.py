@@ -0,0 +1,135 @@
+"""
+Single-pass scanner for image operators in PDF content streams.
+
+Content streams are scanned left to right once and the bytes that are not
+operators are skipped whole (PDF 1.7, 7.2 and 8.8):
+    - literal strings "(...)" (nested parentheses and backslash escapes)
+      and comments,
+    - inline image data between "ID" and "EI" (by its /L or /Length entry
+      when present, otherwise up to the first whitespace-delimited "EI"),
+so text such as "(see BI ... EI)" or binary image bytes never count as
+operators. Only "/Name Do" and "BI" are reported; everything else is
+skipped by the regex engine rather than tokenized in Python.
+
+A page's contents may be an array of streams. The streams are scanned one
+after another without concatenating them; a name at the end of one stream
+still pairs with a "Do" at the start of the next (streams may only be split
+between tokens).
+"""
+
+import re
+from typing import Iterable, List, Optional, Tuple
+
+_WS = rb"\x00\t\n\x0c\r "
+_DELIM = rb"()<>\[\]{}/%"
+_REGULAR = rb"[^" + _WS + _DELIM + rb"]"
+# Next construct to act on: a whole literal string without nested parentheses,
+# any other string or comment start, "/Name Do", or the BI operator (not the name "/BI").
+# Hex strings need no skipping: hex digits cannot spell either operator. The string
+# alternative consumes one byte or escape per step: a "+" inside the "*" would backtrack
+# exponentially on strings holding nested parentheses.
+_EVENT = re.compile(
+    rb"\((?:[^()\\]|\\.)*\)"
+    rb"|([(%])"
+    rb"|(/" + _REGULAR + rb"*)[" + _WS + rb"]*Do(?!" + _REGULAR + rb")"
+    rb"|(?<!" + _REGULAR + rb")(?<!/)(BI)(?!" + _REGULAR + rb")",
+    re.DOTALL,
+)
+# Inline image dictionary token (up to ID): string, name, or other regular token
+_INLINE_TOKEN = re.compile(rb"[" + _WS + rb"]*(?:(\()|(/" + _REGULAR + rb"*)|(" + _REGULAR + rb"+)|(.))", re.DOTALL)
+_STRING_SPECIAL = re.compile(rb"\\.|[()]", re.DOTALL)
+_EOL = re.compile(rb"[\r\n]")
+# End of inline image data: "EI" delimited by whitespace (or the end of the stream)
+_INLINE_END = re.compile(rb"[" + _WS + rb"]EI(?![^" + _WS + rb"])")
+_TRAILING_NAME = re.compile(rb"(/" + _REGULAR + rb"*)[" + _WS + rb"]*$")
+_LEADING_DO = re.compile(rb"[" + _WS + rb"]*Do(?!" + _REGULAR + rb")")
+_INLINE_LENGTH_KEYS = (b"/L", b"/Length")
+
+
+def _skip_string(data: bytes, pos: int) -> int:
+    """Offset just past the literal string whose "(" is at pos - 1."""
+    depth = 1
+    while depth:
+        m = _STRING_SPECIAL.search(data, pos)
+        if m is None:
+            return len(data)
+        pos = m.end()
+        char = m.group()
+        if char == b"(":
+            depth += 1
+        elif char == b")":
+            depth -= 1
+    return pos
+
+
+def _skip_inline_image(data: bytes, pos: int) -> int:
+    """Offset just past the "EI" of the inline image whose "BI" ends at pos."""
+    image_dict: List[bytes] = []
+    end = len(data)
+    # Dictionary tokens up to ID
+    while True:
+        m = _INLINE_TOKEN.match(data, pos)
+        if m is None:
+            return end
+        pos = m.end()
+        if m.group(1):
+            pos = _skip_string(data, pos)
+        elif m.group(3) == b"ID":
+            break
+        else:
+            image_dict.append(m.group(2) or m.group(3) or b"")
+    if pos < end and data[pos] in b"\x00\t\n\x0c\r ":
+        pos += 1  # single whitespace byte separating ID from the data
+    for i, token in enumerate(image_dict[:-1]):
+        if token in _INLINE_LENGTH_KEYS and image_dict[i + 1].isdigit():
+            data_end = pos + int(image_dict[i + 1])
+            if data[data_end:data_end + 2] == b"EI":
+                return data_end + 2
+            m = _INLINE_END.match(data, data_end)
+            if m is not None:
+                return m.end()
+            break  # the length does not land on EI: fall back to scanning
+    m = _INLINE_END.search(data, pos - 1)
+    return m.end() if m is not None else end
+
+
+def count_image_operators(streams: Iterable[bytes]) -> Tuple[List[str], int]:
+    """
+    Scan content streams once for image painting operators.
+    Args:
+        streams (iterable): Decoded content stream data, in order.
+    Returns:
+        tuple: (XObject names painted by "Do", in order and without the "/",
+        number of inline images).
+    """
+    do_names: List[str] = []
+    inline_images = 0
+    pending_name: Optional[bytes] = None  # name ending the previous stream
+    for data in streams:
+        pos = 0
+        if pending_name is not None:
+            m = _LEADING_DO.match(data)
+            if m is not None:
+                do_names.append(pending_name[1:].decode("latin1"))
+                pos = m.end()
+            pending_name = None
+        end = len(data)
+        while pos < end:
+            m = _EVENT.search(data, pos)
+            if m is None:
+                tail = _TRAILING_NAME.search(data, pos)
+                pending_name = tail.group(1) if tail else None
+                break
+            pos = m.end()
+            skip, name, inline = m.groups()
+            if skip == b"(":
+                pos = _skip_string(data, pos)
+            elif skip == b"%":
+                eol = _EOL.search(data, pos)
+                pos = eol.start() if eol else end
+            elif name is not None:
+                do_names.append(name[1:].decode("latin1"))
+            elif inline is not None:
+                inline_images += 1
+                pos = _skip_inline_image(data, pos)
+    return do_names, inline_images
@@ -0,0 +1,251 @@
+"""
+Single-parse PDF page model shared by every PDF-consuming checker.
+
+A PDF is opened once with PyMuPDF and turned into plain Python data:
+per-page text, span dicts, image placements and link annotations. The
+model exposes the small subset of the PyMuPDF page/document API that the
+checkers already use (get_text, get_links, get_textbox, get_image_info,
+get_images, get_toc, page_count), so existing code can consume it without
+keeping the document open or re-parsing it.
+"""
+
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from common.extraction_cache import cached_extract
+from common.instrumentation import traced
+from common.lazy_import import lazy_import, module_available
+
+fitz = lazy_import("fitz")  # PyMuPDF, imported on first parse
+PYMUPDF_AVAILABLE = module_available("fitz")
+
+# Bump when the extracted model layout changes so on-disk cache entries are invalidated
+MODEL_VERSION = "1"
+
+# Keys dropped from image blocks so the model does not hold decoded image bytes
+_IMAGE_BLOCK_PAYLOAD_KEYS = ("image", "mask")
+
+# In-process memo: realpath -> (size, mtime_ns, model)
+_MODEL_CACHE: Dict[str, Tuple[int, int, "PdfDocumentModel"]] = {}
+
+
+def _rect_tuple(rect) -> Tuple[float, float, float, float]:
+    """Return a plain (x0, y0, x1, y1) tuple for a fitz.Rect or sequence."""
+    try:
+        return (float(rect[0]), float(rect[1]), float(rect[2]), float(rect[3]))
+    except Exception:
+        return (0.0, 0.0, 0.0, 0.0)
+
+
+def _rects_intersect(a, b) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+class PdfPageModel:
+    """Extracted content of one PDF page (1-based page number)."""
+
+    def __init__(self, number: int, width: float, height: float, text: str,
+                 blocks: List[Dict[str, Any]], image_info: List[Dict[str, Any]],
+                 images: List[tuple], links: List[Dict[str, Any]]):
+        self.number = number
+        self.width = width
+        self.height = height
+        self.text = text
+        self.blocks = blocks
+        self.image_info = image_info
+        self.images = images
+        self.links = links
+
+    def iter_spans(self) -> Iterator[Dict[str, Any]]:
+        """Yield every text span dict on the page in reading order."""
+        for block in self.blocks:
+            for line in block.get("lines", []):
+                for span in line.get("spans", []):
+                    yield span
+
+    @property
+    def image_block_count(self) -> int:
+        """Number of image blocks reported by the text extraction."""
+        return sum(1 for blk in self.blocks if blk.get("type") == 1)
+
+    # --- PyMuPDF-compatible accessors ---
+    def get_text(self, option: str = "text", **_kwargs):
+        """
+        Mirror of fitz.Page.get_text for the options the checkers use.
+        "dict" and "rawdict" both return the stored span dicts (spans carry
+        "text" rather than per-character "chars").
+        """
+        if option in ("dict", "rawdict"):
+            return {"width": self.width, "height": self.height, "blocks": self.blocks}
+        return self.text
+
+    def get_links(self) -> List[Dict[str, Any]]:
+        return [dict(link) for link in self.links]
+
+    def get_textbox(self, rect) -> str:
+        """Return text of spans intersecting rect (link rects are precomputed)."""
+        target = _rect_tuple(rect)
+        for link in self.links:
+            if _rect_tuple(link.get("from")) == target and "text" in link:
+                return link["text"]
+        parts = [span.get("text", "") for span in self.iter_spans()
+                 if _rects_intersect(_rect_tuple(span.get("bbox")), target)]
+        return " ".join(p for p in parts if p)
+
+    def get_image_info(self, xrefs: bool = False) -> List[Dict[str, Any]]:
+        return [dict(info) for info in self.image_info]
+
+    def get_images(self, full: bool = False) -> List[tuple]:
+        return list(self.images)
+
+
+class PdfDocumentModel:
+    """All pages of a PDF parsed once, plus document-level outline data."""
+
+    def __init__(self, path: str, pages: List[PdfPageModel], toc: List[list],
+                 names: Dict[str, Any], metadata: Dict[str, Any]):
+        self.path = path
+        self.pages = pages
+        self.toc = toc
+        self.names = names
+        self.metadata = metadata
+
+    @property
+    def page_count(self) -> int:
+        return len(self.pages)
+
+    def __len__(self) -> int:
+        return len(self.pages)
+
+    def __iter__(self) -> Iterator[PdfPageModel]:
+        return iter(self.pages)
+
+    def __getitem__(self, index: int) -> PdfPageModel:
+        """0-based page access, like fitz.Document."""
+        return self.pages[index]
+
+    def page(self, page_num: int) -> PdfPageModel:
+        """1-based page access."""
+        return self.pages[page_num - 1]
+
+    def get_toc(self) -> List[list]:
+        return [list(item) for item in self.toc]
+
+    def resolve_names(self) -> Dict[str, Any]:
+        return dict(self.names)
+
+    def close(self):
+        """No-op: the model holds no open file handles."""
+        pass
+
+
+def _extract_page(page, number: int) -> PdfPageModel:
+    """Pull everything the checkers need from one fitz page."""
+    text = page.get_text("text")
+
+    try:
+        raw = page.get_text("dict")
+        blocks = raw.get("blocks", []) if isinstance(raw, dict) else []
+    except Exception:
+        blocks = []
+    for blk in blocks:
+        if blk.get("type") == 1:
+            for key in _IMAGE_BLOCK_PAYLOAD_KEYS:
+                blk.pop(key, None)
+
+    try:
+        image_info = page.get_image_info(xrefs=True) or []
+    except Exception:
+        image_info = []
+
+    try:
+        images = [tuple(img) for img in (page.get_images(full=True) or [])]
+    except Exception:
+        images = []
+
+    links: List[Dict[str, Any]] = []
+    try:
+        for link in page.get_links() or []:
+            link = dict(link)
+            rect = link.get("from")
+            if rect is not None:
+                # Same text as page.get_textbox(rect), which extracts the whole page and then walks
+                # every character in Python on each call; a clipped extraction stays in MuPDF
+                try:
+                    link["text"] = page.get_text("text", clip=rect).strip()
+                except Exception:
+                    link["text"] = ""
+            links.append(link)
+    except Exception:
+        links = []
+
+    return PdfPageModel(
+        number=number,
+        width=float(page.rect.width),
+        height=float(page.rect.height),
+        text=text,
+        blocks=blocks,
+        image_info=image_info,
+        images=images,
+        links=links,
+    )
+
+
+@traced()
+def parse_pdf(pdf_path: str) -> PdfDocumentModel:
+    """
+    Open the PDF once and extract every page into a PdfDocumentModel.
+    Args:
+        pdf_path (str): Path to the PDF file.
+    Returns:
+        PdfDocumentModel: The parsed document.
+    """
+    if not PYMUPDF_AVAILABLE:
+        raise ImportError("PyMuPDF is required to build the PDF page model (pip install pymupdf)")
+
+    with fitz.open(pdf_path) as doc:
+        pages = [_extract_page(page, i) for i, page in enumerate(doc, start=1)]
+        try:
+            toc = doc.get_toc()
+        except Exception:
+            toc = []
+        try:
+            names = doc.resolve_names() or {}
+        except Exception:
+            names = {}
+        metadata = dict(doc.metadata or {})
+
+    return PdfDocumentModel(pdf_path, pages, toc, names, metadata)
+
+
+def load_pdf_model(pdf_path: str, refresh: bool = False) -> PdfDocumentModel:
+    """
+    Return the shared page model for pdf_path, parsing it only on first use.
+    The model is reused in-process for as long as the file's size and mtime are
+    unchanged, and across runs through the on-disk extraction cache.
+    Args:
+        pdf_path (str): Path to the PDF file.
+        refresh (bool): Force a re-parse even if a cached model exists.
+    Returns:
+        PdfDocumentModel: The parsed document.
+    """
+    key = os.path.realpath(pdf_path)
+    st = os.stat(key)
+    cached = _MODEL_CACHE.get(key)
+    if cached and not refresh and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+        return cached[2]
+    if refresh:
+        model = parse_pdf(pdf_path)
+    else:
+        model = cached_extract(pdf_path, "pdf_page_model", MODEL_VERSION, lambda: parse_pdf(pdf_path))
+        model.path = pdf_path
+    _MODEL_CACHE[key] = (st.st_size, st.st_mtime_ns, model)
+    return model
+
+
+def clear_pdf_model_cache(pdf_path: Optional[str] = None):
+    """Drop one cached model (or all of them) to free memory."""
+    if pdf_path is None:
+        _MODEL_CACHE.clear()
+    else:
+        _MODEL_CACHE.pop(os.path.realpath(pdf_path), None)
@@ -0,0 +1,204 @@
+"""
+Library-free image scan of a PDF file, for when no PDF library can open it.
+
+The file is memory-mapped and scanned in overlapping chunks, so a
+multi-GB scanned PDF is never read into memory as a whole. The scan
+records every "N G obj" header (the object offsets), every
+"/Subtype /Image" occurrence and the catalog (/Root) reference.
+
+Images are then attributed to pages the way a reader would find them:
+the page tree is walked from the catalog in page order, and each page's
+/XObject resources (inherited from /Pages nodes where needed) are
+resolved through the object offsets. Form XObjects are followed to the
+images they hold. Objects stored inside compressed object streams have
+no offset of their own and cannot be resolved. When the page tree cannot
+be walked at all, only the total is known.
+"""
+
+import mmap
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Bytes scanned per chunk, and the overlap that keeps a match spanning two chunks whole
+SCAN_CHUNK_BYTES = 16 * 1024 * 1024
+SCAN_OVERLAP_BYTES = 4096
+# Most bytes read for one object dictionary (stream data after it is never read)
+MAX_OBJECT_BYTES = 1024 * 1024
+# Deepest page tree / Form nesting followed
+MAX_DEPTH = 64
+
+# Each scan pattern starts with a literal, so the regex engine skips through binary data quickly
+_OBJ_KEYWORD = re.compile(rb"obj(?![A-Za-z])")
+_OBJ_HEADER = re.compile(rb"(?<![0-9])([0-9]+)[\x00\t\n\x0c\r ]+[0-9]+[\x00\t\n\x0c\r ]+$")
+_IMAGE_SUBTYPE = re.compile(rb"/Subtype[\x00\t\n\x0c\r ]*/Image(?![A-Za-z])")
+_ROOT = re.compile(rb"/Root[\x00\t\n\x0c\r ]+([0-9]+)[\x00\t\n\x0c\r ]+[0-9]+[\x00\t\n\x0c\r ]+R")
+# Longest "N G " object number prefix looked at before an "obj" keyword
+_HEADER_LOOKBACK = 48
+_REF = rb"([0-9]+)[\x00\t\n\x0c\r ]+[0-9]+[\x00\t\n\x0c\r ]+R"
+_REFS = re.compile(_REF)
+_KIDS = re.compile(rb"/Kids[\x00\t\n\x0c\r ]*\[([^\]]*)\]")
+_PAGES_REF = re.compile(rb"/Pages[\x00\t\n\x0c\r ]+" + _REF)
+_RESOURCES_REF = re.compile(rb"/Resources[\x00\t\n\x0c\r ]+" + _REF)
+_XOBJECT = re.compile(rb"/XObject[\x00\t\n\x0c\r ]*(?:" + _REF + rb"|<<)")
+_SUBTYPE = re.compile(rb"/Subtype[\x00\t\n\x0c\r ]*/(Image|Form)(?![A-Za-z])")
+_DICT_END = re.compile(rb"stream|endobj")
+
+
+class RawImageScan(NamedTuple):
+    total: int                    # "/Subtype /Image" occurrences in the file
+    page_counts: Dict[int, int]   # 1-based page -> images in its resources; {} if pages were not found
+
+
+def _scan_chunks(mm) -> Tuple[Dict[int, int], int, Optional[int]]:
+    """One pass over the file: (object number -> offset, image count, catalog object number)."""
+    offsets: Dict[int, int] = {}
+    images = 0
+    root = None
+    size = len(mm)
+    dropped = 0
+    start = 0
+    while start < size:
+        end = min(size, start + SCAN_CHUNK_BYTES)
+        # Matches are reported by the chunk they start in; the window reaches back far enough
+        # to see an object header split by the chunk start and on into the overlap
+        left = max(0, start - _HEADER_LOOKBACK)
+        window = mm[left:min(size, end + SCAN_OVERLAP_BYTES)]
+        lo, hi = start - left, end - left
+        for m in _OBJ_KEYWORD.finditer(window, lo):
+            header = _OBJ_HEADER.search(window, max(0, m.start() - _HEADER_LOOKBACK), m.start())
+            if header is None or header.start() < lo:
+                continue
+            if header.start() >= hi:
+                break
+            # Later definitions (incremental updates) replace earlier ones
+            offsets[int(header.group(1))] = left + header.start()
+        for m in _IMAGE_SUBTYPE.finditer(window, lo):
+            if m.start() >= hi:
+                break
+            images += 1
+        for m in _ROOT.finditer(window, lo):
+            if m.start() >= hi:
+                break
+            root = int(m.group(1))
+        del window
+        start = end
+        # Release the scanned pages so resident memory stays bounded by a chunk
+        aligned = end - end % mmap.PAGESIZE
+        if hasattr(mm, "madvise") and hasattr(mmap, "MADV_DONTNEED") and aligned > dropped:
+            mm.madvise(mmap.MADV_DONTNEED, dropped, aligned - dropped)
+            dropped = aligned
+    return offsets, images, root
+
+
+class _ObjectReader:
+    """Reads object dictionaries of a mapped PDF by object number."""
+
+    def __init__(self, mm, offsets: Dict[int, int]):
+        self.mm = mm
+        self.offsets = offsets
+        self._cache: Dict[int, bytes] = {}
+
+    def dictionary(self, number: int) -> bytes:
+        """The object's text up to its stream data or endobj (b"" if it has no offset)."""
+        if number in self._cache:
+            return self._cache[number]
+        offset = self.offsets.get(number)
+        text = b""
+        if offset is not None:
+            head = self.mm[offset:offset + MAX_OBJECT_BYTES]
+            m = _DICT_END.search(head)
+            text = head[:m.start()] if m else head
+        self._cache[number] = text
+        return text
+
+    def xobject_refs(self, text: bytes) -> List[int]:
+        """Object numbers in the /XObject resource dictionary of `text` (a page, /Pages, Form or resource dict)."""
+        m = _XOBJECT.search(text)
+        if m is None:
+            resources = _RESOURCES_REF.search(text)
+            if resources is None:
+                return []
+            text = self.dictionary(int(resources.group(1)))
+            m = _XOBJECT.search(text)
+            if m is None:
+                return []
+        if m.group(1) is not None:
+            body = self.dictionary(int(m.group(1)))
+        else:
+            close = text.find(b">>", m.end())
+            body = text[m.end():close if close != -1 else len(text)]
+        return [int(n) for n in _REFS.findall(body)]
+
+
+def _xobject_images(reader: _ObjectReader, number: int, memo: Dict[int, int], depth: int = 0) -> int:
+    """Images one XObject paints: 1 for an image, the images of a Form's own resources."""
+    if number in memo:
+        return memo[number]
+    if depth > MAX_DEPTH:
+        return 0
+    memo[number] = 0  # a Form that draws itself adds nothing
+    text = reader.dictionary(number)
+    m = _SUBTYPE.search(text)
+    count = 0
+    if m is not None and m.group(1) == b"Image":
+        count = 1
+    elif m is not None:
+        count = sum(_xobject_images(reader, ref, memo, depth + 1) for ref in reader.xobject_refs(text))
+    memo[number] = count
+    return count
+
+
+def _page_objects(reader: _ObjectReader, root: int) -> List[Tuple[int, bytes]]:
+    """(page object number, text with its resources) in page order, walking the page tree."""
+    catalog = reader.dictionary(root)
+    pages_ref = _PAGES_REF.search(catalog)
+    if pages_ref is None:
+        return []
+    pages: List[Tuple[int, bytes]] = []
+    seen = set()
+    # Depth-first, left to right; the second item is the nearest ancestor text holding /Resources
+    stack: List[Tuple[int, bytes, int]] = [(int(pages_ref.group(1)), b"", 0)]
+    while stack:
+        number, inherited, depth = stack.pop()
+        if number in seen or depth > MAX_DEPTH:
+            continue
+        seen.add(number)
+        text = reader.dictionary(number)
+        if b"/Resources" in text:
+            inherited = text
+        kids = _KIDS.search(text)
+        if kids is not None:
+            for kid in reversed(_REFS.findall(kids.group(1))):
+                stack.append((int(kid), inherited, depth + 1))
+        else:
+            # An unresolvable kid (e.g. in an object stream) still takes its page slot
+            pages.append((number, inherited))
+    return pages
+
+
+def scan_pdf_images(pdf_path: str) -> RawImageScan:
+    """
+    Count image objects in a PDF without a PDF library, per page where the page
+    tree can be followed.
+    Args:
+        pdf_path (str): Path to the PDF file.
+    Returns:
+        RawImageScan: The raw total and the per-page counts.
+    """
+    with open(pdf_path, "rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return RawImageScan(0, {})  # empty file
+        try:
+            offsets, total, root = _scan_chunks(mm)
+            page_counts: Dict[int, int] = {}
+            if root is not None:
+                reader = _ObjectReader(mm, offsets)
+                memo: Dict[int, int] = {}
+                for page_number, (_number, resources) in enumerate(_page_objects(reader, root), start=1):
+                    page_counts[page_number] = sum(
+                        _xobject_images(reader, ref, memo) for ref in reader.xobject_refs(resources))
+            return RawImageScan(total, page_counts)
+        finally:
+            mm.close()
@@ -0,0 +1,265 @@
+"""
+Streaming, sharded HTML report writer shared by the checkers.
+
+A report is an index page plus detail shards:
+    <name>.html                   title, summary and one table row per item
+    <name>_files/report.css       shared stylesheet
+    <name>_files/part-0001.html   full detail sections, ITEMS_PER_SHARD items each
+Table rows are spooled to temporary files and detail sections go straight
+to the current shard, so memory stays bounded by a single item however many
+files a run covers, and no page grows beyond what a browser can open.
+The detail pages are built in <name>_files.tmp/ and replace <name>_files/
+only once the index is complete; a failed run leaves the previous report
+untouched.
+
+Plain values passed as cells, titles or summary values are HTML-escaped;
+markup that is already safe (e.g. a generated diff) must be wrapped in
+Markup().
+"""
+
+import html
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+ITEMS_PER_SHARD = 200
+# A shard is also closed early once it grows past this size
+SHARD_MAX_BYTES = 8 * 1024 * 1024
+
+BASE_CSS = """
+body { font-family: Arial, "Segoe UI", "Noto Sans", sans-serif; margin: 30px; line-height: 1.5; background: #f9f9f9; color: #222; }
+h1 { color: #2c3e50; border-bottom: 3px solid #3498db; padding-bottom: 8px; }
+h2 { color: #2c3e50; border-bottom: 1px solid #eee; padding-bottom: 4px; margin-top: 28px; }
+a { color: #2471a3; }
+.meta { color: #777; font-size: 0.9em; }
+.summary, .section, .item { background: #fff; padding: 16px 20px; margin-bottom: 24px; border-radius: 6px; box-shadow: 0 1px 4px rgba(0,0,0,0.08); }
+table.report, table.kv { border-collapse: collapse; width: 100%; font-size: 14px; }
+table.report th, table.report td, table.kv th, table.kv td { border: 1px solid #ccc; padding: 5px 8px; text-align: left; vertical-align: top; }
+table.report th, table.kv th { background: #f0f0f0; }
+table.kv { width: auto; }
+tr.fail td { background: #fff3f3; }
+.ok, .high-similarity, .similarity-high { color: #27ae60; font-weight: bold; }
+.fail, .low-similarity, .similarity-low { color: #c0392b; font-weight: bold; }
+.warn, .similarity-medium { color: #d68910; font-weight: bold; }
+.diff { display: flex; gap: 24px; }
+.diff > div { flex: 1; min-width: 0; }
+.content-box { border: 1px solid #ddd; padding: 12px; border-radius: 4px; background: #f9f9f9; white-space: pre-wrap; word-wrap: break-word; font-family: "Courier New", monospace; font-size: 13px; }
+.old, .removed { background: #fdd; color: #900; text-decoration: line-through; }
+.new, .added { background: #dfd; color: #060; }
+.changed { background: #ff9; }
+.unchanged { color: #333; }
+.nav { font-size: 0.9em; margin-bottom: 16px; }
+"""
+
+
+class Markup(str):
+    """Already-safe HTML that the writer inserts verbatim."""
+
+
+def esc(value: Any) -> str:
+    """HTML-escape a value unless it is Markup."""
+    if isinstance(value, Markup):
+        return value
+    return html.escape("" if value is None else str(value), quote=True)
+
+
+def diff_columns(left_title: str, left_html: str, right_title: str, right_html: str) -> Markup:
+    """Side-by-side diff block; left_html/right_html must already be escaped markup."""
+    return Markup(
+        "<div class='diff'>"
+        f"<div><h3>{esc(left_title)}</h3><div class='content-box'>{left_html}</div></div>"
+        f"<div><h3>{esc(right_title)}</h3><div class='content-box'>{right_html}</div></div>"
+        "</div>"
+    )
+
+
+class _Table:
+    def __init__(self, heading: str, columns: Sequence[str], empty_message: Optional[str], details: bool):
+        self.heading = heading
+        self.columns = list(columns)
+        self.empty_message = empty_message
+        self.details = details
+        self.rows = 0
+        self.spool = tempfile.TemporaryFile("w+", encoding="utf-8")
+
+
+class HtmlReport:
+    """Index page plus sharded detail pages, written incrementally."""
+
+    def __init__(self, path: str, title: str, intro: Optional[str] = None, extra_css: str = "",
+                 items_per_shard: int = ITEMS_PER_SHARD):
+        """
+        Args:
+            path (str): Index page path; detail pages go to "<name>_files/" beside it.
+            title (str): Report title.
+            intro (str): Optional text (or Markup) shown under the title.
+            extra_css (str): Checker-specific rules appended to the shared stylesheet.
+            items_per_shard (int): Detail sections per shard page.
+        """
+        self.path = path
+        self.title = title
+        self.intro = intro
+        self.items_per_shard = max(1, items_per_shard)
+        stem = os.path.splitext(os.path.basename(path))[0]
+        self.index_name = os.path.basename(path)
+        self.assets_name = stem + "_files"
+        self.assets_dir = os.path.join(os.path.dirname(os.path.abspath(path)), self.assets_name)
+        # This run's pages are built in a sibling folder and swapped in by close(), so the previous
+        # report and its detail pages stay intact until the new index is complete
+        self._build_dir = self.assets_dir + ".tmp"
+        shutil.rmtree(self._build_dir, ignore_errors=True)
+        os.makedirs(self._build_dir)
+        with open(os.path.join(self._build_dir, "report.css"), "w", encoding="utf-8") as f:
+            f.write(BASE_CSS + extra_css)
+
+        self.items = 0
+        self._summary: List[str] = []
+        self._tables: Dict[str, _Table] = {}
+        self._shard = None
+        self._shard_number = 0
+        self._shard_items = 0
+        self._closed = False
+
+    # --- summary (small, kept in memory and written at the top of the index) ---
+    def add_summary(self, label: str, value: Any):
+        self._summary.append(f"<tr><th>{esc(label)}</th><td>{esc(value)}</td></tr>")
+
+    def add_note(self, text: Any, css_class: Optional[str] = None):
+        cls = f' class="{esc(css_class)}"' if css_class else ""
+        self._summary.append(f"<tr><td colspan='2'{cls}>{esc(text)}</td></tr>")
+
+    # --- index tables (rows are spooled to disk) ---
+    def add_table(self, key: str, heading: str, columns: Sequence[str],
+                  empty_message: Optional[str] = None, details: bool = False):
+        """Declare an index table; tables appear in declaration order, and a table without rows
+        shows empty_message (or is left out when there is none)."""
+        self._tables[key] = _Table(heading, columns, empty_message, details)
+
+    def add_row(self, key: str, cells: Sequence[Any], detail: Optional[str] = None,
+                detail_title: Optional[str] = None, row_class: Optional[str] = None) -> Optional[str]:
+        """
+        Append a row to table `key`; with `detail` (Markup), also write a detail
+        section to the current shard and link it from the row.
+        Returns:
+            str: The detail link (relative to the index), or None.
+        """
+        table = self._tables[key]
+        link = None
+        parts = [f"<td>{esc(c)}</td>" for c in cells]
+        if detail is not None:
+            link = self.add_detail(detail_title or str(cells[0]), detail)
+            parts.append(f'<td><a href="{esc(link)}">details</a></td>')
+        elif table.details:
+            parts.append("<td></td>")
+        cls = f' class="{esc(row_class)}"' if row_class else ""
+        table.spool.write(f"<tr{cls}>{''.join(parts)}</tr>\n")
+        table.rows += 1
+        return link
+
+    # --- detail shards ---
+    def _open_shard(self):
+        self._shard_number += 1
+        self._shard_items = 0
+        name = f"part-{self._shard_number:04d}.html"
+        self._shard_name = name
+        self._shard = open(os.path.join(self._build_dir, name), "w", encoding="utf-8")
+        self._shard.write(
+            "<!DOCTYPE html><html lang='en'><head><meta charset='UTF-8'>"
+            f"<title>{esc(self.title)} - part {self._shard_number}</title>"
+            "<link rel='stylesheet' href='report.css'></head><body>"
+            f"<div class='nav'><a href='../{esc(self.index_name)}'>&larr; Back to index</a></div>"
+            f"<h1>{esc(self.title)} &ndash; part {self._shard_number}</h1>\n"
+        )
+
+    def _close_shard(self):
+        if self._shard is not None:
+            self._shard.write(f"<div class='nav'><a href='../{esc(self.index_name)}'>&larr; Back to index</a></div></body></html>\n")
+            self._shard.close()
+            self._shard = None
+
+    def add_detail(self, title: str, body: str) -> str:
+        """Write one detail section and return its link relative to the index page."""
+        if (self._shard is None or self._shard_items >= self.items_per_shard
+                or self._shard.tell() >= SHARD_MAX_BYTES):
+            self._close_shard()
+            self._open_shard()
+        self.items += 1
+        self._shard_items += 1
+        anchor = f"item-{self.items}"
+        self._shard.write(f"<div class='item' id='{anchor}'><h2>{esc(title)}</h2>{body}</div>\n")
+        return f"{self.assets_name}/{self._shard_name}#{anchor}"
+
+    # --- finish ---
+    def close(self):
+        """Close the last shard and assemble the index page."""
+        if self._closed:
+            return
+        self._closed = True
+        self._close_shard()
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as out:
+            out.write(
+                "<!DOCTYPE html><html lang='en'><head><meta charset='UTF-8'>"
+                "<meta name='viewport' content='width=device-width, initial-scale=1.0'>"
+                f"<title>{esc(self.title)}</title>"
+                f"<link rel='stylesheet' href='{esc(self.assets_name)}/report.css'></head><body>"
+                f"<h1>{esc(self.title)}</h1>"
+                f"<p class='meta'>Generated {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+                f" &middot; {self.items} detail section(s) in {self._shard_number} page(s)</p>\n"
+            )
+            if self.intro:
+                out.write(f"<p>{esc(self.intro)}</p>\n")
+            if self._summary:
+                out.write("<div class='summary'><h2>Summary</h2><table class='kv'>")
+                out.write("".join(self._summary))
+                out.write("</table></div>\n")
+            for table in self._tables.values():
+                if not table.rows and not table.empty_message:
+                    table.spool.close()  # nothing to show: no heading over an empty section
+                    continue
+                out.write(f"<div class='section'><h2>{esc(table.heading)}</h2>")
+                if table.rows:
+                    headers = table.columns + (["Details"] if table.details else [])
+                    out.write("<table class='report'><thead><tr>")
+                    out.write("".join(f"<th>{esc(h)}</th>" for h in headers))
+                    out.write("</tr></thead><tbody>\n")
+                    table.spool.seek(0)
+                    shutil.copyfileobj(table.spool, out)
+                    out.write("</tbody></table>")
+                elif table.empty_message:
+                    out.write(f"<p class='ok'>{esc(table.empty_message)}</p>")
+                out.write("</div>\n")
+                table.spool.close()
+            out.write("</body></html>\n")
+        # Swap the new pages in, replacing the previous run's folder (and any shards it had beyond ours)
+        old_dir = self.assets_dir + ".old"
+        shutil.rmtree(old_dir, ignore_errors=True)
+        if os.path.exists(self.assets_dir):
+            os.rename(self.assets_dir, old_dir)
+        os.rename(self._build_dir, self.assets_dir)
+        os.replace(tmp, self.path)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    def abort(self):
+        """Discard the report: close the spools and delete the pages written so far; the previous
+        index and its detail pages are left as they were."""
+        if self._closed:
+            return
+        self._closed = True
+        self._close_shard()
+        for table in self._tables.values():
+            table.spool.close()
+        shutil.rmtree(self._build_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # A failed run must not publish a partial index as if it were complete
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+        return False
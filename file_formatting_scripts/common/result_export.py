@@ -0,0 +1,169 @@
+"""
+Machine-readable result export: streamed JSONL and columnar Parquet.
+
+Checkers write their per-row results next to the HTML report so dashboards
+can aggregate them without scraping HTML:
+    <report stem>[.<name>].jsonl     one JSON object per row, written as rows arrive
+    <report stem>[.<name>].parquet   the same rows, one row group per EXPORT_CHUNK_ROWS
+Each export declares its columns and pandas dtypes up front, so every chunk
+(and every run) has the same schema however sparse the values are. Memory is
+bounded by one chunk.
+
+Parquet goes through pandas and needs pyarrow; without it only JSONL is
+written. Set QA_EXPORT=0 to turn exports off, or QA_EXPORT_FORMATS=jsonl to
+write JSONL only.
+"""
+
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+from common.lazy_import import lazy_import, module_available
+
+pd = lazy_import("pandas")
+pa = lazy_import("pyarrow")
+pq = lazy_import("pyarrow.parquet")
+PARQUET_AVAILABLE = module_available("pandas") and module_available("pyarrow")
+
+# Rows buffered per Parquet row group
+EXPORT_CHUNK_ROWS = 50_000
+
+
+def export_enabled() -> bool:
+    return os.environ.get("QA_EXPORT", "1") != "0"
+
+
+def export_formats() -> List[str]:
+    formats = [f.strip().lower() for f in os.environ.get("QA_EXPORT_FORMATS", "jsonl,parquet").split(",")]
+    return [f for f in formats if f in ("jsonl", "parquet")]
+
+
+def export_stem(report_path: str, name: Optional[str] = None) -> str:
+    """Path prefix for the exports belonging to a report ("out/report.html" -> "out/report[.name]")."""
+    stem = os.path.splitext(report_path)[0]
+    return f"{stem}.{name}" if name else stem
+
+
+class ResultExporter:
+    """Streams rows of a fixed schema to JSONL and Parquet."""
+
+    def __init__(self, stem: str, columns: Dict[str, str], chunk_rows: int = EXPORT_CHUNK_ROWS,
+                 formats: Optional[List[str]] = None):
+        """
+        Args:
+            stem (str): Output path prefix; ".jsonl" / ".parquet" are appended.
+            columns (dict): Column name -> pandas dtype ("int64", "Int64", "float64",
+                "boolean", "string"); columns missing from a row are written as null.
+            chunk_rows (int): Rows per Parquet row group.
+            formats (list): Subset of ["jsonl", "parquet"]; defaults to QA_EXPORT_FORMATS.
+        """
+        self.stem = stem
+        self.columns = dict(columns)
+        self.chunk_rows = max(1, chunk_rows)
+        self.enabled = export_enabled()
+        formats = export_formats() if formats is None else formats
+        self.paths: Dict[str, str] = {}
+        self.rows = 0
+        self._jsonl = None
+        self._buffer: List[Dict[str, Any]] = []
+        self._parquet_writer = None
+        self._schema = None
+        self._closed = False
+        if not self.enabled:
+            return
+        directory = os.path.dirname(os.path.abspath(stem))
+        os.makedirs(directory, exist_ok=True)
+        if "jsonl" in formats:
+            self.paths["jsonl"] = stem + ".jsonl"
+            self._jsonl = open(self.paths["jsonl"] + ".tmp", "w", encoding="utf-8")
+        if "parquet" in formats:
+            if PARQUET_AVAILABLE:
+                self.paths["parquet"] = stem + ".parquet"
+            else:
+                print("Parquet export skipped: pandas and pyarrow are required (pip install pyarrow)")
+
+    def write(self, row: Dict[str, Any]):
+        if not self.enabled:
+            return
+        record = {col: row.get(col) for col in self.columns}
+        if self._jsonl is not None:
+            self._jsonl.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        if "parquet" in self.paths:
+            self._buffer.append(record)
+            if len(self._buffer) >= self.chunk_rows:
+                self._flush_parquet()
+        self.rows += 1
+
+    def write_many(self, rows: Iterable[Dict[str, Any]]):
+        for row in rows:
+            self.write(row)
+
+    def _frame(self, records: List[Dict[str, Any]]):
+        frame = pd.DataFrame.from_records(records, columns=list(self.columns))
+        return frame.astype(self.columns)
+
+    def _flush_parquet(self):
+        if self._parquet_writer is None:
+            # The schema comes from the declared dtypes, so an all-null first chunk still fixes the types
+            self._schema = pa.Schema.from_pandas(self._frame([]), preserve_index=False)
+            self._parquet_writer = pq.ParquetWriter(self.paths["parquet"] + ".tmp", self._schema)
+        if self._buffer:
+            table = pa.Table.from_pandas(self._frame(self._buffer), schema=self._schema, preserve_index=False)
+            self._parquet_writer.write_table(table)
+            self._buffer = []
+
+    def close(self) -> Dict[str, str]:
+        """
+        Finish the files (each is moved into place only once complete).
+        Returns:
+            dict: {"jsonl": path, "parquet": path} for the formats written.
+        """
+        if not self.enabled or self._closed:
+            return dict(self.paths)
+        self._closed = True
+        if self._jsonl is not None:
+            self._jsonl.close()
+            self._jsonl = None
+            os.replace(self.paths["jsonl"] + ".tmp", self.paths["jsonl"])
+        if "parquet" in self.paths:
+            self._flush_parquet()
+            self._parquet_writer.close()
+            self._parquet_writer = None
+            os.replace(self.paths["parquet"] + ".tmp", self.paths["parquet"])
+        return dict(self.paths)
+
+    def abort(self):
+        """Close the files without publishing them: the partial ".tmp" files are deleted."""
+        if not self.enabled or self._closed:
+            return
+        self._closed = True
+        if self._jsonl is not None:
+            self._jsonl.close()
+            self._jsonl = None
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+        self._buffer = []
+        for path in self.paths.values():
+            try:
+                os.remove(path + ".tmp")
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # A failed run leaves any previous export in place rather than publishing a partial one
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+        return False
+
+
+def export_rows(stem: str, columns: Dict[str, str], rows: Iterable[Dict[str, Any]]) -> Dict[str, str]:
+    """Write an iterable of rows in one call; returns the paths written."""
+    with ResultExporter(stem, columns) as exporter:
+        exporter.write_many(rows)
+    return exporter.paths
@@ -0,0 +1,119 @@
+"""
+Run-state manifest for incremental re-verification.
+
+A state file (JSON) remembers, for every unit of work a checker performs
+(a file pair, a page, a single file), the digests of the inputs it was
+computed from and the result it produced. On the next run a checker asks
+the state for a result; if every input digest still matches, the stored
+result is reused and only changed units are recomputed. Results that are
+no longer produced are dropped when the state is saved.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Dict, Iterable, Optional
+
+from common.extraction_cache import file_digest
+
+STATE_FORMAT_VERSION = 1
+
+_MISSING = object()
+
+
+def text_digest(text: str) -> str:
+    """SHA-1 of a text value (used for already-extracted content)."""
+    return hashlib.sha1(text.encode("utf-8", errors="surrogatepass")).hexdigest()
+
+
+def combined_digest(digests: Iterable[str]) -> str:
+    """Order-independent digest of a collection of digests (e.g. a whole folder)."""
+    h = hashlib.sha1()
+    for d in sorted(digests):
+        h.update(d.encode("utf-8"))
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+class RunState:
+    """Per-checker section of a run-state JSON file."""
+
+    def __init__(self, path: Optional[str], checker: str, config: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            path (str): State file path; None disables persistence (every lookup misses).
+            checker (str): Section name, so several checkers can share one state file.
+            config (dict): Settings that affect results; a change invalidates the section.
+        """
+        self.path = path
+        self.checker = checker
+        self.config = json.loads(json.dumps(config or {}, sort_keys=True, default=str))
+        self._data: Dict[str, Any] = {"version": STATE_FORMAT_VERSION, "checkers": {}}
+        self._previous: Dict[str, Any] = {}
+        self._current: Dict[str, Any] = {}
+        self.reused = 0
+        self.recomputed = 0
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == STATE_FORMAT_VERSION:
+                    self._data = data
+            except Exception as e:
+                print(f"Ignoring unreadable state file {path}: {e}")
+        section = self._data["checkers"].get(checker, {})
+        if section.get("config") == self.config:
+            self._previous = section.get("results", {})
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    @staticmethod
+    def file_digest(path: str) -> str:
+        return file_digest(path)
+
+    def lookup(self, key: str, inputs: Dict[str, str], default: Any = None) -> Any:
+        """Return the stored result for key if all input digests are unchanged, else default."""
+        entry = self._previous.get(key)
+        if entry is not None and entry.get("inputs") == inputs:
+            self._current[key] = entry
+            self.reused += 1
+            return entry.get("result")
+        return default
+
+    def record(self, key: str, inputs: Dict[str, str], result: Any):
+        """Store a freshly computed (JSON-serialisable) result."""
+        self._current[key] = {"inputs": inputs, "result": result}
+        self.recomputed += 1
+
+    def get_or_compute(self, key: str, inputs: Dict[str, str], compute):
+        """lookup() and fall back to compute(), recording its result."""
+        result = self.lookup(key, inputs, _MISSING)
+        if result is _MISSING:
+            result = compute()
+            self.record(key, inputs, result)
+        return result
+
+    def save(self):
+        """Persist results touched in this run (stale keys are dropped)."""
+        if not self.path:
+            return
+        self._data["checkers"][self.checker] = {"config": self.config, "results": self._current}
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._data, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except Exception:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    def summary(self) -> str:
+        return f"{self.reused} reused from previous run, {self.recomputed} recomputed"
@@ -0,0 +1,151 @@
+"""
+Word-level diff with bounded runtime, for report pages.
+
+Texts are compared as lists of word tokens, and every distinct word is
+interned to an integer id, so alignment only compares integers. Alignment
+is patience-style. Words that occur exactly once on both sides of a region
+are candidate anchors. The longest run of anchors in the same order on both
+sides is kept (patience sorting, O(n log n)). The gaps between anchors are
+then aligned the same way, after trimming the words they share at both
+ends. A gap without unique common words goes to difflib when it is at most
+DIFF_SMALL_REGION cells (words x words); a larger one becomes one replaced
+block.
+
+Work is bounded in two ways. Every region examined adds its length to a
+budget of DIFF_WORK_PER_TOKEN x the total word count, and the whole diff
+has DIFF_TIME_LIMIT seconds. Once either is spent, the gaps still
+unresolved are reported as whole replaced blocks. A large, dissimilar page
+therefore gets a coarse diff quickly instead of a fine one after minutes.
+"""
+
+import time
+from bisect import bisect_left
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Work budget per word of both texts, wall-clock limit per diff (seconds), and the largest
+# anchor-less gap (words x words) aligned with difflib instead of reported as one block
+DIFF_WORK_PER_TOKEN = 64
+DIFF_TIME_LIMIT = 2.0
+DIFF_SMALL_REGION = 250_000
+
+Opcode = Tuple[str, int, int, int, int]  # (tag, i1, i2, j1, j2) as in SequenceMatcher.get_opcodes
+
+
+def intern_tokens(*token_lists: Sequence[str]) -> List[List[int]]:
+    """The token lists with every distinct token replaced by one integer id shared across lists."""
+    ids: Dict[str, int] = {}
+    return [[ids.setdefault(token, len(ids)) for token in tokens] for tokens in token_lists]
+
+
+def _unique_anchors(a, b, alo, ahi, blo, bhi) -> List[Tuple[int, int]]:
+    """
+    (i, j) pairs of the words occurring exactly once in a[alo:ahi] and once in b[blo:bhi]
+    that form the longest sequence increasing on both sides.
+    """
+    positions: Dict[int, int] = {}
+    for i in range(alo, ahi):
+        positions[a[i]] = -1 if a[i] in positions else i
+    matched: Dict[int, int] = {}
+    for j in range(blo, bhi):
+        if positions.get(b[j], -1) >= 0:
+            matched[b[j]] = -1 if b[j] in matched else j
+    pairs = sorted((positions[token], j) for token, j in matched.items() if j >= 0)
+    if not pairs:
+        return []
+    # Patience sorting on the b positions: tails[k] is the smallest last j of an increasing run of length k + 1
+    tails: List[int] = []
+    tail_index: List[int] = []
+    previous = [-1] * len(pairs)
+    for index, (_, j) in enumerate(pairs):
+        k = bisect_left(tails, j)
+        if k:
+            previous[index] = tail_index[k - 1]
+        if k == len(tails):
+            tails.append(j)
+            tail_index.append(index)
+        else:
+            tails[k] = j
+            tail_index[k] = index
+    run = []
+    index = tail_index[-1]
+    while index >= 0:
+        run.append(pairs[index])
+        index = previous[index]
+    return run[::-1]
+
+
+def _matching_blocks(a, b, time_limit: float) -> List[Tuple[int, int, int]]:
+    """(i, j, size) blocks of equal words in a and b, in increasing order, within the work budget."""
+    budget = DIFF_WORK_PER_TOKEN * (len(a) + len(b))
+    deadline = time.perf_counter() + time_limit
+    blocks: List[Tuple[int, int, int]] = []
+    regions = [(0, len(a), 0, len(b))]
+    while regions:
+        alo, ahi, blo, bhi = regions.pop()
+        # Words shared at both ends of the region are matched without counting anything
+        start = alo
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            alo += 1
+            blo += 1
+        if alo > start:
+            blocks.append((start, blo - (alo - start), alo - start))
+        end = ahi
+        while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+        if ahi < end:
+            blocks.append((ahi, bhi, end - ahi))
+        if alo == ahi or blo == bhi:
+            continue
+        budget -= (ahi - alo) + (bhi - blo)
+        if budget < 0 or time.perf_counter() > deadline:
+            continue  # out of budget: the region stays one replaced block
+        anchors = _unique_anchors(a, b, alo, ahi, blo, bhi)
+        if anchors:
+            for i, j in anchors:
+                blocks.append((i, j, 1))
+                regions.append((alo, i, blo, j))
+                alo, blo = i + 1, j + 1
+            regions.append((alo, ahi, blo, bhi))
+        elif (ahi - alo) * (bhi - blo) <= DIFF_SMALL_REGION:
+            matcher = SequenceMatcher(None, a[alo:ahi], b[blo:bhi], autojunk=False)
+            blocks.extend((alo + i, blo + j, size) for i, j, size in matcher.get_matching_blocks() if size)
+    blocks.sort()
+    # Merge adjacent blocks (an anchor and the words trimmed around it) into one
+    merged: List[Tuple[int, int, int]] = []
+    for i, j, size in blocks:
+        if merged and merged[-1][0] + merged[-1][2] == i and merged[-1][1] + merged[-1][2] == j:
+            merged[-1] = (merged[-1][0], merged[-1][1], merged[-1][2] + size)
+        else:
+            merged.append((i, j, size))
+    return merged
+
+
+def diff_tokens(a: Sequence[str], b: Sequence[str], time_limit: Optional[float] = None) -> List[Opcode]:
+    """
+    Opcodes turning token list a into token list b.
+    Args:
+        a (list): Tokens of the first text (e.g. its words).
+        b (list): Tokens of the second text.
+        time_limit (float): Seconds before the remaining gaps are reported as whole replaced
+            blocks (defaults to DIFF_TIME_LIMIT).
+    Returns:
+        list: ("equal" | "replace" | "delete" | "insert", i1, i2, j1, j2) tuples covering both
+        lists in order, as SequenceMatcher.get_opcodes returns them.
+    """
+    time_limit = DIFF_TIME_LIMIT if time_limit is None else time_limit
+    a_ids, b_ids = intern_tokens(a, b)
+    opcodes: List[Opcode] = []
+    i = j = 0
+    for bi, bj, size in _matching_blocks(a_ids, b_ids, time_limit) + [(len(a), len(b), 0)]:
+        if i < bi and j < bj:
+            opcodes.append(("replace", i, bi, j, bj))
+        elif i < bi:
+            opcodes.append(("delete", i, bi, j, bj))
+        elif j < bj:
+            opcodes.append(("insert", i, bi, j, bj))
+        if size:
+            opcodes.append(("equal", bi, bi + size, bj, bj + size))
+        i, j = bi + size, bj + size
+    return opcodes
@@ -1,18 +1,35 @@
 import os
 import re
-from typing import Dict, List, Tuple, Any
-from datetime import datetime
-
-try:
-    import fitz  # PyMuPDF
-    PYMUPDF_AVAILABLE = True
-except Exception:
-    PYMUPDF_AVAILABLE = False
-try:
-    import pdfplumber  # type: ignore
-    PDFPLUMBER_AVAILABLE = True
-except Exception:
-    PDFPLUMBER_AVAILABLE = False
+import sys
+import bisect
+import io
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Tuple, Any, Optional
+from urllib.parse import unquote
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.pdf_page_model import PdfDocumentModel, load_pdf_model  # noqa: E402
+from common.pdf_content_stream import count_image_operators  # noqa: E402
+from common.pdf_raw_scan import scan_pdf_images  # noqa: E402
+from common.instrumentation import stage, traced  # noqa: E402
+from common.image_hashes import hamming_distances, hash_image_files, hash_images  # noqa: E402
+from common.image_placements import load_placement_index  # noqa: E402
+from common.markdown_tokens import load_markdown_tokens  # noqa: E402
+from common.lazy_import import lazy_import, module_available  # noqa: E402
+from common.report_writer import HtmlReport, Markup, esc  # noqa: E402
+from common.result_export import export_rows, export_stem  # noqa: E402
+
+# PDF libraries are imported on first use
+fitz = lazy_import("fitz")
+PYMUPDF_AVAILABLE = module_available("fitz")
+pdfplumber = lazy_import("pdfplumber")
+PDFPLUMBER_AVAILABLE = module_available("pdfplumber")
+Image = lazy_import("PIL.Image")
+PIL_AVAILABLE = module_available("PIL")
+np = lazy_import("numpy")
 
 # Configuration - Update these paths for your files
 PDF_FILE = r"path/to/your/document.pdf"
@@ -23,6 +40,13 @@ OUTPUT_HTML = r"image_verification_report.html"
 # If MD file prefix 1_ corresponds to PDF physical page N, set PAGE_OFFSET = (N-1)
 # Example: if 1_ maps to PDF page 5 -> PAGE_OFFSET = 4
 PAGE_OFFSET = 0
+# Detect the offset instead: align the MD and PDF per-page image counts (see detect_page_offsets).
+# Piecewise detection also finds offsets that change part way through, e.g. around inserted front matter.
+AUTO_PAGE_OFFSET = False
+AUTO_PAGE_OFFSET_PIECEWISE = True
+# MD pages per alignment window (piecewise mode) and the largest offset considered (None = any)
+AUTO_OFFSET_WINDOW = 25
+AUTO_OFFSET_MAX_SHIFT = 100
 
 # Tolerance mode: consider a page "matched" if PDF has AT LEAST as many images as MD expects
 TOLERANCE_MODE = True
@@ -33,366 +57,771 @@ STATUS_STRICT_DIFFERENCE = True
 
 # Ignore MD files with zero images? (keeps them for completeness)
 IGNORE_ZERO_IMAGE_MD = True
+# Look for MD files in sub-folders of MD_FOLDER too, and threads reading MD files. Files sharing
+# a numeric prefix map to one page: the least nested file is compared, the rest are reported
+MD_RECURSIVE = True
+MD_READ_WORKERS = 8
 
 # New: count every drawn image/icon occurrence (appearance-based) when using PyMuPDF
 STRICT_PYMUPDF_APPEARANCE_MODE = True  # set False to revert to unique resource image counting
 # New: enable deeper PyPDF2 recursive /XObject + inline image scan
 ENHANCED_PYPDF2_IMAGE_SCAN = True
 
-try:
-    import PyPDF2  # type: ignore
-    PYPDF2_AVAILABLE = True
-except Exception:
-    PYPDF2_AVAILABLE = False
+# Image counting strategies, cheapest first. A page only escalates to the next
+# strategy while its result is unconfirmed: the PyMuPDF candidates disagree or
+# are all zero, or a later strategy has not yet reproduced the best count so far.
+IMAGE_COUNT_STRATEGIES = ('pymupdf', 'pypdf2_do_scan', 'pdfplumber')
+# False runs every strategy on every page (the final count is the maximum either way)
+IMAGE_COUNT_EARLY_EXIT = True
+# Worker processes for image counting (1 = in-process, 0 = CPU count) and pages per worker task
+IMAGE_COUNT_WORKERS = 1
+IMAGE_COUNT_PAGES_PER_TASK = 100
+# Also build the persisted image placement index (page, xref, bbox, digest per drawn image;
+# see common/image_placements.py) so later runs and other tools can query it without re-parsing
+IMAGE_PLACEMENT_INDEX = True
+
+# Image identity matching: check that each MD image actually appears on its PDF page
+# (perceptual hashes, see common/image_hashes.py). Needs PyMuPDF and Pillow.
+IMAGE_MATCHING = True
+# Largest hash distance (of 64 bits) at which an MD image and a PDF image count as the same picture
+IMAGE_MATCH_MAX_DISTANCE = 10
+
+# Batch mode: when DOCUMENTS is set, main() verifies every entry instead of PDF_FILE / MD_FOLDER.
+# Entry: {"pdf": ..., "md_folder": ..., optional "page_offset" (int or "auto"), "id" or "locale"}.
+# Each document gets its own report under BATCH_OUTPUT_DIR/<id>/, linked from a consolidated summary.
+DOCUMENTS: List[Dict[str, Any]] = []
+BATCH_OUTPUT_DIR = r"image_verification_reports"
+# Documents verified concurrently (worker processes; 1 = in-process, 0 = CPU count)
+BATCH_WORKERS = 0
+
+PyPDF2 = lazy_import("PyPDF2")
+PYPDF2_AVAILABLE = module_available("PyPDF2")
+
+_MD_SUFFIX = re.compile(r'\.md$', re.IGNORECASE)
+# A URL scheme (http:, data:, ...); one letter before the colon is a Windows drive instead
+_URL_SCHEME = re.compile(r'^[A-Za-z][A-Za-z0-9+.-]+:')
+_FIRST_TOKEN = re.compile(r'\S+')
+_QUERY_OR_FRAGMENT = re.compile(r'[?#].*$')
+
 
-def find_md_images(md_folder: str) -> Dict[str, List[str]]:
+class MdImage(NamedTuple):
+    name: str            # basename, as reported by find_md_images
+    src: str             # the reference as written
+    path: Optional[str]  # resolved local file (None for URLs)
+    exists: bool         # path exists on disk (False for URLs)
+
+
+def _scan_md_folder(md_folder: str, recursive: bool) -> Tuple[List[str], set]:
+    """
+    One os.scandir pass over md_folder: (MD files as sorted paths relative to it,
+    every file seen, as joined from md_folder, for existence checks).
+    """
+    md_files: List[str] = []
+    seen = set()
+    folders = [(md_folder, '')]
+    while folders:
+        folder, rel = folders.pop()
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    seen.add(entry.path)
+                    if _MD_SUFFIX.search(entry.name):
+                        md_files.append(rel + entry.name)
+                elif recursive and entry.is_dir(follow_symlinks=False):
+                    folders.append((entry.path, rel + entry.name + os.sep))
+    return sorted(md_files), seen
+
+
+def _md_file_images(md_folder: str, rel_path: str, seen: set) -> List[MdImage]:
+    """Images referenced by one MD file, with local references resolved against the file's folder."""
+    md_path = os.path.join(md_folder, rel_path)
+    images: List[MdImage] = []
+    for image in load_markdown_tokens(md_path).images:
+        cleaned = image.src.strip()
+        is_url = bool(_URL_SCHEME.match(cleaned))
+        if not is_url:
+            # Keep only the first token for local paths (drops a Markdown title)
+            first = _FIRST_TOKEN.match(cleaned)
+            cleaned = first.group() if first else ''
+        name = os.path.basename(cleaned)
+        if not name:
+            continue
+        path = None
+        exists = False
+        if not is_url:
+            target = unquote(_QUERY_OR_FRAGMENT.sub('', cleaned))
+            # A leading "/" is relative to the Markdown root, anything else to the file's folder
+            base = md_folder if target.startswith('/') else os.path.dirname(md_path)
+            path = os.path.normpath(os.path.join(base, target.lstrip('/')))
+            # Files listed by the folder scan need no stat (outside it, or differing in case: ask the OS)
+            exists = path in seen or os.path.isfile(path)
+        images.append(MdImage(name, image.src, path, exists))
+    return images
+
+
+@traced()
+def md_image_inventory(md_folder: str) -> Dict[str, List[MdImage]]:
+    """
+    Every image referenced by the MD files under md_folder, in one pass.
+    Files are found with os.scandir (sub-folders too when MD_RECURSIVE) and read in
+    batches on MD_READ_WORKERS threads; local image references are resolved and
+    checked against the files the scan found.
+    Args:
+        md_folder (str): Folder holding the MD files.
+    Returns:
+        dict: MD path relative to md_folder -> its images in order (files without images are left out).
+    """
+    md_folder = os.path.normpath(md_folder)
+    rel_paths, seen = _scan_md_folder(md_folder, MD_RECURSIVE)
+
+    def read(batch: List[str]):
+        results = []
+        for rel_path in batch:
+            try:
+                results.append((rel_path, _md_file_images(md_folder, rel_path, seen), None))
+            except Exception as e:
+                results.append((rel_path, None, e))
+        return results
+
+    workers = max(1, min(MD_READ_WORKERS, len(rel_paths)))
+    # A few batches per thread keeps the pool busy without a future per file
+    size = max(1, -(-len(rel_paths) // (workers * 4)))
+    batches = [rel_paths[i:i + size] for i in range(0, len(rel_paths), size)]
+    if workers == 1:
+        results = map(read, batches)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(read, batches))
+    inventory: Dict[str, List[MdImage]] = {}
+    for batch in results:
+        for rel_path, images, error in batch:
+            if error is not None:
+                print(f"Failed to read {rel_path}: {error}")
+            elif images:
+                inventory[rel_path] = images
+    return inventory
+
+
+@traced()
+def find_md_images(md_folder: str, missing: Optional[Dict[str, List[str]]] = None,
+                   inventory: Optional[Dict[str, List[MdImage]]] = None) -> Dict[str, List[str]]:
     """Return mapping of md filename -> list of image filenames (basename).
     Supports:
       - Markdown images: ![alt](path/to/img.png "optional")
       - HTML <img> tags: <img src="path/to/img.png" alt="..."> (case-insensitive)
+    Images inside fenced code blocks are not counted. MD files in sub-folders are keyed
+    by their path relative to md_folder (see md_image_inventory).
+    missing: optional dict filled with md filename -> local image references whose file does not exist.
+    inventory: md_image_inventory(md_folder) result to reuse instead of reading the folder again.
     """
+    if inventory is None:
+        inventory = md_image_inventory(md_folder)
     files_with_images: Dict[str, List[str]] = {}
-    for fname in sorted(os.listdir(md_folder)):
-        if not fname.lower().endswith('.md'):
-            continue
-        path = os.path.join(md_folder, fname)
-        try:
-            with open(path, encoding='utf-8') as f:
-                content = f.read()
-        except Exception as e:
-            print(f"Failed to read {fname}: {e}")
-            continue
-
-        # Markdown image syntax
-        md_matches = re.findall(r'!\[[^\]]*\]\(([^)]+)\)', content)
-
-        # HTML <img> tag src= (handles single/double quotes, extra attributes)
-        html_matches = re.findall(
-            r'<img\b[^>]*?\bsrc\s*=\s*["\']([^"\']+)["\']',
-            content,
-            flags=re.IGNORECASE
-        )
-
-        combined: List[str] = []
-        for src in md_matches + html_matches:
-            # Strip any trailing title (Markdown) or fragment/query if needed
-            cleaned = src.strip()
-            # Remove optional title after space (Markdown)
-            if ' ' in cleaned and cleaned.startswith(('http://', 'https://')) is False:
-                # Keep only the first token for local paths
-                cleaned = cleaned.split()[0]
-            # Normalize to basename
-            basename = os.path.basename(cleaned)
-            if basename and basename not in combined:
-                combined.append(basename)
-
-        if combined:
-            files_with_images[fname] = combined
+    for fname, images in inventory.items():
+        # dict keys dedupe in first-seen order
+        files_with_images[fname] = list(dict.fromkeys(image.name for image in images))
+        if missing is not None:
+            gone = list(dict.fromkeys(image.src for image in images if image.path and not image.exists))
+            if gone:
+                missing[fname] = gone
     return files_with_images
 
-def map_md_files_to_pages(md_images: Dict[str, List[str]]) -> Dict[int, Dict[str, Any]]:
-    """Map MD numeric prefix (e.g., 1_intro.md) to its image count applying PAGE_OFFSET."""
+@traced()
+def map_md_files_to_pages(md_images: Dict[str, List[str]],
+                          offsets: Optional[List[Tuple[int, int]]] = None,
+                          collisions: Optional[Dict[int, List[str]]] = None) -> Dict[int, Dict[str, Any]]:
+    """Map MD numeric prefix (e.g., 1_intro.md) to its image count applying PAGE_OFFSET.
+    offsets: optional (first prefix, offset) segments in prefix order, as returned by
+    detect_page_offsets; each prefix uses the last segment starting at or before it
+    (the first segment also covers smaller prefixes). Defaults to PAGE_OFFSET throughout.
+    collisions: optional dict filled with page -> MD files left out because another file maps
+    to the same page (e.g. 1_intro.md and archive/1_intro.md); the least nested file is kept,
+    the first in path order among equally nested ones."""
+    offsets = offsets or [(0, PAGE_OFFSET)]
+    starts = [first for first, _offset in offsets]
     page_map: Dict[int, Dict[str, Any]] = {}
     prefix_re = re.compile(r'^(\d+)_')
     for fname, imgs in md_images.items():
-        m = prefix_re.match(fname)
+        m = prefix_re.match(os.path.basename(fname))
         if not m:
             continue  # skip files without numeric prefix
-        page = int(m.group(1)) + PAGE_OFFSET
+        prefix = int(m.group(1))
+        page = prefix + offsets[max(0, bisect.bisect_right(starts, prefix) - 1)][1]
         if IGNORE_ZERO_IMAGE_MD and len(imgs) == 0:
             continue
-        page_map[page] = {
+        entry = {
             'md_file': fname,
+            'md_prefix': prefix,
             'md_image_count': len(imgs),
             'md_images': imgs,
         }
+        current = page_map.get(page)
+        if current is not None:
+            if fname.count(os.sep) < current['md_file'].count(os.sep):
+                page_map[page], entry = entry, current
+            if collisions is not None:
+                collisions.setdefault(page, []).append(entry['md_file'])
+            continue
+        page_map[page] = entry
     return page_map
 
-def count_pdf_images(pdf_path: str, verbose: bool = False) -> Tuple[Dict[int, int], int, str]:
+
+def _standardize(values):
+    """Zero-mean, unit-variance copy (all zeros when the values are constant)."""
+    centered = values - values.mean()
+    std = centered.std()
+    return centered / std if std > 0 else centered
+
+
+def _lag_scores(pdf_rows, md_rows) -> Tuple[Any, Any]:
     """
-    Robust image occurrence counter per 1-based page index.
-    Tries PyMuPDF heuristics first (if available), then a PyPDF2 fallback that:
-      - counts /Name Do occurrences in content streams,
-      - inspects XObject entries and recursively counts Form XObjects' internal images,
-      - counts inline images (BI...EI).
-    Returns (page_counts_dict, total_images, method_used_string).
+    Cross-correlation of each MD row against its PDF row at every lag, all rows in one FFT pass.
+    Returns:
+        tuple: (scores, lags); scores[r, i] is sum_k md_rows[r, k] * pdf_rows[r, k + lags[i]].
     """
-    if not os.path.exists(pdf_path):
-        print(f"PDF not found: {pdf_path}")
-        return {}, 0, 'none'
+    size = pdf_rows.shape[1] + md_rows.shape[1] - 1
+    nfft = 1 << max(0, (size - 1).bit_length())
+    spectrum = np.fft.rfft(pdf_rows, nfft, axis=1) * np.conj(np.fft.rfft(md_rows, nfft, axis=1))
+    lags = np.arange(nfft)
+    lags[lags >= (nfft + 1) // 2] -= nfft  # circular: negative lags are stored at the end
+    return np.fft.irfft(spectrum, nfft, axis=1), lags
 
-    page_counts: Dict[int, int] = {}
-    methods_used = []
 
-    # --- Helper: PyPDF2 page-level robust counter (counts Do occurrences, inline images, recurses Forms) ---
-    def _count_images_pypdf2_for_page(reader, page_index: int) -> int:
+def _best_offset(scores, offsets, preferred: int) -> Optional[int]:
+    """
+    Offset with the highest positive score within AUTO_OFFSET_MAX_SHIFT (None if there is
+    none); ties favour the offset closest to preferred.
+    """
+    allowed = np.ones(len(offsets), dtype=bool)
+    if AUTO_OFFSET_MAX_SHIFT is not None:
+        allowed &= np.abs(offsets) <= AUTO_OFFSET_MAX_SHIFT
+    candidates = np.where(allowed, scores, -np.inf)
+    best = candidates.max() if len(candidates) else -np.inf
+    if not best > 1e-9:
+        return None
+    tied = np.flatnonzero(candidates >= best - 1e-9)
+    return int(offsets[tied[np.argmin(np.abs(offsets[tied] - preferred))]])
+
+
+def _window_offsets(md_z, pdf_z, lo: int, starts: List[int], window: int, initial: int) -> List[int]:
+    """Best offset of each AUTO_OFFSET_WINDOW-page MD window; unclear windows keep the previous offset."""
+    # Each window is only correlated with the PDF pages it can reach, so the FFTs stay window-sized
+    shift = AUTO_OFFSET_MAX_SHIFT if AUTO_OFFSET_MAX_SHIFT is not None else len(pdf_z) + len(md_z)
+    span = window + 2 * shift
+    md_rows = np.zeros((len(starts), window))
+    pdf_rows = np.zeros((len(starts), span))
+    firsts = []
+    for i, start in enumerate(starts):
+        part = md_z[start:start + window]
+        md_rows[i, :len(part)] = part
+        first = max(0, lo + start - 1 - shift)  # 0-based PDF index of the slice start
+        part = pdf_z[first:first + span]
+        pdf_rows[i, :len(part)] = part
+        firsts.append(first)
+    scores, lags = _lag_scores(pdf_rows, md_rows)
+    result = []
+    current = initial
+    for i, start in enumerate(starts):
+        # MD prefix lo + start + k meets PDF page firsts[i] + k + lag + 1
+        offset = _best_offset(scores[i], lags + firsts[i] + 1 - (lo + start), current)
+        current = offset if offset is not None else current
+        result.append(current)
+    return result
+
+
+@traced()
+def detect_page_offsets(md_page_map: Dict[int, Dict[str, Any]], pdf_page_counts: Dict[int, int],
+                        piecewise: Optional[bool] = None) -> List[Tuple[int, int]]:
+    """
+    Find the MD prefix -> PDF page offset by aligning the two per-page image count vectors.
+    Both vectors are standardized and cross-correlated at every offset with one FFT; the
+    best-scoring offset wins (ties go to PAGE_OFFSET, then the smallest change). In
+    piecewise mode the MD pages are also split into AUTO_OFFSET_WINDOW-page windows,
+    aligned together in one batched FFT; a window whose best offset differs from its
+    predecessor's starts a new segment, and the boundary is placed at the MD page where
+    the counts on both sides agree best. A single window whose offset differs from both
+    neighbours (a change point inside it) is not a segment of its own. Windows without a clear alignment (e.g. no
+    images) keep the previous offset.
+    Args:
+        md_page_map (dict): Output of map_md_files_to_pages (any offsets; prefixes are used).
+        pdf_page_counts (dict): 1-based page -> image count, from count_pdf_images.
+        piecewise (bool): Detect offset changes (defaults to AUTO_PAGE_OFFSET_PIECEWISE).
+    Returns:
+        list: (first MD prefix, offset) segments in prefix order, for map_md_files_to_pages;
+        [(0, PAGE_OFFSET)] when the counts do not determine an offset.
+    """
+    piecewise = AUTO_PAGE_OFFSET_PIECEWISE if piecewise is None else piecewise
+    md_counts = {entry['md_prefix']: entry['md_image_count'] for entry in md_page_map.values()}
+    pdf_counts = {page: count for page, count in pdf_page_counts.items() if page >= 1}
+    if not md_counts or not pdf_counts:
+        return [(0, PAGE_OFFSET)]
+    lo, hi = min(md_counts), max(md_counts)
+    md_vec = np.zeros(hi - lo + 1)
+    md_vec[np.array(list(md_counts)) - lo] = list(md_counts.values())
+    pdf_vec = np.zeros(max(pdf_counts))
+    pdf_vec[np.array(list(pdf_counts)) - 1] = list(pdf_counts.values())
+    md_z, pdf_z = _standardize(md_vec), _standardize(pdf_vec)
+
+    scores, lags = _lag_scores(pdf_z[None, :], md_z[None, :])
+    # MD prefix lo + k meets PDF page k + lag + 1
+    global_offset = _best_offset(scores[0], lags + 1 - lo, PAGE_OFFSET)
+    if global_offset is None:
+        return [(0, PAGE_OFFSET)]
+    window = max(1, AUTO_OFFSET_WINDOW)
+    if not piecewise or len(md_z) <= window:
+        return [(lo, global_offset)]
+
+    starts = list(range(0, len(md_z), window))
+    offsets = _window_offsets(md_z, pdf_z, lo, starts, window, global_offset)
+
+    def agreement(offset: int):
+        """Per-MD-page agreement of the raw counts at the given offset (minus the squared difference)."""
+        pages = np.arange(len(md_vec)) + lo + offset - 1
+        inside = (pages >= 0) & (pages < len(pdf_vec))
+        return -(md_vec - np.where(inside, pdf_vec[np.clip(pages, 0, len(pdf_vec) - 1)], 0.0)) ** 2
+
+    # Runs of windows sharing an offset. A single window whose offset differs from both neighbours
+    # straddles a change point and scores an in-between offset; it is dropped, so the split between
+    # its neighbours is refined over all three windows
+    runs: List[List[int]] = []  # [offset, first window, last window]
+    for i, offset in enumerate(offsets):
+        if runs and runs[-1][0] == offset:
+            runs[-1][2] = i
+        else:
+            runs.append([offset, i, i])
+    kept: List[List[int]] = []
+    for k, run in enumerate(runs):
+        if 0 < k < len(runs) - 1 and run[1] == run[2]:
+            continue
+        if kept and kept[-1][0] == run[0]:
+            kept[-1][2] = run[2]  # e.g. offsets 0, 2, 0: the middle window was noise
+        else:
+            kept.append(run)
+
+    segments = [(lo, kept[0][0])]
+    for (before, _first, last), (after, first_window, _last) in zip(kept, kept[1:]):
+        # Split anywhere from the last window of `before` to the first window of `after`
+        region = slice(starts[last], min(len(md_z), starts[first_window] + window))
+        left, right = agreement(before)[region], agreement(after)[region]
+        totals = np.concatenate(([0.0], np.cumsum(left))) + (right.sum() - np.concatenate(([0.0], np.cumsum(right))))
+        # Pages whose counts agree under both offsets leave several splits tied: take the middle one
+        tied = np.flatnonzero(totals >= totals.max() - 1e-9)
+        first = lo + region.start + int(tied[len(tied) // 2])
+        # A split at or before an earlier boundary replaces that segment
+        while segments and segments[-1][0] >= first:
+            segments.pop()
+        if not segments:
+            segments = [(lo, after)]
+        elif segments[-1][1] != after:
+            segments.append((first, after))
+    return segments
+
+
+def format_page_offsets(offsets: List[Tuple[int, int]]) -> str:
+    """Readable form of offset segments, e.g. "+0 from 1_, +2 from 14_" (just "+2" for one segment)."""
+    if len(offsets) == 1:
+        return f"{offsets[0][1]:+d}"
+    return ", ".join(f"{offset:+d} from {first}_" for first, offset in offsets)
+
+def _resolve(obj):
+    """Follow an indirect reference (resource dictionaries are often indirect objects)."""
+    try:
+        return obj.get_object()
+    except Exception:
+        return obj
+
+
+def _stream_data(contents):
+    """Yield the decoded data of a content stream or of each stream in a /Contents array."""
+    if not contents:
+        return
+    for stream in (contents if isinstance(contents, list) else [contents]):
         try:
-            page = reader.pages[page_index - 1]
+            yield stream.get_data()
         except Exception:
-            return 0
+            try:
+                yield stream.get_object().get_data()
+            except Exception:
+                pass
 
-        # build content bytes
-        content_bytes = b''
+
+def _count_images_in_xobj(ref, memo: Dict[Any, int], ancestors: Tuple = ()) -> int:
+    """
+    Images painted by one invocation of an XObject: 1 for an image, or the images
+    of a Form's nested XObjects plus the inline images in its own stream.
+    Counts of indirect objects are memoized in `memo` by (object number, generation),
+    so a Form reused on many pages (a logo, a header) is walked once per document.
+    """
+    idnum = getattr(ref, 'idnum', None)
+    key = (idnum, getattr(ref, 'generation', 0)) if idnum is not None else None
+    if key is not None:
+        if key in memo:
+            return memo[key]
+        if key in ancestors:
+            return 0  # a Form drawing itself
+    xobj = _resolve(ref)
+
+    try:
+        subtype = xobj.get('/Subtype')
+    except Exception:
+        subtype = None
+
+    total = 0
+    # direct image XObject
+    if subtype == '/Image':
+        total = 1
+
+    # Form XObject: check its internal XObjects + inline images inside its stream
+    elif subtype == '/Form':
+        # nested XObjects inside the form
         try:
-            contents = page.get_contents()
+            fres = _resolve(xobj.get('/Resources')) or {}
+            fnested = _resolve(fres.get('/XObject')) or {}
+            for n, v in getattr(fnested, 'items', lambda: [])():
+                total += _count_images_in_xobj(v, memo, ancestors + (key,))
         except Exception:
-            contents = None
-        if contents:
-            if isinstance(contents, list):
-                for c in contents:
-                    try:
-                        content_bytes += c.get_data()
-                    except Exception:
-                        try:
-                            content_bytes += c.get_object().get_data()
-                        except Exception:
-                            pass
-            else:
+            pass
+        # inline images inside the form's own stream(s)
+        total += count_image_operators(_stream_data(xobj))[1]
+
+    if key is not None:
+        memo[key] = total
+    return total
+
+
+def _count_images_pypdf2_for_page(reader, page_index: int, form_memo: Optional[Dict[Any, int]] = None) -> int:
+    """
+    PyPDF2 page-level robust counter (counts Do occurrences, inline images, recurses Forms).
+    Pass the same `form_memo` dict for every page of a document to reuse Form XObject counts.
+    """
+    try:
+        page = reader.pages[page_index - 1]
+    except Exception:
+        return 0
+
+    # scan the content stream(s) once for Do operators and inline images (BI ... ID ... EI)
+    try:
+        contents = page.get_contents()
+    except Exception:
+        contents = None
+    do_names, inline_count = count_image_operators(_stream_data(contents))
+
+    # build XObject mapping (name -> object)
+    try:
+        resources = _resolve(page.get('/Resources')) or {}
+        xobjects = _resolve(resources.get('/XObject')) or {}
+    except Exception:
+        xobjects = {}
+    name_to_xobj = {}
+    try:
+        for name, xo in getattr(xobjects, 'items', lambda: [])():
+            # name might be a NameObject like '/Im0' -> str(name) -> '/Im0'
+            try:
+                nstr = str(name)
+            except Exception:
                 try:
-                    content_bytes += contents.get_data()
+                    nstr = name.decode('latin1') if isinstance(name, bytes) else str(name)
                 except Exception:
-                    try:
-                        content_bytes += contents.get_object().get_data()
-                    except Exception:
-                        pass
+                    nstr = str(name)
+            if nstr.startswith('/'):
+                nstr = nstr[1:]
+            # keep the indirect reference: it is the memo key of Form XObjects
+            name_to_xobj[nstr] = xo
+    except Exception:
+        name_to_xobj = {}
 
-        # inline images (BI ... EI)
-        inline_imgs = re.findall(br'\bBI\b.*?\bEI\b', content_bytes, flags=re.DOTALL)
-        inline_count = len(inline_imgs)
+    total = inline_count
+    # for every Do occurrence, add images inside that XObject invocation
+    for nm in do_names:
+        xobj = name_to_xobj.get(nm)
+        if xobj is not None and _resolve(xobj):
+            total += _count_images_in_xobj(xobj, form_memo if form_memo is not None else {})
+        else:
+            # If referenced name not found in XObject map, still count as 1 usage (best-effort)
+            total += 1
 
-        # find Do uses: "/Name Do"
-        do_names = re.findall(br'/([^\s/]+)\s+Do', content_bytes)
+    return total
 
-        # build XObject mapping (name -> object)
-        try:
-            resources = page.get('/Resources') or {}
-        except Exception:
-            resources = {}
-        xobjects = resources.get('/XObject') or {}
-        name_to_xobj = {}
+
+def _count_images_pdfplumber_for_page(pdf, page_index: int) -> int:
+    """Number of image objects pdfplumber places on a page."""
+    return len(getattr(pdf.pages[page_index - 1], 'images', []) or [])
+
+
+def _model_page_candidates(page) -> List[Tuple[str, int]]:
+    """PyMuPDF image counts of one page of the shared page model."""
+    return [
+        # 1) placement-based image info (every drawn occurrence)
+        ('pymupdf.image_info', len(page.image_info)),
+        # 2) image blocks from the text extraction
+        ('pymupdf.rawdict_blocks', page.image_block_count),
+        # 3) unique resource-based images - helpful but dedupes reused images
+        ('pymupdf.unique_images', len(page.images)),
+    ]
+
+
+def _fitz_page_candidates(page) -> List[Tuple[str, int]]:
+    """The same counts as _model_page_candidates, read from an open fitz page."""
+    blocks = page.get_text("blocks", flags=fitz.TEXT_PRESERVE_IMAGES)
+    return [
+        ('pymupdf.image_info', len(page.get_image_info())),
+        ('pymupdf.rawdict_blocks', sum(1 for blk in blocks if blk[6] == 1)),
+        ('pymupdf.unique_images', len(page.get_images(full=True))),
+    ]
+
+
+class _ImageCounter:
+    """
+    Runs the IMAGE_COUNT_STRATEGIES chain over pages of one PDF. Each strategy
+    is opened on first use and kept open until close(); per-strategy time and
+    pages counted are accumulated in `timings`.
+    """
+
+    def __init__(self, pdf_path: str, verbose: bool = False, model: Optional[PdfDocumentModel] = None,
+                 use_page_model: bool = True, strategies=None, early_exit: Optional[bool] = None):
+        self.pdf_path = pdf_path
+        self.verbose = verbose
+        self.model = model
+        # Without the page model the PyMuPDF strategy reads pages straight from an open document
+        self.use_page_model = use_page_model
+        self.strategies = tuple(IMAGE_COUNT_STRATEGIES if strategies is None else strategies)
+        self.early_exit = IMAGE_COUNT_EARLY_EXIT if early_exit is None else early_exit
+        self.timings: Dict[str, Dict[str, float]] = {}
+        self._counters: Dict[str, Any] = {}
+        self._closers: List[Any] = []
+
+    def _timing(self, name: str) -> Dict[str, float]:
+        return self.timings.setdefault(name, {"seconds": 0.0, "pages": 0})
+
+    def counter(self, name: str):
+        """(page_count, count_page) for a strategy, or None if unavailable; count_page(p) -> (count, consistent)."""
+        if name not in self._counters:
+            start = time.perf_counter()
+            try:
+                with stage(f"image_verification.count_pdf_images.open.{name}"):
+                    self._counters[name] = self._open(name)
+            except Exception as e:
+                self._counters[name] = None
+                if self.verbose:
+                    print(f"[count_pdf_images] {name} attempt failed: {e}")
+            self._timing(name)["seconds"] += time.perf_counter() - start
+        return self._counters[name]
+
+    def _open(self, name: str):
+        if name == 'pymupdf' and PYMUPDF_AVAILABLE:
+            if self.use_page_model:
+                doc = self.model = self.model if self.model is not None else load_pdf_model(self.pdf_path)
+                pages = {page.number: page for page in doc}
+                return len(doc), lambda p: self._pymupdf_result(p, _model_page_candidates(pages[p]) if p in pages else [])
+            doc = fitz.open(self.pdf_path)
+            self._closers.append(doc.close)
+            return doc.page_count, lambda p: self._pymupdf_result(p, _fitz_page_candidates(doc[p - 1]))
+        if name == 'pypdf2_do_scan' and PYPDF2_AVAILABLE:
+            reader = PyPDF2.PdfReader(self.pdf_path)
+            form_memo: Dict[Any, int] = {}
+            return len(reader.pages), lambda p: (
+                self._safe_count(lambda r, i: _count_images_pypdf2_for_page(r, i, form_memo), reader, p), True)
+        if name == 'pdfplumber' and PDFPLUMBER_AVAILABLE:
+            pdf = pdfplumber.open(self.pdf_path)
+            self._closers.append(pdf.close)
+            return len(pdf.pages), lambda p: (self._safe_count(_count_images_pdfplumber_for_page, pdf, p), True)
+        return None
+
+    def _pymupdf_result(self, p: int, candidates: List[Tuple[str, int]]) -> Tuple[int, bool]:
+        """Best PyMuPDF candidate for a page, and whether all candidates agree."""
+        if self.verbose:
+            print(f"[count_pdf_images] page {p}: pymupdf candidates={candidates}")
+        values = [c for _m, c in candidates] or [0]
+        return max(values), len(set(values)) == 1
+
+    @staticmethod
+    def _safe_count(func, handle, p: int) -> int:
         try:
-            for name, xo in getattr(xobjects, 'items', lambda: [])():
-                # name might be a NameObject like '/Im0' -> str(name) -> '/Im0'
-                try:
-                    nstr = str(name)
-                except Exception:
-                    try:
-                        nstr = name.decode('latin1') if isinstance(name, bytes) else str(name)
-                    except Exception:
-                        nstr = str(name)
-                if nstr.startswith('/'):
-                    nstr = nstr[1:]
-                try:
-                    xo_obj = xo.get_object()
-                except Exception:
-                    xo_obj = xo
-                name_to_xobj[nstr] = xo_obj
+            return func(handle, p)
         except Exception:
-            name_to_xobj = {}
+            return 0
+
+    def page_total(self) -> int:
+        """Page count from the first strategy that opens (0 if none does)."""
+        for name in self.strategies:
+            counter = self.counter(name)
+            if counter is not None:
+                return counter[0]
+        return 0
 
-        # recursive counter for an XObject invoked once
-        def _count_images_in_xobj(xobj, visited) -> int:
+    def count(self, pages) -> Dict[int, int]:
+        """Per-page counts for the given 1-based page numbers."""
+        page_counts: Dict[int, int] = {}
+        for p in pages:
+            best = None
+            settled = False
+            for name in self.strategies:
+                if settled and self.early_exit:
+                    break
+                counter = self.counter(name)
+                if counter is None:
+                    continue
+                start = time.perf_counter()
+                value, consistent = counter[1](p)
+                timing = self._timing(name)
+                timing["seconds"] += time.perf_counter() - start
+                timing["pages"] += 1
+                if best is None:
+                    # A lone result is trusted when it is non-zero and internally consistent
+                    settled = consistent and value > 0
+                    best = value
+                else:
+                    # A later strategy confirms the page by reproducing the best count so far
+                    settled = value == best
+                    best = max(best, value)
+            page_counts[p] = best or 0
+            if self.verbose:
+                print(f"[count_pdf_images] page {p}: chosen {page_counts[p]}")
+        return page_counts
+
+    def close(self):
+        for close in self._closers:
             try:
-                oid = id(xobj)
-                if oid in visited:
-                    return 0
-                visited.add(oid)
+                close()
             except Exception:
                 pass
+        self._closers = []
+        self._counters = {}
 
-            try:
-                subtype = xobj.get('/Subtype')
-            except Exception:
-                subtype = None
 
-            # direct image XObject
-            if subtype == '/Image':
-                return 1
+def _pdf_page_total(pdf_path: str, model: Optional[PdfDocumentModel] = None) -> int:
+    """Page count without parsing any page content."""
+    if model is not None:
+        return len(model)
+    try:
+        if PYMUPDF_AVAILABLE:
+            with fitz.open(pdf_path) as doc:
+                return doc.page_count
+        if PYPDF2_AVAILABLE:
+            return len(PyPDF2.PdfReader(pdf_path).pages)
+    except Exception:
+        pass
+    return 0
 
-            # Form XObject: check its internal XObjects + inline images inside its stream
-            if subtype == '/Form':
-                total = 0
-                # nested XObjects inside the form
-                try:
-                    fres = xobj.get('/Resources') or {}
-                    fnested = fres.get('/XObject') or {}
-                    for n, v in getattr(fnested, 'items', lambda: [])():
-                        try:
-                            vobj = v.get_object()
-                        except Exception:
-                            vobj = v
-                        total += _count_images_in_xobj(vobj, visited)
-                except Exception:
-                    pass
-                # inline images inside the form's own stream(s)
-                try:
-                    form_data = xobj.get_data()
-                    total += len(re.findall(br'\bBI\b.*?\bEI\b', form_data, flags=re.DOTALL))
-                except Exception:
-                    pass
-                return total
 
-            return 0
+# Per-process counter of a count_pdf_images worker pool
+_WORKER_COUNTER: Optional[_ImageCounter] = None
 
-        total = inline_count
-        # for every Do occurrence, add images inside that XObject invocation
-        for nm_bytes in do_names:
-            try:
-                nm = nm_bytes.decode('latin1')
-            except Exception:
-                nm = str(nm_bytes)
-            xobj = name_to_xobj.get(nm)
-            if xobj:
-                total += _count_images_in_xobj(xobj, set())
-            else:
-                # If referenced name not found in XObject map, still count as 1 usage (best-effort)
-                total += 1
 
-        return total
+def _init_count_worker(pdf_path: str, strategies, early_exit: bool, verbose: bool):
+    """Pool initializer: open the PDF with PyMuPDF and PyPDF2 once per worker process."""
+    global _WORKER_COUNTER
+    _WORKER_COUNTER = _ImageCounter(pdf_path, verbose, use_page_model=False,
+                                    strategies=strategies, early_exit=early_exit)
+    for name in ('pymupdf', 'pypdf2_do_scan'):
+        if name in strategies:
+            _WORKER_COUNTER.counter(name)
 
-    # --- PyMuPDF heuristics (appearance-oriented) ---
-    pymupdf_counts: Dict[int, int] = {}
-    pymupdf_methods_used = []
-    if PYMUPDF_AVAILABLE:
-        try:
-            doc = fitz.open(pdf_path)
-            for i, page in enumerate(doc, start=1):
-                candidates = []
 
-                # 1) direct page.get_image_info (if available)
-                try:
-                    if hasattr(page, 'get_image_info'):
-                        try:
-                            info = page.get_image_info(xrefs=True)
-                            cnt = len(info) if info is not None else 0
-                            candidates.append(('pymupdf.image_info', cnt))
-                        except Exception:
-                            pass
-                except Exception:
-                    pass
+def _count_page_range(first: int, last: int) -> Tuple[Dict[int, int], Dict[str, Dict[str, float]]]:
+    """Worker task: counts for pages first..last and the time spent on them."""
+    counts = _WORKER_COUNTER.count(range(first, last + 1))
+    timings, _WORKER_COUNTER.timings = _WORKER_COUNTER.timings, {}
+    return counts, timings
 
-                # 2) page.get_text('rawdict') block scan (counts image blocks)
-                try:
-                    raw = page.get_text("rawdict")
-                    blocks = raw.get("blocks", []) if isinstance(raw, dict) else []
-                    cnt = sum(1 for blk in blocks if blk.get("type") == 1)
-                    candidates.append(('pymupdf.rawdict_blocks', cnt))
-                except Exception:
-                    pass
 
-                # 3) displaylist -> textpage -> rawdict (deeper)
-                try:
-                    dlist = page.get_displaylist()
-                    tp = dlist.get_textpage()
-                    # either extractRAWDICT or get_text("rawdict") of textpage - fallback to get_text
-                    try:
-                        raw2 = tp.extractRAWDICT()
-                        blocks2 = raw2.get("blocks", []) if isinstance(raw2, dict) else []
-                        cnt2 = sum(1 for blk in blocks2 if blk.get("type") == 1)
-                    except Exception:
-                        raw2 = tp.get_text("rawdict")
-                        blocks2 = raw2.get("blocks", []) if isinstance(raw2, dict) else []
-                        cnt2 = sum(1 for blk in blocks2 if blk.get("type") == 1)
-                    candidates.append(('pymupdf.displaylist_blocks', cnt2))
-                except Exception:
-                    pass
+def _count_pages_parallel(pdf_path: str, page_total: int, workers: int,
+                          timings: Dict[str, Dict[str, float]], verbose: bool = False) -> Dict[int, int]:
+    """Split the pages into IMAGE_COUNT_PAGES_PER_TASK ranges and count them on a process pool."""
+    firsts = list(range(1, page_total + 1, IMAGE_COUNT_PAGES_PER_TASK))
+    lasts = [min(first + IMAGE_COUNT_PAGES_PER_TASK - 1, page_total) for first in firsts]
+    page_counts: Dict[int, int] = {}
+    # Spawned, not forked: a forked worker would inherit (and gradually copy) the parent's parsed models
+    with ProcessPoolExecutor(max_workers=min(workers, len(firsts)), mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_count_worker,
+                             initargs=(pdf_path, tuple(IMAGE_COUNT_STRATEGIES), IMAGE_COUNT_EARLY_EXIT, verbose)) as pool:
+        # map() yields in submission order, so the merge is the same however the ranges finish
+        for counts, task_timings in pool.map(_count_page_range, firsts, lasts):
+            page_counts.update(counts)
+            for name, timing in task_timings.items():
+                merged = timings.setdefault(name, {"seconds": 0.0, "pages": 0})
+                merged["seconds"] += timing["seconds"]
+                merged["pages"] += timing["pages"]
+    return page_counts
 
-                # 4) unique resource-based images (page.get_images(full=True)) - helpful but dedupes reused images
-                try:
-                    imgs = page.get_images(full=True)
-                    cnt_unique = len(imgs) if imgs is not None else 0
-                    candidates.append(('pymupdf.unique_images', cnt_unique))
-                except Exception:
-                    pass
-
-                # choose best candidate (max) for this page (0 if none)
-                best_count = 0
-                best_methods = []
-                for m, c in candidates:
-                    if c > best_count:
-                        best_count = c
-                        best_methods = [m]
-                    elif c == best_count:
-                        best_methods.append(m)
-                pymupdf_counts[i] = best_count
-                pymupdf_methods_used.append((i, best_methods, candidates))
-            doc.close()
-            methods_used.append('pymupdf')
-        except Exception as e:
-            if verbose:
-                print(f"[count_pdf_images] pymupdf attempt failed: {e}")
 
-    # --- PyPDF2 fallback (robust 'Do' & forms expansion) ---
-    pypdf2_counts: Dict[int, int] = {}
-    if PYPDF2_AVAILABLE:
-        try:
-            reader = PyPDF2.PdfReader(pdf_path)
-            for i in range(1, len(reader.pages) + 1):
-                try:
-                    c = _count_images_pypdf2_for_page(reader, i)
-                    pypdf2_counts[i] = c
-                except Exception as e:
-                    pypdf2_counts[i] = 0
-            methods_used.append('pypdf2_do_scan')
-        except Exception as e:
-            if verbose:
-                print(f"[count_pdf_images] PyPDF2 fallback failed: {e}")
+@traced()
+def count_pdf_images(pdf_path: str, verbose: bool = False,
+                     model: Optional[PdfDocumentModel] = None,
+                     timings: Optional[Dict[str, Dict[str, float]]] = None,
+                     workers: Optional[int] = None) -> Tuple[Dict[int, int], int, str]:
+    """
+    Robust image occurrence counter per 1-based page index.
+    Runs the IMAGE_COUNT_STRATEGIES chain page by page, cheapest first:
+      - pymupdf: placement, image-block and unique-resource counts from the shared page
+        model (pass `model` to reuse one already parsed by another checker),
+      - pypdf2_do_scan: counts /Name Do occurrences in content streams, recursing into
+        Form XObjects, plus inline images (BI...EI),
+      - pdfplumber: placement-aware image objects.
+    A page escalates to the next strategy only while its count is unconfirmed (see
+    IMAGE_COUNT_STRATEGIES); the maximum of the strategies run is kept. Expensive
+    libraries are opened only if some page escalates to them.
+    With more than one worker, PDFs longer than IMAGE_COUNT_PAGES_PER_TASK are split
+    into page ranges counted on a process pool; each worker opens the PDF once and
+    reads PyMuPDF pages directly instead of through the page model.
+    Args:
+        timings (dict): Optional dict filled with {strategy: {"seconds", "pages"}};
+            with workers, seconds are summed over all worker processes.
+        workers (int): Worker processes (defaults to IMAGE_COUNT_WORKERS; 0 = CPU count).
+    Returns (page_counts_dict, total_images, method_used_string).
+    """
+    if not os.path.exists(pdf_path):
+        print(f"PDF not found: {pdf_path}")
+        return {}, 0, 'none'
 
-    # --- pdfplumber lightweight fallback (placement-aware) ---
-    pdfplumber_counts: Dict[int, int] = {}
-    if PDFPLUMBER_AVAILABLE:
+    page_counts: Dict[int, int] = {}
+    methods_used = []
+
+    workers = IMAGE_COUNT_WORKERS if workers is None else workers
+    workers = workers or os.cpu_count() or 1
+    counter = _ImageCounter(pdf_path, verbose, model)
+    try:
+        page_total = _pdf_page_total(pdf_path, model) if workers > 1 else 0
+        if page_total > IMAGE_COUNT_PAGES_PER_TASK:
+            page_counts = _count_pages_parallel(pdf_path, page_total, workers, counter.timings, verbose)
+        else:
+            page_counts = counter.count(range(1, counter.page_total() + 1))
+    finally:
+        counter.close()
+    if timings is not None:
+        timings.update(counter.timings)
+
+    methods_used.extend(name for name in IMAGE_COUNT_STRATEGIES if counter.timings.get(name, {}).get("pages"))
+    if IMAGE_PLACEMENT_INDEX and PYMUPDF_AVAILABLE and page_counts:
         try:
-            import pdfplumber  # re-import safe
-            with pdfplumber.open(pdf_path) as pdf:
-                for i, page in enumerate(pdf.pages, start=1):
-                    try:
-                        imgs = getattr(page, 'images', []) or []
-                        pdfplumber_counts[i] = len(imgs)
-                    except Exception:
-                        pdfplumber_counts[i] = 0
-            methods_used.append('pdfplumber')
+            # Built from the page model when the count used it; persisted, so later runs only load it
+            with stage("image_verification.count_pdf_images.placement_index"):
+                index = load_placement_index(pdf_path, counter.model)
+            if verbose:
+                print(f"[count_pdf_images] placement index: {index!r}")
         except Exception as e:
             if verbose:
-                print(f"[count_pdf_images] pdfplumber attempt failed: {e}")
-
-    # --- Combine: for each page, take maximum reported by available methods (best-effort) ---
-    all_pages = set()
-    all_pages.update(pymupdf_counts.keys())
-    all_pages.update(pypdf2_counts.keys())
-    all_pages.update(pdfplumber_counts.keys())
-    # if none of the above produced pages, try a very crude fallback scanning entire PDF bytes for /Subtype /Image
-    fallback_total = 0
-    if not all_pages:
+                print(f"[count_pdf_images] placement index failed: {e}")
+    if verbose:
+        for name, timing in counter.timings.items():
+            print(f"[count_pdf_images] {name}: {timing['seconds']:.3f}s over {int(timing['pages'])} page(s)")
+
+    # if none of the above produced pages, fall back to a raw scan of the PDF bytes for /Subtype /Image
+    # (memory-mapped and chunked; images are attributed to pages through the page tree where possible)
+    if not page_counts:
         try:
-            with open(pdf_path, 'rb') as f:
-                data = f.read()
-            fallback_total = len(re.findall(br'/Subtype\s*/Image', data))
-            if fallback_total:
-                page_counts[1] = fallback_total
+            with stage("image_verification.count_pdf_images.fallback_text_scan"):
+                scan = scan_pdf_images(pdf_path)
+            if scan.total:
+                page_counts = dict(scan.page_counts) if scan.page_counts else {1: scan.total}
                 methods_used.append('fallback_text_scan')
                 if verbose:
-                    print("[count_pdf_images] used fallback_text_scan")
-                return page_counts, fallback_total, '|'.join(methods_used)
-        except Exception:
-            pass
-
-    for p in sorted(all_pages):
-        candidates = []
-        if p in pymupdf_counts:
-            candidates.append(('pymupdf_best', pymupdf_counts[p]))
-        if p in pypdf2_counts:
-            candidates.append(('pypdf2_do', pypdf2_counts[p]))
-        if p in pdfplumber_counts:
-            candidates.append(('pdfplumber', pdfplumber_counts[p]))
-
-        if candidates:
-            # choose max across candidates (appearance-based goal)
-            chosen_method, chosen_count = max(candidates, key=lambda t: t[1])
-            page_counts[p] = chosen_count
+                    attributed = "per page" if scan.page_counts else "not attributed to pages"
+                    print(f"[count_pdf_images] used fallback_text_scan ({scan.total} image object(s), {attributed})")
+                return page_counts, sum(page_counts.values()), '|'.join(methods_used)
+        except Exception as e:
             if verbose:
-                print(f"[count_pdf_images] page {p}: chosen {chosen_method} => {chosen_count}; raw_candidates={candidates}")
-        else:
-            page_counts[p] = 0
+                print(f"[count_pdf_images] fallback_text_scan failed: {e}")
 
     # Per-page decrement: total PDF image = total PDF image -1 for every PDF page
     if page_counts:
@@ -404,8 +833,122 @@ def count_pdf_images(pdf_path: str, verbose: bool = False) -> Tuple[Dict[int, in
     return page_counts, total_images, method_str
 
 
-def build_comparison(md_page_map: Dict[int, Dict[str, Any]], pdf_page_counts: Dict[int, int]) -> List[Dict[str, Any]]:
-    """Create list of comparison rows per page present in either source, applying tolerance if enabled."""
+
+# PyMuPDF documents are not thread-safe; decoding threads take turns reading pixmaps
+_FITZ_LOCK = threading.Lock()
+
+
+def _pdf_image_loader(doc, xref: int):
+    """Pillow loader for one embedded image: JPEG bytes directly, anything else through a PyMuPDF pixmap."""
+    def load():
+        with _FITZ_LOCK:
+            if doc.xref_get_key(xref, "Filter")[1] == '/DCTDecode':
+                raw = doc.xref_stream_raw(xref)
+            else:
+                raw = None
+                pix = fitz.Pixmap(doc, xref)
+                if pix.alpha:
+                    pix = fitz.Pixmap(pix, 0)
+                if pix.n not in (1, 3):
+                    pix = fitz.Pixmap(fitz.csRGB, pix)
+                size, samples = (pix.width, pix.height), pix.samples
+                mode = 'L' if pix.n == 1 else 'RGB'
+        if raw is not None:
+            return Image.open(io.BytesIO(raw))
+        return Image.frombytes(mode, size, samples)
+    return load
+
+
+@traced()
+def pdf_page_image_hashes(pdf_path: str, model: Optional[PdfDocumentModel] = None) -> Dict[int, List[int]]:
+    """
+    Perceptual hashes of the images drawn on each page.
+    Pages, xrefs and content digests come from the persisted placement index
+    (common/image_placements.py), so image streams are read only for images whose
+    digest is not in the hash cache, and each of those once however many pages use it.
+    Args:
+        pdf_path (str): Path to the PDF file.
+        model (PdfDocumentModel): Optional page model already parsed for this PDF.
+    Returns:
+        dict: 1-based page -> hashes of the decodable images on that page.
+    """
+    index = load_placement_index(pdf_path, model)
+    xref_digests = index.xref_digests()
+    page_xrefs: Dict[int, List[int]] = {page: [] for page in range(1, index.page_count + 1)}
+    for page, xref in zip(index.page.tolist(), index.xref.tolist()):
+        if xref > 0 and xref not in page_xrefs[page]:
+            page_xrefs[page].append(xref)
+    with fitz.open(pdf_path) as doc:
+        loaders = {}
+        for xref, digest in xref_digests.items():
+            loaders.setdefault(digest, _pdf_image_loader(doc, xref))
+        hashes = hash_images(loaders)
+    return {page: [hashes[xref_digests[x]] for x in xrefs if hashes[xref_digests[x]] is not None]
+            for page, xrefs in page_xrefs.items()}
+
+
+def _md_image_paths(md_folder: str, inventory: Optional[Dict[str, List[MdImage]]] = None) -> Dict[Tuple[str, str], str]:
+    """(md filename, image basename) -> existing image file, from the MD image inventory."""
+    paths: Dict[Tuple[str, str], str] = {}
+    for fname, images in (inventory if inventory is not None else md_image_inventory(md_folder)).items():
+        for image in images:
+            if image.exists:
+                paths.setdefault((fname, image.name), image.path)
+    return paths
+
+
+@traced()
+def match_page_images(pdf_path: str, md_folder: str, md_page_map: Dict[int, Dict[str, Any]],
+                      model: Optional[PdfDocumentModel] = None,
+                      inventory: Optional[Dict[str, List[MdImage]]] = None) -> Dict[int, Dict[str, List[str]]]:
+    """
+    Check which MD images appear on their mapped PDF page.
+    An MD image is found when some image on the page is within IMAGE_MATCH_MAX_DISTANCE
+    bits of it; each page's MD x PDF distances are computed in one NumPy operation.
+    Args:
+        pdf_path (str): Path to the PDF file.
+        md_folder (str): Folder holding the MD files and their images.
+        md_page_map (dict): Output of map_md_files_to_pages.
+        model (PdfDocumentModel): Optional page model already parsed for this PDF.
+        inventory (dict): Optional md_image_inventory(md_folder) result to reuse.
+    Returns:
+        dict: page -> {'found', 'missing', 'unresolved'} lists of MD image names;
+        unresolved images have no file where the MD file points or could not be decoded.
+    """
+    pdf_hashes = pdf_page_image_hashes(pdf_path, model)
+    image_paths = _md_image_paths(md_folder, inventory)
+    wanted = {image_paths[(entry['md_file'], img)] for entry in md_page_map.values()
+              for img in entry['md_images'] if (entry['md_file'], img) in image_paths}
+    md_hashes = hash_image_files(sorted(wanted))
+
+    matches: Dict[int, Dict[str, List[str]]] = {}
+    for page, entry in md_page_map.items():
+        result = {'found': [], 'missing': [], 'unresolved': []}
+        names, hashes = [], []
+        for img in entry['md_images']:
+            value = md_hashes.get(image_paths.get((entry['md_file'], img)))
+            if value is None:
+                result['unresolved'].append(img)
+            else:
+                names.append(img)
+                hashes.append(value)
+        on_page = pdf_hashes.get(page, [])
+        if names and on_page:
+            found = hamming_distances(hashes, on_page).min(axis=1) <= IMAGE_MATCH_MAX_DISTANCE
+        else:
+            found = [False] * len(names)
+        for img, hit in zip(names, found):
+            result['found' if hit else 'missing'].append(img)
+        matches[page] = result
+    return matches
+
+
+@traced()
+def build_comparison(md_page_map: Dict[int, Dict[str, Any]], pdf_page_counts: Dict[int, int],
+                     image_matches: Optional[Dict[int, Dict[str, List[str]]]] = None) -> List[Dict[str, Any]]:
+    """Create list of comparison rows per page present in either source, applying tolerance if enabled.
+    With image_matches (from match_page_images), rows also carry which MD images were found on the page;
+    without it those fields are None."""
     all_pages = sorted(set(md_page_map.keys()) | set(pdf_page_counts.keys()))
     rows: List[Dict[str, Any]] = []
     for p in all_pages:
@@ -417,6 +960,7 @@ def build_comparison(md_page_map: Dict[int, Dict[str, Any]], pdf_page_counts: Di
         else:
             match_flag = (md_cnt == pdf_cnt)
         diff = pdf_cnt - md_cnt
+        matched = image_matches.get(p, {}) if image_matches is not None else None
         rows.append({
             'page': p,
             'md_file': md_entry['md_file'] if md_entry else None,
@@ -425,236 +969,397 @@ def build_comparison(md_page_map: Dict[int, Dict[str, Any]], pdf_page_counts: Di
             'match': match_flag,
             'exact_match': md_cnt == pdf_cnt,
             'diff': diff,
-            'different': diff != 0
+            'different': diff != 0,
+            'images_found': matched.get('found', []) if matched is not None else None,
+            'images_missing': matched.get('missing', []) if matched is not None else None,
+            'images_unresolved': matched.get('unresolved', []) if matched is not None else None,
         })
     return rows
 
+# Column types of the exported comparison rows (see export_comparison)
+COMPARISON_EXPORT_COLUMNS = {
+    'pdf': 'string',
+    'page': 'int64',
+    'md_file': 'string',
+    'md_image_count': 'int64',
+    'pdf_image_count': 'int64',
+    'diff': 'int64',
+    'match': 'boolean',
+    'exact_match': 'boolean',
+    'different': 'boolean',
+    'images_found': 'Int64',
+    'images_missing': 'Int64',
+    'images_unresolved': 'Int64',
+    'missing_images': 'string',
+    'method': 'string',
+}
+
+def _export_row(row: Dict[str, Any], pdf_path: str, method_used: str) -> Dict[str, Any]:
+    """Flatten one comparison row: image match lists become counts plus the missing names."""
+    out = {**row, 'pdf': pdf_path, 'method': method_used}
+    for key in ('images_found', 'images_missing', 'images_unresolved'):
+        out[key] = len(row[key]) if row.get(key) is not None else None
+    out['missing_images'] = ', '.join(row['images_missing']) if row.get('images_missing') else None
+    return out
+
+def export_comparison(comparison_rows: List[Dict[str, Any]], report_path: str,
+                      pdf_path: str = '', method_used: str = '') -> Dict[str, str]:
+    """Write build_comparison rows as JSONL/Parquet next to the HTML report."""
+    rows = (_export_row(row, pdf_path, method_used) for row in comparison_rows)
+    return export_rows(export_stem(report_path), COMPARISON_EXPORT_COLUMNS, rows)
+
+def _image_match_label(row: Dict[str, Any], img: str) -> str:
+    """Status marker after an image name in the per-page details ('' when matching did not run)."""
+    if row.get('images_found') is None:
+        return ''
+    if img in row['images_found']:
+        return " <span class='ok'>found</span>"
+    if img in row['images_missing']:
+        return " <span class='fail'>not found</span>"
+    return " <span class='warn'>unresolved</span>"
+
+@traced()
 def generate_html_report(files_with_images, md_folder, output_path,
-                         comparison_rows=None, pdf_total=0, md_total=0, method_used=''):
-    with open(output_path, 'w', encoding='utf-8') as html_file:
-        html_file.write("""
-        <html>
-        <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Image Verification Report</title>
-        <style>
-            body { 
-                font-family: Arial, sans-serif; 
-                margin: 40px; 
-                background: #f9f9f9; 
-                line-height: 1.6; 
-            }
-            h1 { 
-                color: #2c3e50; 
-                border-bottom: 3px solid #3498db; 
-                padding-bottom: 10px; 
-            }
-            h2 { 
-                color: #2c3e50; 
-                border-bottom: 2px solid #eee; 
-                padding-bottom: 5px; 
-                margin-top: 30px;
-            }
-            .file-section { 
-                background: #fff; 
-                margin-bottom: 30px; 
-                padding: 20px; 
-                border-radius: 8px; 
-                box-shadow: 0 2px 8px rgba(0,0,0,0.1); 
-            }
-            .filename { 
-                background: #e8f4fd; 
-                padding: 5px 10px; 
-                border-radius: 4px; 
-                font-family: 'Courier New', monospace; 
-                font-size: 0.9em; 
-                color: #2c3e50;
-            }
-            .heading { 
-                background: #e8f6e8; 
-                padding: 8px 12px; 
-                border-radius: 4px; 
-                font-weight: bold; 
-                color: #2c3e50;
-                margin: 10px 0;
-            }
-            .image-list { 
-                background: #f8f9fa; 
-                padding: 15px; 
-                border-left: 4px solid #3498db; 
-                margin: 10px 0; 
-            }
-            .image-item { 
-                margin: 8px 0; 
-                padding: 5px 0; 
-                font-family: 'Courier New', monospace; 
-                color: #34495e;
-            }
-            .summary { 
-                background: #fff; 
-                padding: 20px; 
-                border-radius: 8px; 
-                box-shadow: 0 2px 8px rgba(0,0,0,0.1); 
-                margin-bottom: 30px;
-            }
-            .count { 
-                color: #3498db; 
-                font-weight: bold; 
-                font-size: 1.2em; 
-            }
-            .no-images { 
-                background: #fff3cd; 
-                color: #856404; 
-                padding: 20px; 
-                border-radius: 8px; 
-                border: 1px solid #ffeaa7; 
-                text-align: center;
-            }
-        </style>
-        </head>
-        <body>
-            <h1>Image Verification Report</h1>
-            <p><strong>Purpose:</strong> Verify that image counts per page in PDF match counts per corresponding Markdown file (numeric prefix mapping).</p>
-            <p><strong>Generated:</strong> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-        """)
-
-        if files_with_images:
-            # Summary section
-            total_files = len(files_with_images)
-            total_images = sum(len(images) for images in files_with_images.values())
-
-            html_file.write(f"""
-            <div class="summary">
-                <h2>Summary</h2>
-                <p><strong>Total MD files with images:</strong> <span class="count">{total_files}</span></p>
-                <p><strong>Total MD images referenced:</strong> <span class="count">{total_images}</span></p>
-                <p><strong>Total PDF images counted:</strong> <span class="count">{pdf_total}</span> (method: {method_used})</p>
-                <p><strong>Pages compared:</strong> <span class="count">{len(comparison_rows) if comparison_rows else 0}</span></p>
-                <p><strong>Config:</strong> offset={PAGE_OFFSET}, tolerance={'on' if TOLERANCE_MODE else 'off'}, strict_appearance={'on' if STRICT_PYMUPDF_APPEARANCE_MODE else 'off'}</p>
-            </div>
-            """)
-
-            # New mismatch details section (before per-page comparison)
-            if comparison_rows:
-                # Use differences (any diff) or strict mismatches based on config
-                if REPORT_ALL_DIFFERENCES:
-                    mismatches = [r for r in comparison_rows if r.get('different')]
-                else:
-                    mismatches = [r for r in comparison_rows if not r['match']]
-                if mismatches:
-                    html_file.write("""
-                    <div class="file-section">
-                        <h2>Mismatch Details</h2>
-                        <table style="width:100%;border-collapse:collapse;font-size:14px;">
-                            <tr style="background:#ffecec;">
-                                <th style="border:1px solid #ccc;padding:6px;">Page</th>
-                                <th style="border:1px solid #ccc;padding:6px;">MD File</th>
-                                <th style="border:1px solid #ccc;padding:6px;">MD</th>
-                                <th style="border:1px solid #ccc;padding:6px;">PDF</th>
-                                <th style="border:1px solid #ccc;padding:6px;">Diff</th>
-                                <th style="border:1px solid #ccc;padding:6px;">Status</th>
-                            </tr>
-                    """)
-                    for r in mismatches:
-                        md_file_display = r['md_file'] or '—'
-                        status = 'TOLERATED' if r['match'] and r['diff'] != 0 else ('MISMATCH' if not r['match'] else 'OK')
-                        diff_color = '#c62828' if r['diff'] != 0 else '#2e7d32'
-                        html_file.write(f"""
-                            <tr>
-                                <td style='border:1px solid #ccc;padding:6px;text-align:center;'>{r['page']}</td>
-                                <td style='border:1px solid #ccc;padding:6px;'>{md_file_display}</td>
-                                <td style='border:1px solid #ccc;padding:6px;text-align:center;'>{r['md_image_count']}</td>
-                                <td style='border:1px solid #ccc;padding:6px;text-align:center;'>{r['pdf_image_count']}</td>
-                                <td style='border:1px solid #ccc;padding:6px;text-align:center;color:{diff_color};'>{r['diff']}</td>
-                                <td style='border:1px solid #ccc;padding:6px;text-align:center;'>{status}</td>
-                            </tr>
-                        """)
-                    html_file.write("""
-                        </table>
-                    </div>
-                    """)
-
-            # Comparison table
-            if comparison_rows:
-                html_file.write("""
-                <div class="file-section">
-                    <h2>Per-Page Comparison</h2>
-                    <table style="width:100%;border-collapse:collapse;font-size:14px;">
-                        <tr style="background:#f0f0f0;">
-                            <th style="border:1px solid #ccc;padding:6px;">Page</th>
-                            <th style="border:1px solid #ccc;padding:6px;">MD File</th>
-                            <th style="border:1px solid #ccc;padding:6px;">MD Images</th>
-                            <th style="border:1px solid #ccc;padding:6px;">PDF Images</th>
-                            <th style="border:1px solid #ccc;padding:6px;">Status</th>
-                            <th style="border:1px solid #ccc;padding:6px;">Exact</th>
-                        </tr>
-                """)
-                for row in comparison_rows:
-                    if STATUS_STRICT_DIFFERENCE:
-                        status_is_match = (row['diff'] == 0)
-                    else:
-                        status_is_match = row['match']
-                    status = 'MATCH' if status_is_match else 'MISMATCH'
-                    color = '#2e7d32' if status_is_match else '#c62828'
-                    md_file_display = row['md_file'] or '—'
-                    html_file.write(f"""
-                        <tr>
-                            <td style='border:1px solid #ccc;padding:6px;text-align:center;'>{row['page']}</td>
-                            <td style='border:1px solid #ccc;padding:6px;'>{md_file_display}</td>
-                            <td style='border:1px solid #ccc;padding:6px;text-align:center;'>{row['md_image_count']}</td>
-                            <td style='border:1px solid #ccc;padding:6px;text-align:center;'>{row['pdf_image_count']}</td>
-                            <td style='border:1px solid #ccc;padding:6px;font-weight:bold;color:{color};'>{status}</td>
-                            <td style='border:1px solid #ccc;padding:6px;text-align:center;'>{'✓' if row['exact_match'] else ''}</td>
-                        </tr>
-                    """)
-                html_file.write("""
-                    </table>
-                </div>
-                """)
+                         comparison_rows=None, pdf_total=0, md_total=0, method_used='', page_offsets=None,
+                         missing_files=None, collisions=None, md_page_map=None):
+    intro = ("Purpose: Verify that image counts per page in PDF match counts per "
+             "corresponding Markdown file (numeric prefix mapping).")
+    with HtmlReport(output_path, "Image Verification Report", intro=intro) as report:
+        if not files_with_images:
+            report.add_note("No images were found in any Markdown files in the specified directory.", "warn")
+            return
+
+        report.add_summary("Total MD files with images", len(files_with_images))
+        report.add_summary("Total MD images referenced", sum(len(images) for images in files_with_images.values()))
+        report.add_summary("Total PDF images counted", f"{pdf_total} (method: {method_used})")
+        report.add_summary("Pages compared", len(comparison_rows) if comparison_rows else 0)
+        if missing_files is not None:
+            report.add_summary("Referenced image files missing", sum(len(v) for v in missing_files.values()))
+        if collisions is not None:
+            report.add_summary("MD files sharing a page (not compared)", sum(len(v) for v in collisions.values()))
+        offset = format_page_offsets(page_offsets) if page_offsets else PAGE_OFFSET
+        report.add_summary("Config", f"offset={offset}, tolerance={'on' if TOLERANCE_MODE else 'off'}, "
+                                     f"strict_appearance={'on' if STRICT_PYMUPDF_APPEARANCE_MODE else 'off'}")
+        matched_rows = [r for r in comparison_rows or [] if r.get('images_found') is not None]
+        if matched_rows:
+            found = sum(len(r['images_found']) for r in matched_rows)
+            missing = sum(len(r['images_missing']) for r in matched_rows)
+            unresolved = sum(len(r['images_unresolved']) for r in matched_rows)
+            report.add_summary("MD images found on their PDF page",
+                               f"{found} of {found + missing} (unresolved: {unresolved}, "
+                               f"max distance: {IMAGE_MATCH_MAX_DISTANCE})")
+        if not comparison_rows:
+            return
+
+        # Mismatch details come before the per-page comparison
+        report.add_table("mismatches", "Mismatch Details", ["Page", "MD File", "MD", "PDF", "Diff", "Status"],
+                         empty_message="No page differs in image count." if REPORT_ALL_DIFFERENCES
+                         else "No mismatched pages (within tolerance).")
+        if missing_files:
+            report.add_table("missing_files", "Missing Image Files", ["MD File", "Reference"])
+            for fname, refs in missing_files.items():
+                for ref in refs:
+                    report.add_row("missing_files", [fname, Markup(f"<code>{esc(ref)}</code>")], row_class="fail")
+        if collisions:
+            report.add_table("collisions", "MD Files Sharing a Page", ["Page", "Compared MD File", "Ignored MD File"])
+            for page, fnames in sorted(collisions.items()):
+                for fname in fnames:
+                    report.add_row("collisions", [page, md_page_map[page]['md_file'], fname], row_class="warn")
+        if matched_rows:
+            report.add_table("image_mismatches", "MD Images Not Found on Their Page",
+                             ["Page", "MD File", "Image", "Status"],
+                             empty_message="Every MD image was found on its PDF page.")
+        report.add_table("pages", "Per-Page Comparison",
+                         ["Page", "MD File", "MD Images", "PDF Images", "Status", "Exact", "Found"], details=True)
+
+        # Use differences (any diff) or strict mismatches based on config
+        if REPORT_ALL_DIFFERENCES:
+            mismatches = [r for r in comparison_rows if r.get('different')]
         else:
-            html_file.write("""
-            <div class="no-images">
-                <h2>No Images Found</h2>
-                <p>No images were found in any Markdown files in the specified directory.</p>
-            </div>
-            """)
-
-        html_file.write("""
-        </body>
-        </html>
-        """)
+            mismatches = [r for r in comparison_rows if not r['match']]
+        for r in mismatches:
+            status = 'TOLERATED' if r['match'] and r['diff'] != 0 else ('MISMATCH' if not r['match'] else 'OK')
+            diff_class = 'fail' if r['diff'] != 0 else 'ok'
+            report.add_row("mismatches", [r['page'], r['md_file'] or '—', r['md_image_count'], r['pdf_image_count'],
+                                          Markup(f"<span class='{diff_class}'>{r['diff']}</span>"), status])
 
-def main():
-    print("Starting image count verification...")
-    md_images = find_md_images(MD_FOLDER)
-    md_page_map = map_md_files_to_pages(md_images)
-    pdf_page_counts, pdf_total, method_used = count_pdf_images(PDF_FILE)
-    comparison_rows = build_comparison(md_page_map, pdf_page_counts)
+        for r in matched_rows:
+            for img in r['images_missing']:
+                report.add_row("image_mismatches", [r['page'], r['md_file'] or '—', img,
+                                                    Markup("<span class='fail'>NOT FOUND</span>")])
+            for img in r['images_unresolved']:
+                report.add_row("image_mismatches", [r['page'], r['md_file'] or '—', img,
+                                                    Markup("<span class='warn'>UNRESOLVED</span>")])
+
+        for row in comparison_rows:
+            if STATUS_STRICT_DIFFERENCE:
+                status_is_match = (row['diff'] == 0)
+            else:
+                status_is_match = row['match']
+            status = 'MATCH' if status_is_match else 'MISMATCH'
+            status_cell = Markup(f"<span class='{'ok' if status_is_match else 'fail'}'>{status}</span>")
+            images = files_with_images.get(row['md_file']) if row['md_file'] else None
+            detail = None
+            if images:
+                detail = Markup("<ol>" + "".join(f"<li><code>{esc(img)}</code>{_image_match_label(row, img)}</li>"
+                                                 for img in images) + "</ol>")
+            found_cell = '—'
+            if row.get('images_found') is not None and row['md_file']:
+                found_cell = f"{len(row['images_found'])}/{row['md_image_count']}"
+            report.add_row("pages", [row['page'], row['md_file'] or '—', row['md_image_count'],
+                                     row['pdf_image_count'], status_cell, '✓' if row['exact_match'] else '',
+                                     found_cell],
+                           detail=detail, detail_title=f"Page {row['page']}: {row['md_file']}",
+                           row_class=None if status_is_match else "fail")
+
+def verify_document(pdf_path: str, md_folder: str, output_html: str, page_offset: Any = None,
+                    inventory: Optional[Dict[str, List[MdImage]]] = None,
+                    model: Optional[PdfDocumentModel] = None, verbose: bool = True) -> Dict[str, Any]:
+    """
+    Verify one PDF against its MD folder and write the HTML report and export.
+    Args:
+        pdf_path (str): Path to the PDF file.
+        md_folder (str): Folder holding the MD files and their images.
+        output_html (str): Report path; the export is written next to it.
+        page_offset: PAGE_OFFSET to apply, or "auto" to detect it (defaults to
+            PAGE_OFFSET, or detection when AUTO_PAGE_OFFSET is on).
+        inventory (dict): md_image_inventory(md_folder) result to reuse (e.g. shared by
+            several PDFs of one MD folder).
+        model (PdfDocumentModel): Optional page model already parsed for this PDF.
+        verbose (bool): Print the console summary.
+    Returns:
+        dict: Summary counts for the document, its status ("ok" or "issues") and report path.
+    """
+    if page_offset is None:
+        page_offset = "auto" if AUTO_PAGE_OFFSET else PAGE_OFFSET
+    auto_offset = str(page_offset).strip().lower() == "auto"
+    page_offsets = [(0, 0 if auto_offset else int(page_offset))]
+
+    if inventory is None:
+        inventory = md_image_inventory(md_folder)
+    missing_files: Dict[str, List[str]] = {}
+    md_images = find_md_images(md_folder, missing=missing_files, inventory=inventory)
+    collisions: Dict[int, List[str]] = {}
+    md_page_map = map_md_files_to_pages(md_images, page_offsets, collisions)
+    count_timings: Dict[str, Dict[str, float]] = {}
+    pdf_page_counts, pdf_total, method_used = count_pdf_images(pdf_path, model=model, timings=count_timings)
+    if verbose:
+        for name, timing in count_timings.items():
+            print(f"  {name}: {timing['seconds']:.3f}s over {int(timing['pages'])} page(s)")
+    if auto_offset:
+        page_offsets = detect_page_offsets(md_page_map, pdf_page_counts)
+        collisions = {}
+        md_page_map = map_md_files_to_pages(md_images, page_offsets, collisions)
+        if verbose:
+            print(f"Detected page offset: {format_page_offsets(page_offsets)}")
+    image_matches = None
+    if IMAGE_MATCHING and PYMUPDF_AVAILABLE and PIL_AVAILABLE and os.path.exists(pdf_path):
+        image_matches = match_page_images(pdf_path, md_folder, md_page_map, model=model, inventory=inventory)
+    comparison_rows = build_comparison(md_page_map, pdf_page_counts, image_matches)
 
     md_total = sum(len(v) for v in md_images.values())
     mismatches = [r for r in comparison_rows if not r['match']]
     difference_pages = [r for r in comparison_rows if r.get('different')]
-    if method_used == 'fallback_text_scan':
-        print("WARNING: Using crude fallback image scan; per-page counts unreliable. Install 'pymupdf' (pip install pymupdf) for accurate results.")
-
-    # Console summary
-    print(f"MD files with images: {len(md_images)} | Total MD images: {md_total}")
-    print(f"PDF total images ({method_used}): {pdf_total} | Pages compared: {len(comparison_rows)}")
-    print(f"Mismatched pages (tolerance logic): {len(mismatches)} | Pages with any difference: {len(difference_pages)}")
-    if difference_pages and len(mismatches) == 0 and REPORT_ALL_DIFFERENCES:
-        print("Note: Differences exist but are tolerated (PDF >= MD). They will appear in the HTML mismatch section.")
-    if mismatches:
-        for r in mismatches[:20]:  # limit console noise
-            print(f"  Page {r['page']}: MD={r['md_image_count']} vs PDF={r['pdf_image_count']} (file={r['md_file']})")
+    not_found = [(r['page'], img) for r in comparison_rows for img in (r['images_missing'] or [])]
+    missing_total = sum(len(v) for v in missing_files.values())
+    collision_total = sum(len(v) for v in collisions.values())
+    if verbose:
+        if method_used == 'fallback_text_scan':
+            print("WARNING: Using crude fallback image scan; per-page counts unreliable. Install 'pymupdf' (pip install pymupdf) for accurate results.")
+
+        # Console summary
+        print(f"MD files with images: {len(md_images)} | Total MD images: {md_total}")
+        print(f"PDF total images ({method_used}): {pdf_total} | Pages compared: {len(comparison_rows)}")
+        print(f"Mismatched pages (tolerance logic): {len(mismatches)} | Pages with any difference: {len(difference_pages)}")
+        if difference_pages and len(mismatches) == 0 and REPORT_ALL_DIFFERENCES:
+            print("Note: Differences exist but are tolerated (PDF >= MD). They will appear in the HTML mismatch section.")
+        if mismatches:
+            for r in mismatches[:20]:  # limit console noise
+                print(f"  Page {r['page']}: MD={r['md_image_count']} vs PDF={r['pdf_image_count']} (file={r['md_file']})")
+        else:
+            print("All compared pages match image counts.")
+
+        if missing_files:
+            print(f"Referenced image files missing: {missing_total}")
+            for fname, refs in list(missing_files.items())[:20]:
+                print(f"  {fname}: {', '.join(refs)}")
+        if collisions:
+            print(f"WARNING: MD files sharing a page with another MD file (not compared): {collision_total}")
+            for page, fnames in list(collisions.items())[:20]:
+                print(f"  Page {page}: {md_page_map[page]['md_file']} used; ignored {', '.join(fnames)}")
+        if image_matches is not None:
+            checked = sum(len(r['images_found']) for r in comparison_rows) + len(not_found)
+            print(f"MD images found on their PDF page: {checked - len(not_found)} of {checked}")
+            for page, img in not_found[:20]:
+                print(f"  Page {page}: {img} not found")
+
+        if pdf_total == 0:
+            print("NOTICE: 0 images detected. If the PDF has images, install 'pymupdf' (pip install pymupdf) for accurate appearance counting.")
+
+    generate_html_report(md_images, md_folder, output_html, comparison_rows, pdf_total, md_total, method_used,
+                         page_offsets, missing_files, collisions, md_page_map)
+    exported = export_comparison(comparison_rows, output_html, pdf_path, method_used)
+    if verbose:
+        print(f"HTML report generated: {output_html}")
+        if exported:
+            print(f"Results exported: {', '.join(exported.values())}")
+    return {
+        'pdf': pdf_path,
+        'md_folder': md_folder,
+        'report': output_html,
+        'pdf_total': pdf_total,
+        'md_total': md_total,
+        'pages_compared': len(comparison_rows),
+        'mismatched_pages': len(mismatches),
+        'difference_pages': len(difference_pages),
+        'images_not_found': len(not_found),
+        'missing_image_files': missing_total,
+        'md_prefix_collisions': collision_total,
+        'page_offset': format_page_offsets(page_offsets),
+        'method': method_used,
+        'status': 'issues' if mismatches or not_found or missing_total or collision_total else 'ok',
+    }
+
+
+def _verify_batch_entry(entry: Dict[str, Any], output_dir: str,
+                        inventory: Dict[str, List[MdImage]]) -> Dict[str, Any]:
+    """Batch task: verify one document into output_dir/<id>/, reporting failures as an error row."""
+    started = time.perf_counter()
+    report = os.path.join(output_dir, entry['id'], os.path.basename(OUTPUT_HTML))
+    try:
+        if not os.path.isfile(entry['pdf']):
+            raise FileNotFoundError(f"PDF not found: {entry['pdf']}")
+        if not os.path.isdir(entry['md_folder']):
+            raise FileNotFoundError(f"MD folder not found: {entry['md_folder']}")
+        summary = verify_document(entry['pdf'], entry['md_folder'], report, entry.get('page_offset'),
+                                  inventory=inventory, verbose=False)
+    except Exception as e:
+        summary = {'pdf': entry['pdf'], 'md_folder': entry['md_folder'], 'report': None,
+                   'status': 'error', 'error': f"{type(e).__name__}: {e}"}
+    summary['id'] = entry['id']
+    summary['seconds'] = round(time.perf_counter() - started, 3)
+    return summary
+
+
+# Column types of the consolidated batch summary export (see verify_documents)
+BATCH_EXPORT_COLUMNS = {
+    'id': 'string',
+    'pdf': 'string',
+    'md_folder': 'string',
+    'status': 'string',
+    'pdf_total': 'Int64',
+    'md_total': 'Int64',
+    'pages_compared': 'Int64',
+    'mismatched_pages': 'Int64',
+    'difference_pages': 'Int64',
+    'images_not_found': 'Int64',
+    'missing_image_files': 'Int64',
+    'md_prefix_collisions': 'Int64',
+    'page_offset': 'string',
+    'method': 'string',
+    'seconds': 'float64',
+    'error': 'string',
+}
+
+
+@traced()
+def verify_documents(entries: List[Dict[str, Any]], output_dir: str,
+                     workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Verify many (pdf, md_folder, page_offset) entries, e.g. one per locale, concurrently.
+    Each MD folder's image inventory is read once in this process and handed to every
+    document that uses it. Documents run on a process pool (spawned, like the page-range
+    pool of count_pdf_images) and each writes its own report to output_dir/<id>/;
+    output_dir/image_verification_summary.html links them all and the summary rows are
+    exported next to it.
+    Args:
+        entries (list): Dicts with "pdf", "md_folder" and optional "page_offset" (int or
+            "auto"), "id" and "locale".
+        output_dir (str): Folder for the summary and the per-document reports.
+        workers (int): Worker processes (defaults to BATCH_WORKERS; 0 = CPU count).
+    Returns:
+        list: One summary dict per entry, in entry order.
+    """
+    entries = [dict(entry) for entry in entries]
+    used_ids = set()
+    for idx, entry in enumerate(entries, start=1):
+        label = entry.get('locale') or os.path.splitext(os.path.basename(entry['pdf']))[0]
+        entry_id = str(entry.get('id') or f"{idx:04d}_{label}")
+        if entry_id in used_ids:
+            entry_id = f"{entry_id}_{idx}"
+        used_ids.add(entry_id)
+        entry['id'] = entry_id
+    os.makedirs(output_dir, exist_ok=True)
+
+    # One inventory per MD folder, however many PDFs (locales) share it
+    inventories: Dict[str, Dict[str, List[MdImage]]] = {}
+    for entry in entries:
+        key = os.path.realpath(entry['md_folder'])
+        if key not in inventories:
+            with stage("image_verification.verify_documents.md_inventory"):
+                inventories[key] = md_image_inventory(entry['md_folder']) if os.path.isdir(key) else {}
+    tasks = [(entry, output_dir, inventories[os.path.realpath(entry['md_folder'])]) for entry in entries]
+
+    workers = BATCH_WORKERS if workers is None else workers
+    workers = min(workers or os.cpu_count() or 1, len(entries))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            summaries = list(pool.map(_verify_batch_entry, *zip(*tasks)))
     else:
-        print("All compared pages match image counts.")
+        summaries = [_verify_batch_entry(*task) for task in tasks]
 
-    if pdf_total == 0:
-        print("NOTICE: 0 images detected. If the PDF has images, install 'pymupdf' (pip install pymupdf) for accurate appearance counting.")
+    summary_html = os.path.join(output_dir, "image_verification_summary.html")
+    generate_batch_summary(summaries, summary_html)
+    export_rows(export_stem(summary_html), BATCH_EXPORT_COLUMNS, summaries)
+    return summaries
 
-    generate_html_report(md_images, MD_FOLDER, OUTPUT_HTML, comparison_rows, pdf_total, md_total, method_used)
-    print(f"HTML report generated: {OUTPUT_HTML}")
+
+@traced()
+def generate_batch_summary(summaries: List[Dict[str, Any]], output_path: str):
+    """Consolidated report: totals across documents and one row per document linking to its report."""
+    intro = "Purpose: Image verification results for several documents; open a document for its per-page report."
+    base = os.path.dirname(os.path.abspath(output_path))
+    with HtmlReport(output_path, "Image Verification Summary", intro=intro) as report:
+        report.add_summary("Documents", len(summaries))
+        for status in ('ok', 'issues', 'error'):
+            report.add_summary(f"Status {status}", sum(1 for s in summaries if s['status'] == status))
+        for key, label in (('mismatched_pages', "Mismatched pages"), ('images_not_found', "MD images not found"),
+                           ('missing_image_files', "Referenced image files missing"),
+                           ('md_prefix_collisions', "MD files sharing a page")):
+            report.add_summary(label, sum(s.get(key) or 0 for s in summaries))
+        report.add_table("documents", "Documents",
+                         ["Document", "PDF", "MD Folder", "Offset", "Pages", "Mismatched", "Not Found",
+                          "Missing Files", "Status"])
+        for s in summaries:
+            name = s['id']
+            if s.get('report'):
+                href = os.path.relpath(os.path.abspath(s['report']), base).replace(os.sep, '/')
+                name = Markup(f"<a href='{esc(href)}'>{esc(s['id'])}</a>")
+            status_class = {'ok': 'ok', 'issues': 'fail', 'error': 'warn'}[s['status']]
+            status = Markup(f"<span class='{status_class}'>{esc(s['status'].upper())}</span>")
+            if s.get('error'):
+                status = Markup(f"{status} <code>{esc(s['error'])}</code>")
+            report.add_row("documents", [name, os.path.basename(s['pdf']), s['md_folder'], s.get('page_offset', '—'),
+                                         s.get('pages_compared', '—'), s.get('mismatched_pages', '—'),
+                                         s.get('images_not_found', '—'), s.get('missing_image_files', '—'), status],
+                           row_class=None if s['status'] == 'ok' else "fail")
+
+
+def main():
+    if DOCUMENTS:
+        print(f"Starting image verification for {len(DOCUMENTS)} document(s)...")
+        summaries = verify_documents(DOCUMENTS, BATCH_OUTPUT_DIR)
+        for s in summaries:
+            if s['status'] == 'error':
+                print(f"  {s['id']}: ERROR {s['error']}")
+            else:
+                print(f"  {s['id']}: {s['status']} | pages={s['pages_compared']} mismatched={s['mismatched_pages']} "
+                      f"not_found={s['images_not_found']} missing_files={s['missing_image_files']} "
+                      f"offset={s['page_offset']} ({s['seconds']:.1f}s)")
+        print(f"Summary report: {os.path.join(BATCH_OUTPUT_DIR, 'image_verification_summary.html')}")
+        return
+    print("Starting image count verification...")
+    verify_document(PDF_FILE, MD_FOLDER, OUTPUT_HTML)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
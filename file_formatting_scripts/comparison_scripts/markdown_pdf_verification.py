@@ -1,16 +1,96 @@
 import os
 import re
-import fitz  # PyMuPDF
+import sys
 from markdown import markdown
 from bs4 import BeautifulSoup
-from difflib import SequenceMatcher
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.extraction_cache import cached_extract  # noqa: E402
+from common.pdf_page_model import load_pdf_model  # noqa: E402
+from common.instrumentation import stage, traced  # noqa: E402
+from common.lazy_import import lazy_import  # noqa: E402
+from common.minhash_index import MinHashLSH, minhash_signatures, tokenize  # noqa: E402
+from common.report_writer import HtmlReport, diff_columns, esc  # noqa: E402
+from common.token_diff import diff_tokens  # noqa: E402
+
+# scikit-learn is slow to import; load it on first match
+sklearn_text = lazy_import("sklearn.feature_extraction.text")
+sklearn_pairwise = lazy_import("sklearn.metrics.pairwise")
+np = lazy_import("numpy")
+scipy_sparse = lazy_import("scipy.sparse")
+scipy_csgraph = lazy_import("scipy.sparse.csgraph")
+
+
+# Bump when extract_md_file_text output changes so cached entries are invalidated
+MD_EXTRACTOR_VERSION = "1"
+
+# Match every MD file at once: one TF-IDF vectorizer fitted over all MD files and PDF pages and
+# one similarity matrix, instead of a vectorizer per (MD file, page) pair. Much faster, but IDF
+# weights come from the whole corpus, so scores (and the 0.85/0.75 confidence levels, tuned on
+# per-pair scores) shift; off by default
+CORPUS_MATCHING = False
+# MD rows per sparse product when building the similarity matrix (bounds the dense block held at once)
+SIMILARITY_CHUNK_ROWS = 256
+# Assignment mode: map MD files to pages one-to-one (or up to ASSIGNMENT_MAX_FILES_PER_PAGE files
+# per page) maximizing the total similarity, and list pages no file was assigned to
+ASSIGNMENT_MODE = False
+ASSIGNMENT_MAX_FILES_PER_PAGE = 1
+# Candidate pages considered per MD file, and the smallest similarity a candidate needs ("low" confidence)
+ASSIGNMENT_CANDIDATES = 10
+ASSIGNMENT_MIN_SIMILARITY = 0.75
+# Long PDFs: score each MD file only against candidate pages found by a MinHash/LSH index over
+# word shingles (common/minhash_index.py) instead of against every page (None = never)
+LSH_MIN_PAGES = 2000
+# Recall knob: shingle overlap (Jaccard) at which a page becomes a candidate about half the time.
+# Lower finds more true matches but scores more candidates.
+LSH_THRESHOLD = 0.3
+LSH_MAX_CANDIDATES = 20
+# Files whose best candidate scores below this ("low" confidence) are scored against every page
+LSH_RESCORE_BELOW = 0.75
+# Same tokens in both modes: every run of word characters, including one-letter words
+TOKEN_PATTERN = r"(?u)\b\w+\b"
+# Prefix-guided search: an N_name.md file is first scored against PDF page N + PAGE_OFFSET and the
+# PREFIX_WINDOW pages on either side; only files whose best page there scores below the match
+# threshold (and files without a numeric prefix) are scored against the whole PDF
+PREFIX_WINDOW_SEARCH = True
+PREFIX_WINDOW = 2
+# If MD file prefix 1_ corresponds to PDF physical page N, set PAGE_OFFSET = (N-1)
+PAGE_OFFSET = 0
+
+_PAGE_PREFIX = re.compile(r"^(\d+)_")
+
+
+def extract_md_file_text(file_path):
+    """
+    Extracts cleaned plain text from a single Markdown file.
+    Args:
+        file_path (str): Path to the Markdown file.
+    Returns:
+        str: The extracted and cleaned text content.
+    """
+    with open(file_path, "r", encoding="utf-8") as md_file:
+        raw_content = md_file.read()
+
+    # Remove specific unwanted text (customize for your document format)
+    raw_content = re.sub(r"authorinformation: .* audience:", "", raw_content, flags=re.IGNORECASE)
+
+    # Remove image references (e.g., ![alt text](url))
+    raw_content = re.sub(r"!\[.*?\]\(.*?\)", "", raw_content)
 
+    # Convert Markdown to plain text using BeautifulSoup
+    html_content = markdown(raw_content)
+    soup = BeautifulSoup(html_content, "html.parser")
+    text_content = soup.get_text(separator=" ").strip()
+
+    # Preprocess the content to remove unwanted characters
+    return preprocess_content(text_content)
+
+
+@traced()
 def extract_md_content(md_folder):
     """
     Extracts text content from Markdown files, ignoring specific unwanted text and image references.
+    Unchanged files are served from the on-disk extraction cache.
     Args:
         md_folder (str): Path to the folder containing Markdown files.
     Returns:
@@ -21,25 +101,12 @@ def extract_md_content(md_folder):
     for file_name in os.listdir(md_folder):
         if file_name.endswith(".md"):
             file_path = os.path.join(md_folder, file_name)
-            with open(file_path, "r", encoding="utf-8") as md_file:
-                raw_content = md_file.read()
-
-                # Remove specific unwanted text (customize for your document format)
-                raw_content = re.sub(r"authorinformation: .* audience:", "", raw_content, flags=re.IGNORECASE)
-
-                # Remove image references (e.g., ![alt text](url))
-                raw_content = re.sub(r"!\[.*?\]\(.*?\)", "", raw_content)
 
-                # Convert Markdown to plain text using BeautifulSoup
-                html_content = markdown(raw_content)
-                soup = BeautifulSoup(html_content, "html.parser")
-                text_content = soup.get_text(separator=" ").strip()
-
-                # Preprocess the content to remove unwanted characters
-                text_content = preprocess_content(text_content)
-
-                # Store the extracted and cleaned text content
-                md_content[file_name] = text_content
+            # Store the extracted and cleaned text content
+            md_content[file_name] = cached_extract(
+                file_path, "markdown_pdf_verification.md_text", MD_EXTRACTOR_VERSION,
+                lambda: extract_md_file_text(file_path)
+            )
 
     return md_content
 
@@ -57,58 +124,87 @@ def preprocess_content(content):
     cleaned_content = re.sub(r"\s+", " ", cleaned_content).strip()  # Normalize spaces
     return cleaned_content
 
-def extract_pdf_content(pdf_path):
+@traced()
+def extract_pdf_content(pdf_path, model=None):
     """
     Extracts text content from a PDF file and preprocesses it.
     Args:
         pdf_path (str): Path to the PDF file.
+        model (PdfDocumentModel): Optional page model already parsed by another checker.
     Returns:
         dict: A dictionary where keys are page numbers and values are extracted text content.
     """
     pdf_content = {}
 
-    with fitz.open(pdf_path) as pdf:
-        for page_num in range(len(pdf)):
-            page = pdf[page_num]
+    pdf = model if model is not None else load_pdf_model(pdf_path)
+    for page in pdf:
+        # Extract text content from the page
+        text_content = page.text.strip()
 
-            # Extract text content from the page
-            text_content = page.get_text("text").strip()
+        # Preprocess the content to remove unwanted characters
+        text_content = preprocess_content(text_content)
 
-            # Preprocess the content to remove unwanted characters
-            text_content = preprocess_content(text_content)
-
-            # Store the extracted and cleaned text content
-            pdf_content[page_num + 1] = text_content
+        # Store the extracted and cleaned text content
+        pdf_content[page.number] = text_content
 
     return pdf_content
 
 
-def find_best_pdf_match(md_text, pdf_content_dict, threshold=0.85):
+@traced()
+def find_best_pdf_match(md_text, pdf_content_dict, threshold=0.85, expected_page=None):
     """
     Find the best matching PDF page for a given Markdown file based on content similarity.
     Args:
         md_text (str): Content of the Markdown file.
         pdf_content_dict (dict): Dictionary of PDF page numbers and their content.
         threshold (float): Minimum similarity score for a confident match.
+        expected_page (int): Page the file should match (see expected_pdf_page); when given, the
+            pages within PREFIX_WINDOW of it are scored first and the whole PDF only if none of
+            them reaches threshold.
     Returns:
         tuple: (best_match_page, similarity_score, confidence_level)
                - best_match_page: The page number of the best matching PDF page, or None if no match is found.
                - similarity_score: The similarity score of the best match.
                - confidence_level: "strict", "low", or "unmatched".
     """
+    if expected_page is not None:
+        window = {page: pdf_content_dict[page] for page in _window_pages(expected_page, pdf_content_dict)}
+        best_match_page, highest_similarity = _best_pair_match(md_text, window)
+        if highest_similarity >= threshold:
+            return _confidence(best_match_page, highest_similarity, threshold)
+    return _confidence(*_best_pair_match(md_text, pdf_content_dict), threshold)
+
+
+def _best_pair_match(md_text, pdf_content_dict):
+    """(page, score) of the most similar page, one TF-IDF vectorizer per (MD file, page) pair."""
     best_match_page = None
     highest_similarity = 0
 
     for page_num, pdf_text in pdf_content_dict.items():
         # Calculate cosine similarity between the Markdown text and the PDF page text
-        vectorizer = TfidfVectorizer(token_pattern=r"(?u)\b\w+\b").fit_transform([md_text, pdf_text])
-        similarity = cosine_similarity(vectorizer[0:1], vectorizer[1:2])[0][0]
+        vectorizer = sklearn_text.TfidfVectorizer(token_pattern=TOKEN_PATTERN).fit_transform([md_text, pdf_text])
+        similarity = sklearn_pairwise.cosine_similarity(vectorizer[0:1], vectorizer[1:2])[0][0]
 
         if similarity > highest_similarity:
             highest_similarity = similarity
             best_match_page = page_num
 
-    # Determine confidence level
+    return best_match_page, highest_similarity
+
+
+def expected_pdf_page(md_file):
+    """PDF page an N_name.md file should match (N + PAGE_OFFSET), or None without a numeric prefix."""
+    m = _PAGE_PREFIX.match(os.path.basename(md_file))
+    return int(m.group(1)) + PAGE_OFFSET if m else None
+
+
+def _window_pages(expected_page, pages):
+    """Pages (keys of pages) within PREFIX_WINDOW of expected_page, in page order."""
+    return [page for page in range(expected_page - PREFIX_WINDOW, expected_page + PREFIX_WINDOW + 1) if page in pages]
+
+
+def _confidence(best_match_page, highest_similarity, threshold):
+    """(page, score, level) for a best match; the page is dropped when the match is unconfident."""
     if highest_similarity >= threshold:
         return best_match_page, highest_similarity, "strict"
     elif highest_similarity >= 0.75:  # Adjust for low-confidence matches
@@ -117,69 +213,364 @@ def find_best_pdf_match(md_text, pdf_content_dict, threshold=0.85):
         return None, highest_similarity, "unmatched"
 
 
+def _tfidf_rows(md_texts, pdf_texts, tokenized=False):
+    """
+    L2-normalised TF-IDF rows of the Markdown and the PDF texts from one TfidfVectorizer
+    fitted over all of them (so IDF weights come from the whole corpus, not from each pair).
+    With tokenized, the texts are already minhash_index.tokenize() token lists.
+    """
+    if tokenized:
+        vectorizer = sklearn_text.TfidfVectorizer(analyzer=_pretokenized)
+    else:
+        vectorizer = sklearn_text.TfidfVectorizer(token_pattern=TOKEN_PATTERN)
+    try:
+        tfidf = vectorizer.fit_transform(list(md_texts) + list(pdf_texts))
+    except ValueError:  # no tokens in any text: every similarity is 0
+        tfidf = scipy_sparse.csr_matrix((len(md_texts) + len(pdf_texts), 1))
+    return tfidf[:len(md_texts)], tfidf[len(md_texts):]
+
+
+def _pretokenized(tokens):
+    return tokens
+
+
+def _product_blocks(md_rows, pdf_rows):
+    """Yield (first row, dense block) of md_rows x pdf_rows cosine similarities, SIMILARITY_CHUNK_ROWS rows at a time."""
+    pdf_cols = pdf_rows.T.tocsr()
+    for start in range(0, md_rows.shape[0], SIMILARITY_CHUNK_ROWS):
+        yield start, (md_rows[start:start + SIMILARITY_CHUNK_ROWS] @ pdf_cols).toarray()
+
+
+def _similarity_blocks(md_texts, pdf_texts):
+    """Yield (first row, dense block) of the MD x page cosine similarity matrix (see _tfidf_rows)."""
+    if not md_texts or not pdf_texts:
+        return
+    yield from _product_blocks(*_tfidf_rows(md_texts, pdf_texts))
+
+
+@traced()
+def similarity_matrix(md_texts, pdf_texts):
+    """
+    Cosine similarity of every Markdown text to every PDF page text (see _similarity_blocks).
+    Args:
+        md_texts (list): Markdown texts (matrix rows).
+        pdf_texts (list): PDF page texts (matrix columns).
+    Returns:
+        numpy.ndarray: (len(md_texts), len(pdf_texts)) similarity matrix.
+    """
+    scores = np.zeros((len(md_texts), len(pdf_texts)))
+    for start, block in _similarity_blocks(md_texts, pdf_texts):
+        scores[start:start + len(block)] = block
+    return scores
+
+
+@traced()
+def find_best_pdf_matches(md_content, pdf_content_dict, threshold=0.85, lsh=None, prefix_window=None):
+    """
+    Best matching PDF page of every Markdown file, from one corpus-wide similarity matrix.
+    Scores use corpus-wide IDF weights, so they differ somewhat from find_best_pdf_match's
+    per-pair scores; ties go to the earliest page as in find_best_pdf_match.
+    Args:
+        md_content (dict): Markdown file names and their content.
+        pdf_content_dict (dict): Dictionary of PDF page numbers and their content.
+        threshold (float): Minimum similarity score for a confident match.
+        lsh (bool): Score only candidate pages from a MinHash/LSH index (see
+            _find_best_pdf_matches_lsh); defaults to PDFs of at least LSH_MIN_PAGES pages.
+        prefix_window (bool): Score each file against the pages around its filename prefix first
+            (see _find_best_pdf_matches_window; defaults to PREFIX_WINDOW_SEARCH).
+    Returns:
+        dict: Markdown file name -> (best_match_page, similarity_score, confidence_level).
+    """
+    md_files = list(md_content)
+    pages = list(pdf_content_dict)
+    if lsh is None:
+        lsh = LSH_MIN_PAGES is not None and len(pages) >= LSH_MIN_PAGES
+    prefix_window = PREFIX_WINDOW_SEARCH if prefix_window is None else prefix_window
+    if not md_files or not pages:
+        return {md_file: (None, 0, "unmatched") for md_file in md_files}
+    if prefix_window:
+        return _find_best_pdf_matches_window(md_content, pdf_content_dict, threshold, lsh)
+    if lsh:
+        return _find_best_pdf_matches_lsh(md_content, pdf_content_dict, threshold)
+    matches = {}
+    for start, block in _similarity_blocks([md_content[f] for f in md_files], [pdf_content_dict[p] for p in pages]):
+        best = block.argmax(axis=1)
+        for md_file, col, highest in zip(md_files[start:], best.tolist(), block[np.arange(len(block)), best].tolist()):
+            matches[md_file] = _confidence(pages[col] if highest > 0 else None, highest, threshold)
+    return matches
+
+
+def _best_candidates(md_rows, pdf_rows, rows, cols):
+    """
+    Best of the candidate (row, column) pairs of every MD row, scoring only those pairs.
+    Returns:
+        tuple: (best column, best similarity) per MD row; -1 and 0 for rows without candidates.
+    """
+    best_col = np.full(md_rows.shape[0], -1)
+    best_sim = np.zeros(md_rows.shape[0])
+    if len(rows):
+        sims = np.asarray(md_rows[rows].multiply(pdf_rows[cols]).sum(axis=1)).ravel()
+        order = np.lexsort((cols, -sims, rows))
+        first = order[np.r_[True, rows[order][1:] != rows[order][:-1]]]
+        best_col[rows[first]] = cols[first]
+        best_sim[rows[first]] = sims[first]
+    return best_col, best_sim
+
+
+def _rescore_all_pages(md_rows, pdf_rows, best_col, best_sim, below):
+    """Replace the best column and similarity of every MD row scoring below `below` by its best over all pages."""
+    fallback = np.flatnonzero(best_sim < below)
+    if len(fallback):
+        for start, block in _product_blocks(md_rows[fallback], pdf_rows):
+            chunk = fallback[start:start + len(block)]
+            best_col[chunk] = block.argmax(axis=1)
+            best_sim[chunk] = block.max(axis=1)
+
+
+def _candidate_matches(md_files, pages, best_col, best_sim, threshold):
+    return {md_file: _confidence(pages[col] if sim > 0 else None, sim, threshold)
+            for md_file, col, sim in zip(md_files, best_col.tolist(), best_sim.tolist())}
+
+
+@traced()
+def _find_best_pdf_matches_window(md_content, pdf_content_dict, threshold, lsh):
+    """
+    find_best_pdf_matches scoring each N_name.md file against the pages within PREFIX_WINDOW of
+    expected_pdf_page first, O(files x window) pairs instead of O(files x pages). Files whose best
+    window page scores below threshold, and files without a numeric prefix, are matched against
+    the whole PDF (through the LSH candidates when lsh is set).
+    """
+    md_files = list(md_content)
+    pages = list(pdf_content_dict)
+    col_of = {page: col for col, page in enumerate(pages)}
+    rows, cols = [], []
+    for row, md_file in enumerate(md_files):
+        expected_page = expected_pdf_page(md_file)
+        if expected_page is not None:
+            window = _window_pages(expected_page, col_of)
+            rows.extend([row] * len(window))
+            cols.extend(col_of[page] for page in window)
+    md_tokens = [tokenize(md_content[f]) for f in md_files]
+    pdf_tokens = [tokenize(pdf_content_dict[p]) for p in pages]
+    md_rows, pdf_rows = _tfidf_rows(md_tokens, pdf_tokens, tokenized=True)
+    best_col, best_sim = _best_candidates(md_rows, pdf_rows, np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64))
+
+    # Files whose window holds no confident match may be off by more than PREFIX_WINDOW pages
+    missed = np.flatnonzero(best_sim < threshold)
+    if len(missed) and lsh:
+        lsh_col, lsh_sim = _lsh_best_pages([md_tokens[row] for row in missed], pdf_tokens, md_rows[missed], pdf_rows)
+        # The window page may not be an LSH candidate: keep it unless the global search beats it
+        better = lsh_sim > best_sim[missed]
+        best_col[missed[better]] = lsh_col[better]
+        best_sim[missed[better]] = lsh_sim[better]
+    else:
+        _rescore_all_pages(md_rows, pdf_rows, best_col, best_sim, threshold)
+    return _candidate_matches(md_files, pages, best_col, best_sim, threshold)
+
+
+@traced()
+def _find_best_pdf_matches_lsh(md_content, pdf_content_dict, threshold):
+    """
+    find_best_pdf_matches scoring each Markdown file only against its candidate pages from a
+    MinHash/LSH index (see _lsh_best_pages).
+    """
+    md_files = list(md_content)
+    pages = list(pdf_content_dict)
+    # One tokenizing pass feeds both the shingles and the TF-IDF vectorizer
+    md_tokens = [tokenize(md_content[f]) for f in md_files]
+    pdf_tokens = [tokenize(pdf_content_dict[p]) for p in pages]
+    md_rows, pdf_rows = _tfidf_rows(md_tokens, pdf_tokens, tokenized=True)
+    best_col, best_sim = _lsh_best_pages(md_tokens, pdf_tokens, md_rows, pdf_rows)
+    return _candidate_matches(md_files, pages, best_col, best_sim, threshold)
+
+
+def _lsh_best_pages(md_tokens, pdf_tokens, md_rows, pdf_rows):
+    """
+    Best page of every MD row among its LSH_MAX_CANDIDATES candidate pages: pages sharing a
+    MinHash/LSH band with it (common/minhash_index.py), most similar shingle sets first. Rows
+    whose best candidate scores below LSH_RESCORE_BELOW (including rows without candidates)
+    are scored against every page.
+    Returns:
+        tuple: (best column, best similarity) per MD row.
+    """
+    with stage("markdown_pdf_verification.lsh_candidates"):
+        index = MinHashLSH.from_tokens(pdf_tokens, LSH_THRESHOLD)
+        rows, cols = index.query(minhash_signatures(md_tokens), LSH_MAX_CANDIDATES)
+
+    best_col, best_sim = _best_candidates(md_rows, pdf_rows, rows, cols)
+    # Files whose best candidate is not even a low-confidence match may have missed their page
+    _rescore_all_pages(md_rows, pdf_rows, best_col, best_sim, LSH_RESCORE_BELOW)
+    return best_col, best_sim
+
+
+@traced()
+def similarity_candidates(md_texts, pdf_texts, per_file=None, min_similarity=None):
+    """
+    Sparse candidate pages for assignment: the per_file most similar pages of each Markdown
+    text, dropping pages below min_similarity. The dense matrix is never held whole.
+    Args:
+        md_texts (list): Markdown texts (rows).
+        pdf_texts (list): PDF page texts (columns).
+        per_file (int): Candidates kept per Markdown text (defaults to ASSIGNMENT_CANDIDATES).
+        min_similarity (float): Smallest similarity kept (defaults to ASSIGNMENT_MIN_SIMILARITY).
+    Returns:
+        tuple: (candidates, best) - a (rows, columns) scipy CSR matrix of similarities and
+        each row's highest similarity (kept or not).
+    """
+    per_file = ASSIGNMENT_CANDIDATES if per_file is None else per_file
+    min_similarity = ASSIGNMENT_MIN_SIMILARITY if min_similarity is None else min_similarity
+    best = np.zeros(len(md_texts))
+    rows, cols, sims = [], [], []
+    for start, block in _similarity_blocks(md_texts, pdf_texts):
+        k = min(per_file, block.shape[1])
+        top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        top_sims = np.take_along_axis(block, top, axis=1)
+        best[start:start + len(block)] = block.max(axis=1)
+        keep = top_sims >= min_similarity
+        rows.append(np.nonzero(keep)[0] + start)
+        cols.append(top[keep])
+        sims.append(top_sims[keep])
+    shape = (len(md_texts), len(pdf_texts))
+    if not rows:
+        return scipy_sparse.csr_matrix(shape), best
+    candidates = scipy_sparse.csr_matrix((np.concatenate(sims), (np.concatenate(rows), np.concatenate(cols))), shape=shape)
+    return candidates, best
+
+
+def assign_pages(candidates, max_files_per_page=None):
+    """
+    Assignment of rows to columns that maximizes the total similarity, with each column taking
+    at most max_files_per_page rows. Solved as a min-cost full bipartite matching on the sparse
+    candidate graph: every column is repeated once per slot, and every row also gets a private
+    "unassigned" column whose cost equals a zero-similarity match.
+    Args:
+        candidates: (rows, columns) scipy sparse matrix of candidate similarities in [0, 1].
+        max_files_per_page (int): Rows one column may take (defaults to ASSIGNMENT_MAX_FILES_PER_PAGE).
+    Returns:
+        numpy.ndarray: Assigned column of each row, -1 where the row is unassigned.
+    """
+    capacity = ASSIGNMENT_MAX_FILES_PER_PAGE if max_files_per_page is None else max_files_per_page
+    n_rows, n_cols = candidates.shape
+    assigned = np.full(n_rows, -1)
+    edges = candidates.tocoo()
+    if not edges.nnz:
+        return assigned
+    # Costs must be non-zero to stay in the sparse graph; the offset is the same for every edge
+    costs = 1.0 - edges.data + 1e-9
+    rows = np.concatenate([np.tile(edges.row, capacity), np.arange(n_rows)])
+    cols = np.concatenate([edges.col * capacity + slot for slot in range(capacity)] + [n_cols * capacity + np.arange(n_rows)])
+    data = np.concatenate([np.tile(costs, capacity), np.full(n_rows, 1.0 + 1e-9)])
+    graph = scipy_sparse.csr_matrix((data, (rows, cols)), shape=(n_rows, n_cols * capacity + n_rows))
+    row_ind, col_ind = scipy_csgraph.min_weight_full_bipartite_matching(graph)
+    real = col_ind < n_cols * capacity
+    assigned[row_ind[real]] = col_ind[real] // capacity
+    return assigned
+
+
+@traced()
+def find_pdf_page_assignment(md_content, pdf_content_dict, threshold=0.85, max_files_per_page=None):
+    """
+    One-to-one (or at most max_files_per_page-to-one) mapping of Markdown files to PDF pages
+    with the highest total similarity, instead of every file taking its own best page.
+    Args:
+        md_content (dict): Markdown file names and their content.
+        pdf_content_dict (dict): Dictionary of PDF page numbers and their content.
+        threshold (float): Minimum similarity score for a confident match.
+        max_files_per_page (int): Files one page may take (defaults to ASSIGNMENT_MAX_FILES_PER_PAGE).
+    Returns:
+        tuple: (matches, unassigned_pages) - Markdown file name -> (page, similarity_score,
+        confidence_level) as in find_best_pdf_matches (unassigned files are "unmatched" with their
+        best score), and the pages no file was assigned to.
+    """
+    md_files = list(md_content)
+    pages = list(pdf_content_dict)
+    candidates, best = similarity_candidates([md_content[f] for f in md_files], [pdf_content_dict[p] for p in pages])
+    assigned = assign_pages(candidates, max_files_per_page)
+    matches = {}
+    for row, md_file in enumerate(md_files):
+        col = int(assigned[row])
+        if col < 0:
+            matches[md_file] = (None, float(best[row]), "unmatched")
+        else:
+            matches[md_file] = _confidence(pages[col], float(candidates[row, col]), threshold)
+    taken = set(assigned[assigned >= 0].tolist())
+    return matches, [page for col, page in enumerate(pages) if col not in taken]
+
+
+@traced()
 def generate_diff_html(md_text, pdf_text):
     """
-    Generates HTML highlighting differences between Markdown and PDF content.
+    Generates HTML highlighting differences between Markdown and PDF content at the word level.
+    The alignment is bounded in time (common/token_diff.py): on large, dissimilar pages the
+    unaligned stretches are highlighted as whole blocks.
     Args:
         md_text (str): Text content from the Markdown file.
         pdf_text (str): Text content from the PDF file.
     Returns:
         tuple: Two HTML strings with differences highlighted.
     """
-    diff = SequenceMatcher(None, md_text, pdf_text).get_opcodes()
-    old_html = ""
-    new_html = ""
+    md_words = md_text.split()
+    pdf_words = pdf_text.split()
+    old_html = []
+    new_html = []
 
-    for tag, i1, i2, j1, j2 in diff:
+    for tag, i1, i2, j1, j2 in diff_tokens(md_words, pdf_words):
         if tag == "replace":
-            old_html += f'<span class="old">{md_text[i1:i2]}</span>'
-            new_html += f'<span class="new">{pdf_text[j1:j2]}</span>'
+            old_html.append(f'<span class="old">{esc(" ".join(md_words[i1:i2]))}</span>')
+            new_html.append(f'<span class="new">{esc(" ".join(pdf_words[j1:j2]))}</span>')
         elif tag == "delete":
-            old_html += f'<span class="old">{md_text[i1:i2]}</span>'
+            old_html.append(f'<span class="old">{esc(" ".join(md_words[i1:i2]))}</span>')
         elif tag == "insert":
-            new_html += f'<span class="new">{pdf_text[j1:j2]}</span>'
+            new_html.append(f'<span class="new">{esc(" ".join(pdf_words[j1:j2]))}</span>')
         elif tag == "equal":
-            old_html += f'<span class="unchanged">{md_text[i1:i2]}</span>'
-            new_html += f'<span class="unchanged">{pdf_text[j1:j2]}</span>'
+            old_html.append(f'<span class="unchanged">{esc(" ".join(md_words[i1:i2]))}</span>')
+            new_html.append(f'<span class="unchanged">{esc(" ".join(pdf_words[j1:j2]))}</span>')
 
-    return old_html, new_html
+    return " ".join(old_html), " ".join(new_html)
 
 
-def compare_md_and_pdf(md_content, pdf_content, html_file="comparison_report.html"):
+@traced()
+def compare_md_and_pdf(md_content, pdf_content, html_file="comparison_report.html", corpus=None, assignment=None,
+                       prefix_window=None):
     """
     Compares text content extracted from Markdown files and PDF files and generates an HTML report.
     Args:
         md_content (dict): Extracted text content from Markdown files.
         pdf_content (dict): Extracted text content from PDF files.
         html_file (str): Path to the HTML report file.
+        corpus (bool): Match all files through one similarity matrix (defaults to CORPUS_MATCHING).
+        assignment (bool): Assign files to pages one-to-one with find_pdf_page_assignment and
+            list the unassigned pages (defaults to ASSIGNMENT_MODE; implies corpus).
+        prefix_window (bool): Search the pages around each N_name.md file's prefix page before
+            the whole PDF (defaults to PREFIX_WINDOW_SEARCH; not used by assignment).
+    Returns:
+        list: One dict per Markdown file with its matched page, similarity score and confidence.
     """
-    with open(html_file, "w", encoding="utf-8") as html:
-        # Write the HTML header
-        html.write("""
-        <!DOCTYPE html>
-        <html lang="en">
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>Markdown to PDF Comparison Report</title>
-            <style>
-                body { font-family: Arial, sans-serif; line-height: 1.6; margin: 20px; }
-                h1 { color: #333; }
-                h2 { color: #555; }
-                .old { color: red; font-weight: bold; }
-                .new { color: green; font-weight: bold; }
-                .unchanged { color: black; }
-                .file-section { margin-bottom: 20px; }
-                .diff { margin: 10px 0; padding: 10px; border: 1px solid #ddd; background: #f4f4f4; }
-            </style>
-        </head>
-        <body>
-            <h1>Markdown to PDF Comparison Report</h1>
-        """)
+    assignment = ASSIGNMENT_MODE if assignment is None else assignment
+    corpus = assignment or (CORPUS_MATCHING if corpus is None else corpus)
+    prefix_window = PREFIX_WINDOW_SEARCH if prefix_window is None else prefix_window
+    unassigned_pages = []
+    if assignment:
+        matches, unassigned_pages = find_pdf_page_assignment(md_content, pdf_content)
+    else:
+        matches = find_best_pdf_matches(md_content, pdf_content, prefix_window=prefix_window) if corpus else {}
+    results = []
+    with HtmlReport(html_file, "Markdown to PDF Comparison Report") as report:
+        report.add_table("files", "Markdown Files", ["File", "Matched Page", "Similarity Score", "Confidence"], details=True)
 
         for md_file, md_text in md_content.items():
             # Find the best matching PDF page
-            best_match_page, similarity_score, confidence_level = find_best_pdf_match(md_text, pdf_content)
+            if corpus:
+                best_match_page, similarity_score, confidence_level = matches[md_file]
+            else:
+                best_match_page, similarity_score, confidence_level = find_best_pdf_match(
+                    md_text, pdf_content, expected_page=expected_pdf_page(md_file) if prefix_window else None)
+            results.append({
+                "md_file": md_file,
+                "page": best_match_page,
+                "similarity": float(similarity_score),
+                "confidence": confidence_level,
+            })
 
             # Get the corresponding PDF page content
             pdf_text = pdf_content.get(best_match_page, "")
@@ -188,25 +579,26 @@ def compare_md_and_pdf(md_content, pdf_content, html_file="comparison_report.htm
             old_html, new_html = generate_diff_html(md_text, pdf_text)
 
             # Write the file comparison section
-            html.write(f"""
-            <div class="file-section">
-                <h2>File: {md_file} (Matched with: Page {best_match_page}, Similarity Score: {similarity_score:.2f}, Confidence: {confidence_level})</h2>
-                <div class="diff">
-                    <h3>Markdown Content:</h3>
-                    <div>{old_html}</div>
-                    <h3>PDF Content:</h3>
-                    <div>{new_html}</div>
-                </div>
-            </div>
-            """)
-
-        # Write the HTML footer
-        html.write("""
-        </body>
-        </html>
-        """)
+            with stage("markdown_pdf_verification.write_html_section"):
+                report.add_row(
+                    "files", [md_file, best_match_page, f"{similarity_score:.2f}", confidence_level],
+                    detail=diff_columns("Markdown Content:", old_html, "PDF Content:", new_html),
+                    detail_title=f"File: {md_file} (Matched with: Page {best_match_page}, Similarity Score: {similarity_score:.2f}, Confidence: {confidence_level})",
+                    row_class="fail" if confidence_level == "unmatched" else None,
+                )
+
+        for level in ("strict", "low", "unmatched"):
+            report.add_summary(f"Confidence {level}", sum(1 for r in results if r["confidence"] == level))
+
+        if assignment:
+            report.add_summary("PDF pages without a Markdown file", len(unassigned_pages))
+            report.add_table("pages", "PDF Pages Without a Markdown File", ["Page", "Text"],
+                             empty_message="Every PDF page was assigned a Markdown file.")
+            for page in unassigned_pages:
+                report.add_row("pages", [page, pdf_content[page][:200]], row_class="warn")
 
     print(f"Comparison complete. HTML report saved to {html_file}.")
+    return results
 
 
 # Example Usage
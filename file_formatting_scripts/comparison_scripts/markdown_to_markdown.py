@@ -1,9 +1,22 @@
 import os
 import re
+import sys
 import difflib
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.run_state import RunState, combined_digest, text_digest  # noqa: E402
+from common.instrumentation import stage, traced  # noqa: E402
+from common.lazy_import import lazy_import  # noqa: E402
+from common.report_writer import HtmlReport, Markup, diff_columns, esc  # noqa: E402
+
+# scikit-learn is slow to import; load it on first match
+sklearn_text = lazy_import("sklearn.feature_extraction.text")
+sklearn_pairwise = lazy_import("sklearn.metrics.pairwise")
+
+# Bump when the diff markup changes so diffs stored in run-state files are rebuilt
+DIFF_HTML_VERSION = "2"
+
+@traced()
 def extract_md_content(md_directory_path, is_old_variant=False):
     """Extract and clean content of all markdown files in a directory."""
     md_content_dict = {}
@@ -16,6 +29,7 @@ def extract_md_content(md_directory_path, is_old_variant=False):
                 md_content_dict[md_file] = cleaned_content
     return md_content_dict
 
+@traced()
 def clean_md_content(md_content, is_old_variant=False):
     """
     Remove author info, image links, and internal/document links from markdown content.
@@ -52,18 +66,19 @@ def clean_md_content(md_content, is_old_variant=False):
 
 def extract_text_similarity(text1, text2):
     """Calculate cosine similarity between two texts."""
-    vectorizer = TfidfVectorizer(token_pattern=r"(?u)\b\w+\b").fit_transform([text1, text2])
+    vectorizer = sklearn_text.TfidfVectorizer(token_pattern=r"(?u)\b\w+\b").fit_transform([text1, text2])
     vectors = vectorizer.toarray()
-    cos_sim = cosine_similarity(vectors)
+    cos_sim = sklearn_pairwise.cosine_similarity(vectors)
     return cos_sim[0][1]
 
+@traced()
 def find_matching_new_version_file(old_version_file_content, new_version_content_dict, strict_threshold=0.9, low_confidence_threshold=0.85):
     best_match = None
     highest_similarity = 0
 
     for new_version_file, new_version_content in new_version_content_dict.items():
-        vectorizer = TfidfVectorizer(token_pattern=r"(?u)\b\w+\b").fit_transform([old_version_file_content, new_version_content])
-        similarity = cosine_similarity(vectorizer[0:1], vectorizer[1:2])[0][0]
+        vectorizer = sklearn_text.TfidfVectorizer(token_pattern=r"(?u)\b\w+\b").fit_transform([old_version_file_content, new_version_content])
+        similarity = sklearn_pairwise.cosine_similarity(vectorizer[0:1], vectorizer[1:2])[0][0]
         if similarity > highest_similarity:
             highest_similarity = similarity
             best_match = new_version_file
@@ -96,6 +111,7 @@ def generate_grouped_diff(text1, text2):
 
     return old_variant, new_variant
 
+@traced()
 def generate_grouped_diff_html(text1, text2):
     # Split the texts into words
     words1 = text1.split()
@@ -108,22 +124,43 @@ def generate_grouped_diff_html(text1, text2):
 
     for tag, i1, i2, j1, j2 in diff:
         if tag == "replace":
-            old_html += f'<span class="old">{" ".join(words1[i1:i2])}</span> '
-            new_html += f'<span class="new">{" ".join(words2[j1:j2])}</span> '
+            old_html += f'<span class="old">{esc(" ".join(words1[i1:i2]))}</span> '
+            new_html += f'<span class="new">{esc(" ".join(words2[j1:j2]))}</span> '
         elif tag == "delete":
-            old_html += f'<span class="old">{" ".join(words1[i1:i2])}</span> '
+            old_html += f'<span class="old">{esc(" ".join(words1[i1:i2]))}</span> '
         elif tag == "insert":
-            new_html += f'<span class="new">{" ".join(words2[j1:j2])}</span> '
+            new_html += f'<span class="new">{esc(" ".join(words2[j1:j2]))}</span> '
         elif tag == "equal":
-            old_html += f'<span class="unchanged">{" ".join(words1[i1:i2])}</span> '
-            new_html += f'<span class="unchanged">{" ".join(words2[j1:j2])}</span> '
+            old_html += f'<span class="unchanged">{esc(" ".join(words1[i1:i2]))}</span> '
+            new_html += f'<span class="unchanged">{esc(" ".join(words2[j1:j2]))}</span> '
 
     return old_html.strip(), new_html.strip()
 
-def compare_markdown_files_html(old_version_dir, new_version_dir, log_dir, threshold=0.97):
+@traced()
+def match_and_diff_file(new_version_content, old_version_content_dict):
+    """Find the best old-version match for one file and build its word-level diff."""
+    old_version_file_name, similarity_score, confidence_level = find_matching_new_version_file(
+        new_version_content, old_version_content_dict
+    )
+    result = {
+        "old_version_file_name": old_version_file_name,
+        "similarity_score": float(similarity_score),
+        "confidence_level": confidence_level,
+        "old_html": "",
+        "new_html": "",
+    }
+    if confidence_level != "unmatched":
+        old_version_content = old_version_content_dict[old_version_file_name]
+        result["old_html"], result["new_html"] = generate_grouped_diff_html(old_version_content, new_version_content)
+    return result
+
+@traced()
+def compare_markdown_files_html(old_version_dir, new_version_dir, log_dir, threshold=0.97, state_file=None):
     """
     Compare markdown files in new_version (older version) and old_version (new version) directories and generate an HTML report.
     Preserves original language content while keeping interface in English.
+    If state_file is given, files whose content (and the old version folder) are unchanged
+    since the previous run reuse their stored match and diff instead of being recomputed.
     """
     log_filename = os.path.join(log_dir, "markdown_comparison.html")
 
@@ -139,65 +176,43 @@ def compare_markdown_files_html(old_version_dir, new_version_dir, log_dir, thres
 
     all_files_match = True
 
-    # Use utf-8 encoding for the HTML file to preserve original languages
-    with open(log_filename, 'w', encoding='utf-8') as html_file:
-        html_file.write("""
-        <html>
-        <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Markdown Comparison Report</title>
-        <style>
-            body { 
-                font-family: Arial, sans-serif, "Segoe UI", "Noto Sans", sans-serif; 
-                margin: 20px; 
-                line-height: 1.6;
-            }
-            .file-section { margin-bottom: 40px; border-bottom: 1px solid #eee; padding-bottom: 20px; }
-            .diff { display: flex; gap: 40px; }
-            .diff > div { width: 48%; }
-            .old { background: #faa; color: #900; text-decoration: line-through; padding: 2px 4px; border-radius: 3px; }
-            .new { background: #cfc; color: #060; padding: 2px 4px; border-radius: 3px; }
-            .unchanged { color: #333; }
-            .summary { border-top: 2px solid #333; margin-top: 40px; padding-top: 20px; }
-            .content-box { 
-                border: 1px solid #ddd; 
-                padding: 15px; 
-                border-radius: 5px; 
-                background: #f9f9f9; 
-                white-space: pre-wrap; 
-                word-wrap: break-word;
-                font-family: "Courier New", monospace;
-            }
-            .similarity-high { color: #27ae60; font-weight: bold; }
-            .similarity-medium { color: #f39c12; font-weight: bold; }
-            .similarity-low { color: #e74c3c; font-weight: bold; }
-        </style>
-        </head>
-        <body>
-        <h1>Markdown Comparison Report - Original Language Content Preserved</h1>
-        """)
-
-        new_version_files = set(new_version_content_dict.keys())
-        old_version_files = set(old_version_content_dict.keys())
+    # Incremental mode: a file's result depends on its own content and the whole old version set
+    state = RunState(state_file, "markdown_to_markdown.compare_markdown_files_html",
+                     {"old_version_dir": os.path.abspath(old_version_dir), "new_version_dir": os.path.abspath(new_version_dir),
+                      "diff_html": DIFF_HTML_VERSION})
+    old_set_digest = combined_digest(
+        text_digest(name + "\0" + content) for name, content in old_version_content_dict.items()
+    )
+
+    # The report streams one index row per file and puts the diffs on sharded detail pages
+    with HtmlReport(log_filename, "Markdown Comparison Report - Original Language Content Preserved") as report:
+        report.add_table("files", "Compared Files", ["File", "Matched with", "Similarity Score", "Confidence"], details=True)
+        report.add_table("changed", "Files with content changes", ["File"], "No files with content changes.")
+        report.add_table("skipped_new", "Skipped files (Not present in old version directory)", ["File"])
+        report.add_table("skipped_old", "Skipped files (Not present in new version directory)", ["File"])
 
         # Check for matches from new_version to old_version
         for file_name, new_version_content in new_version_content_dict.items():
-            # Find the best matching old_version file based on content similarity
-            old_version_file_name, similarity_score, confidence_level = find_matching_new_version_file(
-                new_version_content, old_version_content_dict
+            # Find the best matching old_version file based on content similarity (reused when unchanged)
+            result = state.get_or_compute(
+                file_name,
+                {"new": text_digest(new_version_content), "old_set": old_set_digest},
+                lambda: match_and_diff_file(new_version_content, old_version_content_dict)
             )
+            old_version_file_name = result["old_version_file_name"]
+            similarity_score = result["similarity_score"]
+            confidence_level = result["confidence_level"]
 
             if confidence_level == "unmatched":
                 skipped_in_new_version.append(file_name)
+                report.add_row("skipped_new", [file_name])
                 all_files_match = False
                 continue
 
             if confidence_level == "low":
                 print(f"Low-confidence match: {file_name} -> {old_version_file_name} (Similarity: {similarity_score:.2f})")
 
-            old_version_content = old_version_content_dict[old_version_file_name]
-            old_html, new_html = generate_grouped_diff_html(old_version_content, new_version_content)
+            old_html, new_html = result["old_html"], result["new_html"]
 
             # Increment the counter for matched files
             num_matched += 1
@@ -206,66 +221,39 @@ def compare_markdown_files_html(old_version_dir, new_version_dir, log_dir, thres
             if similarity_score <= threshold:
                 num_changed += 1
                 changed_files.append(file_name)
+                report.add_row("changed", [file_name])
 
             # Determine similarity class for styling
             similarity_class = "similarity-high" if similarity_score >= 0.95 else "similarity-medium" if similarity_score >= 0.85 else "similarity-low"
 
             # Write the file comparison section with preserved original language content
-            html_file.write(f"""
-            <div class="file-section">
-                <h2>File: {file_name}</h2>
-                <p><strong>Matched with:</strong> {old_version_file_name}</p>
-                <p><strong>Similarity Score:</strong> <span class="{similarity_class}">{similarity_score:.4f}</span></p>
-                <p><strong>Confidence:</strong> {confidence_level}</p>
-                
-                <div class="diff">
-                    <div>
-                        <h3>Old Version Content:</h3>
-                        <div class="content-box">{old_html}</div>
-                    </div>
-                    <div>
-                        <h3>New Version Content:</h3>
-                        <div class="content-box">{new_html}</div>
-                    </div>
-                </div>
-            </div>
-            """)
+            with stage("markdown_to_markdown.write_html_section"):
+                report.add_row(
+                    "files",
+                    [file_name, old_version_file_name,
+                     Markup(f'<span class="{similarity_class}">{similarity_score:.4f}</span>'), confidence_level],
+                    detail=diff_columns("Old Version Content:", old_html, "New Version Content:", new_html),
+                    detail_title=f"File: {file_name} (matched with {old_version_file_name})",
+                )
+
+        for skipped_file in skipped_in_old_version:
+            report.add_row("skipped_old", [skipped_file])
 
         # Write the summary section in English
-        html_file.write(f"""
-        <div class="summary">
-            <h2>Summary</h2>
-            <p><strong>Total matched files:</strong> {num_matched}</p>
-            <p><strong>Total .md files with changes:</strong> {num_changed}</p>
-            <p><strong>Skipped files in new version directory:</strong> {len(skipped_in_new_version)}</p>
-            <p><strong>Skipped files in old version directory:</strong> {len(skipped_in_old_version)}</p>
-        """)
-
-        if changed_files:
-            html_file.write("<h3>Files with content changes:</h3><ul>")
-            for changed_file in changed_files:
-                html_file.write(f"<li>{changed_file}</li>")
-            html_file.write("</ul>")
-
-        if skipped_in_new_version:
-            html_file.write("<h3>Skipped files (Not present in old version directory):</h3><ul>")
-            for skipped_file in skipped_in_new_version:
-                html_file.write(f"<li>{skipped_file}</li>")
-            html_file.write("</ul>")
-
-        if skipped_in_old_version:
-            html_file.write("<h3>Skipped files (Not present in new version directory):</h3><ul>")
-            for skipped_file in skipped_in_old_version:
-                html_file.write(f"<li>{skipped_file}</li>")
-            html_file.write("</ul>")
-
-        html_file.write("</div></body></html>")
+        report.add_summary("Total matched files", num_matched)
+        report.add_summary("Total .md files with changes", num_changed)
+        report.add_summary("Skipped files in new version directory", len(skipped_in_new_version))
+        report.add_summary("Skipped files in old version directory", len(skipped_in_old_version))
+
+    state.save()
 
     # Print summary in English
     print(f"\nTotal matched files: {num_matched}")
     print(f"Total .md files with changes: {num_changed}")
     print(f"Skipped files in new version directory: {len(skipped_in_new_version)}")
     print(f"Skipped files in old version directory: {len(skipped_in_old_version)}")
+    if state.enabled:
+        print(f"Incremental run: {state.summary()}")
     print(f"\nComparison results have been saved to {log_filename}.")
 
     # Print only the files with real content edits in English
@@ -1,7 +1,18 @@
 import re
 import os
-import openpyxl
-from pptx import Presentation
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.extraction_cache import cached_extract  # noqa: E402
+from common.instrumentation import traced  # noqa: E402
+from common.lazy_import import lazy_import  # noqa: E402
+
+# Heavy dependencies are imported on first use
+openpyxl = lazy_import("openpyxl")
+pptx = lazy_import("pptx")
+
+# Bump when extract_slide_details output changes so cached entries are invalidated
+SLIDE_DETAILS_VERSION = "1"
 
 def clean_text(text):
     """Remove illegal characters and format title for filenames."""
@@ -36,6 +47,12 @@ def extract_slide_details(prs):
 
     return slides
 
+@traced()
+def load_slide_details(ppt_path):
+    """Slide details for a deck, served from the extraction cache when the file is unchanged."""
+    return cached_extract(ppt_path, "new_old_version.slide_details", SLIDE_DETAILS_VERSION,
+                          lambda: extract_slide_details(pptx.Presentation(ppt_path)))
+
 def find_closest_match(new_slide_number, old_slides):
     """Find the closest matching old slide within a ±2 slide range."""
     closest_match = None
@@ -49,13 +66,11 @@ def find_closest_match(new_slide_number, old_slides):
 
     return closest_match
 
+@traced()
 def compare_slide_titles_and_content(ppt_old, ppt_new, output_folder):
     """Compare slide titles, text content, and images, ensuring close matches."""
-    prs_old = Presentation(ppt_old)
-    prs_new = Presentation(ppt_new)
-
-    new_slides = extract_slide_details(prs_new)  # New PPT is the source of truth
-    old_slides = extract_slide_details(prs_old)
+    new_slides = load_slide_details(ppt_new)  # New PPT is the source of truth
+    old_slides = load_slide_details(ppt_old)
 
     # Get first slide title for naming the Excel file
     first_slide_title = new_slides[0]["title"] if new_slides else "ComparisonReport"
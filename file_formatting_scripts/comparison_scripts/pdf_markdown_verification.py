@@ -1,11 +1,27 @@
 from difflib import SequenceMatcher
-import pdfplumber
-import fitz  # PyMuPDF
 import sys
 import os
 import re
 import glob
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.pdf_page_model import load_pdf_model  # noqa: E402
+from common.run_state import RunState, text_digest  # noqa: E402
+from common.instrumentation import stage, traced  # noqa: E402
+from common.report_writer import HtmlReport, Markup, diff_columns, esc  # noqa: E402
+from common.result_export import ResultExporter, export_stem  # noqa: E402
+
+# Bump when the diff markup changes so diffs stored in run-state files are rebuilt
+DIFF_HTML_VERSION = "2"
+
+# Column types of the exported per-page results
+PAGE_EXPORT_COLUMNS = {
+    "page": "int64",
+    "similarity": "float64",
+    "md_missing": "boolean",
+    "low_similarity": "boolean",
+}
+
 def is_heading(span, threshold_size=12):
     return span["size"] >= threshold_size and "bold" in span["font"].lower()
 
@@ -35,6 +51,7 @@ def is_purple(color):
     r, g, b = color
     # Define thresholds for purple
     return r > 100 and b > 100 and g < 100  # High red and blue, low green
+@traced()
 def remove_headers_and_footers(pdf_content):
     """
     Removes headers and footers from the extracted PDF content.
@@ -58,30 +75,32 @@ def remove_headers_and_footers(pdf_content):
 
     return cleaned_content
 
-def extract_pdf_content(pdf_path):
+@traced()
+def extract_pdf_content(pdf_path, model=None):
     """
     Extracts raw content from a PDF file and preprocesses it.
     Args:
         pdf_path (str): Path to the PDF file.
+        model (PdfDocumentModel): Optional page model already parsed by another checker.
     Returns:
         dict: A dictionary where keys are page numbers and values are the raw content of each page.
     """
     pdf_content = {}
 
-    # Open the PDF file
-    with fitz.open(pdf_path) as pdf:
-        for page_num in range(len(pdf)):
-            page = pdf[page_num]
-            # Extract text from the page
-            page_text = page.get_text("text")  # Extract text in reading order
-            # Preprocess the content to remove unwanted characters
-            pdf_content[page_num + 1] = preprocess_content(page_text.strip())  # Store text by page number (1-based index)
+    # Reuse the shared single-parse page model
+    pdf = model if model is not None else load_pdf_model(pdf_path)
+    for page in pdf:
+        # Text in reading order, captured once when the model was built
+        page_text = page.text
+        # Preprocess the content to remove unwanted characters
+        pdf_content[page.number] = preprocess_content(page_text.strip())  # Store text by page number (1-based index)
 
     # Remove headers and footers
     pdf_content = remove_headers_and_footers(pdf_content)
 
     return pdf_content
 
+@traced()
 def extract_markdown_content(md_folder):
     """
     Extracts and preprocesses content from Markdown files.
@@ -121,6 +140,7 @@ def preprocess_content(content):
     cleaned_content = re.sub(r"\s+", " ", cleaned_content).strip()  # Normalize spaces
     return cleaned_content
 
+@traced()
 def normalize_pdf_content(pdf_content):
     """
     Processes the extracted PDF content, detects headings based on font size and color,
@@ -163,6 +183,7 @@ def normalize_pdf_content(pdf_content):
 def calculate_similarity(text1, text2):
     return SequenceMatcher(None, text1, text2).ratio() * 100
 
+@traced()
 def generate_diff_html(pdf_text, md_text):
     """
     Generates HTML highlighting differences between PDF and Markdown content at the word level.
@@ -183,111 +204,107 @@ def generate_diff_html(pdf_text, md_text):
 
     for tag, i1, i2, j1, j2 in diff:
         if tag == "replace":
-            pdf_html += f'<span class="removed">{" ".join(pdf_words[i1:i2])}</span> '
-            md_html += f'<span class="added">{" ".join(md_words[j1:j2])}</span> '
+            pdf_html += f'<span class="removed">{esc(" ".join(pdf_words[i1:i2]))}</span> '
+            md_html += f'<span class="added">{esc(" ".join(md_words[j1:j2]))}</span> '
         elif tag == "delete":
-            pdf_html += f'<span class="removed">{" ".join(pdf_words[i1:i2])}</span> '
+            pdf_html += f'<span class="removed">{esc(" ".join(pdf_words[i1:i2]))}</span> '
         elif tag == "insert":
-            md_html += f'<span class="added">{" ".join(md_words[j1:j2])}</span> '
+            md_html += f'<span class="added">{esc(" ".join(md_words[j1:j2]))}</span> '
         elif tag == "equal":
-            pdf_html += f'<span class="unchanged">{" ".join(pdf_words[i1:i2])}</span> '
-            md_html += f'<span class="unchanged">{" ".join(md_words[j1:j2])}</span> '
+            pdf_html += f'<span class="unchanged">{esc(" ".join(pdf_words[i1:i2]))}</span> '
+            md_html += f'<span class="unchanged">{esc(" ".join(md_words[j1:j2]))}</span> '
 
     return pdf_html.strip(), md_html.strip()
 
-def compare_pdf_and_markdown_html(pdf_pages, md_content_by_page, threshold=90, report_threshold=70, html_file="comparison_report.html"):
+@traced()
+def compare_page_pair(pdf_page_content, md_page_content):
+    """Similarity and highlighted diff for one PDF page / Markdown file pair."""
+    similarity = calculate_similarity(pdf_page_content, md_page_content)
+    pdf_html, md_html = generate_diff_html(pdf_page_content, md_page_content)
+    return {"similarity": similarity, "pdf_html": pdf_html, "md_html": md_html}
+
+@traced()
+def compare_pdf_and_markdown_html(pdf_pages, md_content_by_page, threshold=90, report_threshold=70, html_file="comparison_report.html", state_file=None):
     """
     Compares PDF and Markdown content and generates an HTML report.
+    Every page's similarity is also exported as JSONL/Parquet next to html_file.
     Args:
         pdf_pages (dict): Extracted PDF content by page.
         md_content_by_page (dict): Extracted Markdown content by page.
         threshold (int): Minimum similarity percentage for a confident match.
         report_threshold (int): Minimum similarity percentage to avoid being flagged.
         html_file (str): Path to the HTML report file.
+        state_file (str): Optional run-state file; pages whose PDF and Markdown text are
+            unchanged since the previous run reuse their stored similarity and diff.
+    Returns:
+        list: (page, similarity) for pages below report_threshold (0 when the Markdown file is missing).
     """
     low_similarity_pages = []  # To store pages with similarity below the report threshold
+    state = RunState(state_file, "pdf_markdown_verification.compare_pdf_and_markdown_html",
+                     {"diff_html": DIFF_HTML_VERSION})
 
-    with open(html_file, "w", encoding="utf-8") as html:
-        # Write the HTML header
-        html.write("""
-        <!DOCTYPE html>
-        <html lang="en">
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>PDF to Markdown Comparison Report</title>
-            <style>
-                body { font-family: Arial, sans-serif; line-height: 1.6; margin: 20px; }
-                h1 { color: #333; }
-                h2 { color: #555; }
-                .low-similarity { color: red; font-weight: bold; }
-                .high-similarity { color: green; font-weight: bold; }
-                .content-section { margin-bottom: 20px; }
-                .diff { margin: 10px 0; padding: 10px; border: 1px solid #ddd; background: #f4f4f4; }
-                .removed { color: red; font-weight: bold; }
-                .added { color: green; font-weight: bold; }
-                .unchanged { color: black; }
-                .pdf-content { color: blue; }
-                .md-content { color: purple; }
-            </style>
-        </head>
-        <body>
-            <h1>PDF to Markdown Comparison Report</h1>
-        """)
+    with HtmlReport(html_file, "PDF to Markdown Comparison Report") as report, \
+            ResultExporter(export_stem(html_file), PAGE_EXPORT_COLUMNS) as exporter:
+        report.add_table("pages", "Pages", ["Page", "Similarity"], details=True)
+        report.add_table("low", "Pages with similarity below the threshold", ["Page", "Similarity"],
+                         "All pages have similarity above the threshold.")
 
         for page_num, pdf_page_content in pdf_pages.items():
-            html.write(f"<div class='content-section'><h2>Page {page_num}</h2>")
-
             # Get the corresponding Markdown content for this page
             md_page_content = md_content_by_page.get(page_num, None)
 
             if md_page_content is None:
-                html.write("<p class='low-similarity'>No Markdown file found for this page.</p>")
+                report.add_row("pages", [page_num, Markup("<span class='low-similarity'>No Markdown file found for this page.</span>")],
+                               row_class="fail")
                 low_similarity_pages.append((page_num, 0))  # No match if Markdown file is missing
-                html.write("</div>")
+                report.add_row("low", [page_num, "no Markdown file"])
+                exporter.write({"page": page_num, "similarity": 0.0, "md_missing": True, "low_similarity": True})
                 continue
 
-            # Calculate similarity percentage
-            similarity = calculate_similarity(pdf_page_content, md_page_content)
+            # Calculate similarity percentage and diff (reused when both sides are unchanged)
+            pair = state.get_or_compute(
+                str(page_num),
+                {"pdf": text_digest(pdf_page_content), "md": text_digest(md_page_content)},
+                lambda: compare_page_pair(pdf_page_content, md_page_content)
+            )
+            similarity = pair["similarity"]
+            exporter.write({"page": page_num, "similarity": similarity, "md_missing": False,
+                            "low_similarity": similarity < report_threshold})
 
             # Highlight similarity score
             if similarity < report_threshold:
-                html.write(f"<p class='low-similarity'>Similarity: {similarity:.2f}%</p>")
+                similarity_cell = Markup(f"<span class='low-similarity'>{similarity:.2f}%</span>")
                 low_similarity_pages.append((page_num, similarity))
+                report.add_row("low", [page_num, f"{similarity:.2f}%"])
             else:
-                html.write(f"<p class='high-similarity'>Similarity: {similarity:.2f}%</p>")
+                similarity_cell = Markup(f"<span class='high-similarity'>{similarity:.2f}%</span>")
 
             # Highlight differences
-            pdf_html, md_html = generate_diff_html(pdf_page_content, md_page_content)
+            pdf_html, md_html = pair["pdf_html"], pair["md_html"]
 
             # Write PDF and Markdown content with differences highlighted
-            html.write("<div class='diff'>")
-            html.write("<h3>PDF Content:</h3>")
-            html.write(f"<div class='pdf-content'>{pdf_html}</div>")
-            html.write("<h3>Markdown Content:</h3>")
-            html.write(f"<div class='md-content'>{md_html}</div>")
-            html.write("</div></div>")
-
-        # Write the summary section
-        html.write("<h2>Summary</h2>")
-        if low_similarity_pages:
-            html.write("<p>Pages with similarity below the threshold:</p><ul>")
-            for page_num, similarity in low_similarity_pages:
-                html.write(f"<li>Page {page_num}: {similarity:.2f}% similarity</li>")
-            html.write("</ul>")
-        else:
-            html.write("<p>All pages have similarity above the threshold.</p>")
-
-        # Write the HTML footer
-        html.write("</body></html>")
-
+            with stage("pdf_markdown_verification.write_html_section"):
+                report.add_row(
+                    "pages", [page_num, similarity_cell],
+                    detail=diff_columns("PDF Content:", pdf_html, "Markdown Content:", md_html),
+                    detail_title=f"Page {page_num}",
+                    row_class="fail" if similarity < report_threshold else None,
+                )
+
+        report.add_summary("Pages compared", len(pdf_pages))
+        report.add_summary("Pages below the threshold", len(low_similarity_pages))
+
+    state.save()
+    if state.enabled:
+        print(f"Incremental run: {state.summary()}")
     print(f"Comparison results have been written to {html_file}")
+    return low_similarity_pages
 
-# Ensure proper encoding for printing
-sys.stdout.reconfigure(encoding='utf-8')
- 
 # Example usage
 if __name__ == "__main__":
+    # Ensure proper encoding for printing
+    sys.stdout.reconfigure(encoding='utf-8')
+
     # Update these paths for your files
     pdf_path = "path/to/your/document.pdf"
     md_folder = "path/to/your/markdown/folder"
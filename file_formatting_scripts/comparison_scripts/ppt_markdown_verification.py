@@ -1,16 +1,21 @@
 import os
 import sys
 import re
-import pandas as pd
-from pptx import Presentation
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from pptx.enum.text import MSO_ANCHOR, PP_ALIGN
-from pptx.oxml.ns import qn
 from difflib import SequenceMatcher
 
-# Set stdout encoding to utf-8
-sys.stdout.reconfigure(encoding='utf-8')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.extraction_cache import cached_extract  # noqa: E402
+from common.instrumentation import stage, traced  # noqa: E402
+from common.lazy_import import lazy_import  # noqa: E402
+from common.report_writer import HtmlReport, Markup, diff_columns, esc  # noqa: E402
+
+# Heavy dependencies are imported on first use
+pptx = lazy_import("pptx")
+sklearn_text = lazy_import("sklearn.feature_extraction.text")
+sklearn_pairwise = lazy_import("sklearn.metrics.pairwise")
+
+# Bump when the extracted slide content format changes so cached entries are invalidated
+PPT_EXTRACTOR_VERSION = "1"
 
 def extract_slide_content(slide, slide_number):
     """Extracts text content (including formatting) from a PowerPoint slide."""
@@ -95,12 +100,13 @@ def process_slide_notes(slide):
 def extract_text_similarity(text1, text2):
     print(f"Text1: {text1}")
     print(f"Text2: {text2}")
-    vectorizer = TfidfVectorizer().fit_transform([text1, text2])
+    vectorizer = sklearn_text.TfidfVectorizer().fit_transform([text1, text2])
     vectors = vectorizer.toarray()
-    cos_sim = cosine_similarity(vectors)
+    cos_sim = sklearn_pairwise.cosine_similarity(vectors)
     return cos_sim[0][1]
 
 
+@traced()
 def verify_format_consistency(ppt_content, md_content):
     ppt_lines = ppt_content.split("\n")
     md_lines = md_content.split("\n")
@@ -126,6 +132,7 @@ def verify_format_consistency(ppt_content, md_content):
     else:
         print("Format consistency verified.")
 
+@traced()
 def generate_diff_html(ppt_text, md_text):
     """
     Generates HTML highlighting differences between PowerPoint and Markdown content at the word level.
@@ -146,18 +153,19 @@ def generate_diff_html(ppt_text, md_text):
 
     for tag, i1, i2, j1, j2 in diff:
         if tag == "replace":
-            ppt_html += f'<span class="removed">{" ".join(ppt_words[i1:i2])}</span> '
-            md_html += f'<span class="added">{" ".join(md_words[j1:j2])}</span> '
+            ppt_html += f'<span class="removed">{esc(" ".join(ppt_words[i1:i2]))}</span> '
+            md_html += f'<span class="added">{esc(" ".join(md_words[j1:j2]))}</span> '
         elif tag == "delete":
-            ppt_html += f'<span class="removed">{" ".join(ppt_words[i1:i2])}</span> '
+            ppt_html += f'<span class="removed">{esc(" ".join(ppt_words[i1:i2]))}</span> '
         elif tag == "insert":
-            md_html += f'<span class="added">{" ".join(md_words[j1:j2])}</span> '
+            md_html += f'<span class="added">{esc(" ".join(md_words[j1:j2]))}</span> '
         elif tag == "equal":
-            ppt_html += f'<span class="unchanged">{" ".join(ppt_words[i1:i2])}</span> '
-            md_html += f'<span class="unchanged">{" ".join(md_words[j1:j2])}</span> '
+            ppt_html += f'<span class="unchanged">{esc(" ".join(ppt_words[i1:i2]))}</span> '
+            md_html += f'<span class="unchanged">{esc(" ".join(md_words[j1:j2]))}</span> '
 
     return ppt_html.strip(), md_html.strip()
 
+@traced()
 def compare_ppt_to_markdown_advanced(ppt_content_array, md_content_dict, threshold=0.75, html_filename="similarity_results.html"):
     """
     Compares PowerPoint content to Markdown content and generates an HTML report.
@@ -178,31 +186,10 @@ def compare_ppt_to_markdown_advanced(ppt_content_array, md_content_dict, thresho
     all_slides_match = True
     similarity_below_threshold = []
 
-    # Open the HTML file for writing
-    with open(html_filename, "w", encoding="utf-8") as html:
-        # Write the HTML header
-        html.write("""
-        <!DOCTYPE html>
-        <html lang="en">
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>PowerPoint to Markdown Comparison Report</title>
-            <style>
-                body { font-family: Arial, sans-serif; line-height: 1.6; margin: 20px; }
-                h1 { color: #333; }
-                h2 { color: #555; }
-                .low-similarity { color: red; font-weight: bold; }
-                .high-similarity { color: green; font-weight: bold; }
-                .content-section { margin-bottom: 20px; }
-                .diff { margin: 10px 0; padding: 10px; border: 1px solid #ddd; background: #f4f4f4; }
-                .ppt-content { color: blue; }
-                .md-content { color: purple; }
-            </style>
-        </head>
-        <body>
-            <h1>PowerPoint to Markdown Comparison Report</h1>
-        """)
+    with HtmlReport(html_filename, "PowerPoint to Markdown Comparison Report") as report:
+        report.add_table("slides", "Slides", ["Slide", "Similarity Score"], details=True)
+        report.add_table("low", "Slides with similarity below the threshold", ["Slide", "Similarity Score"],
+                         "All slides have similarity above the threshold.")
 
         # Iterate over each slide in ppt_content_array
         for i, slide_content in enumerate(ppt_content_array):
@@ -216,62 +203,47 @@ def compare_ppt_to_markdown_advanced(ppt_content_array, md_content_dict, thresho
 
             # Check if there's no Markdown content for the slide
             if not md_content:
-                html.write(f"<div class='content-section'><h2>Slide {slide_number}</h2>")
-                html.write("<p class='low-similarity'>No corresponding Markdown file found for this slide.</p>")
-                html.write("</div>")
+                report.add_row("slides", [slide_number, Markup("<span class='low-similarity'>No corresponding Markdown file found for this slide.</span>")],
+                               row_class="fail")
                 all_slides_match = False
                 continue
 
             # Calculate similarity
             similarity_score = extract_text_similarity(ppt_content, md_content)
 
-            # Write the slide comparison section
-            html.write(f"<div class='content-section'><h2>Slide {slide_number}</h2>")
             if similarity_score <= threshold:
-                html.write(f"<p class='low-similarity'>Similarity Score: {similarity_score:.2f}</p>")
-                similarity_below_threshold.append({
-                    'Slide Number': slide_number,
-                    'Similarity Score': similarity_score,
-                    'PPT Content': ppt_content,
-                    'Markdown Content': md_content
-                })
+                score_cell = Markup(f"<span class='low-similarity'>{similarity_score:.2f}</span>")
+                similarity_below_threshold.append(slide_number)
+                report.add_row("low", [slide_number, f"{similarity_score:.2f}"])
                 all_slides_match = False
             else:
-                html.write(f"<p class='high-similarity'>Similarity Score: {similarity_score:.2f}</p>")
+                score_cell = Markup(f"<span class='high-similarity'>{similarity_score:.2f}</span>")
 
             # Highlight differences
             ppt_html, md_html = generate_diff_html(ppt_content, md_content)
 
-            html.write("<div class='diff'>")
-            html.write("<h3>PowerPoint Content:</h3>")
-            html.write(f"<div class='ppt-content'>{ppt_html}</div>")
-            html.write("<h3>Markdown Content:</h3>")
-            html.write(f"<div class='md-content'>{md_html}</div>")
-            html.write("</div></div>")
-
-        # Write the summary section
-        html.write("<h2>Summary</h2>")
-        if similarity_below_threshold:
-            html.write("<p>Slides with similarity below the threshold:</p><ul>")
-            for slide in similarity_below_threshold:
-                html.write(f"<li>Slide {slide['Slide Number']}: Similarity Score {slide['Similarity Score']:.2f}</li>")
-            html.write("</ul>")
-        else:
-            html.write("<p>All slides have similarity above the threshold.</p>")
-
-        # Write the HTML footer
-        html.write("</body></html>")
+            with stage("ppt_markdown_verification.write_html_section"):
+                report.add_row(
+                    "slides", [slide_number, score_cell],
+                    detail=diff_columns("PowerPoint Content:", ppt_html, "Markdown Content:", md_html),
+                    detail_title=f"Slide {slide_number}",
+                    row_class="fail" if similarity_score <= threshold else None,
+                )
+
+        report.add_summary("Slides compared", len(ppt_content_array))
+        report.add_summary("Slides below the threshold", len(similarity_below_threshold))
 
     print(f"Comparison results have been written to {html_filename}")
     return all_slides_match
 
-def verify_ppt_to_markdown_conversion(ppt_file_path, md_directory_path, threshold=0.75):
+def verify_ppt_to_markdown_conversion(ppt_file_path, md_directory_path, threshold=0.75, html_filename="similarity_results.html"):
     ppt_content_array = extract_ppt_content_with_notes_and_formatting(ppt_file_path)
     md_content_dict = extract_md_content(md_directory_path)
 
-    compare_ppt_to_markdown_advanced(ppt_content_array, md_content_dict, threshold)
+    return compare_ppt_to_markdown_advanced(ppt_content_array, md_content_dict, threshold, html_filename)
 
 
+@traced()
 def extract_md_content(md_directory_path):
     md_content_dict = {}
     
@@ -335,9 +307,18 @@ def extract_advanced_text_from_slide(slide):
     return {"title": slide_title, "content": "\n".join(slide_content)}
 
 
+@traced()
 def extract_ppt_content_with_notes_and_formatting(ppt_file_path):
+    """Slide content for every slide, served from the extraction cache when the deck is unchanged."""
+    return cached_extract(
+        ppt_file_path, "ppt_markdown_verification.ppt_content", PPT_EXTRACTOR_VERSION,
+        lambda: _walk_ppt_content(ppt_file_path)
+    )
+
+
+def _walk_ppt_content(ppt_file_path):
     ppt_content = []
-    presentation = Presentation(ppt_file_path)
+    presentation = pptx.Presentation(ppt_file_path)
 
     for slide_number, slide in enumerate(presentation.slides, start=1):
         slide_data = extract_advanced_text_from_slide(slide)
@@ -358,6 +339,9 @@ def extract_ppt_content_with_notes_and_formatting(ppt_file_path):
 
 # Example usage
 if __name__ == "__main__":
+    # Set stdout encoding to utf-8
+    sys.stdout.reconfigure(encoding='utf-8')
+
     # Update these paths for your files
     ppt_file_path = 'path/to/your/presentation.pptx'
     md_directory_path = 'path/to/your/markdown/folder'
@@ -1,18 +1,18 @@
 import os
-import re
 import difflib
 import sys
-sys.stdout.reconfigure(encoding='utf-8')
 
-def extract_text_from_markdown(file_path):
-    with open(file_path, "r", encoding="utf-8") as file:
-        content = file.read()
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.instrumentation import traced  # noqa: E402
+from common.markdown_tokens import load_markdown_tokens  # noqa: E402
 
-    # Extract code blocks first (to prevent conflicts with inline code)
-    block_matches = re.findall(r'```(?:\w+\n)?([\s\S]*?)```', content)
+@traced()
+def extract_text_from_markdown(file_path):
+    tokens = load_markdown_tokens(file_path)
 
-    # Extract inline code ensuring it does not span multiple lines
-    inline_matches = re.findall(r'`([^`\n]+)`', content)
+    # Inline code first, then code blocks (inline code inside blocks is part of the block)
+    inline_matches = [code.text for code in tokens.code if code.kind == "inline"]
+    block_matches = [code.text for code in tokens.code if code.kind == "fence"]
 
     # Filter out empty or purely whitespace matches
     filtered_inline = [text.strip() for text in inline_matches if text.strip()]
@@ -21,6 +21,7 @@ def extract_text_from_markdown(file_path):
     return filtered_inline + filtered_block
 
 
+@traced()
 def get_matching_files(source_folder, translated_folder):
     source_files = {f: os.path.join(source_folder, f) for f in os.listdir(source_folder) if f.endswith(".md")}
     translated_files = {f: os.path.join(translated_folder, f) for f in os.listdir(translated_folder) if f.endswith(".md")}
@@ -38,8 +39,11 @@ def get_matching_files(source_folder, translated_folder):
 def compute_similarity(text1, text2):
     return difflib.SequenceMatcher(None, text1, text2).ratio()
 
+@traced()
 def generate_comparison_report(source_folder, translated_folder, output_file):
+    """Write the code block comparison report and return the pairs that differ as (file, similarity) tuples."""
     matched_pairs = get_matching_files(source_folder, translated_folder)
+    differing = []
     
     with open(output_file, "w", encoding="utf-8") as report:
         for source_path, translated_path in matched_pairs:
@@ -48,6 +52,7 @@ def generate_comparison_report(source_folder, translated_folder, output_file):
             similarity = compute_similarity(source_text, translated_text) * 100
             
             if similarity < 100:
+                differing.append((os.path.basename(source_path), similarity))
                 report.write(f"Slide {os.path.basename(source_path)} ({similarity:.2f}% similarity):\n")
                 report.write("Source content:\n------------------------\n")
                 report.write(source_text + "\n")
@@ -55,7 +60,11 @@ def generate_comparison_report(source_folder, translated_folder, output_file):
                 report.write(translated_text + "\n")
                 report.write("------------------------\n\n")
 
+    return differing
+
 if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+
     # Update these paths for your files
     source_folder = "path/to/your/source/markdown/folder"
     translated_folder = "path/to/your/translated/markdown/folder"
@@ -1,14 +1,21 @@
 import os
+import sys
 import logging
-from pptx import Presentation
-from langdetect import detect
 
-# Configure logging
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.instrumentation import traced  # noqa: E402
+from common.lazy_import import lazy_import  # noqa: E402
+
+# Heavy dependencies are imported on first use
+pptx = lazy_import("pptx")
+langdetect = lazy_import("langdetect")
+
 log_file_path = "landscape_verification.log"
-logging.basicConfig(filename=log_file_path, level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
 
+@traced()
 def verify_slide_structure(ppt_path):
-    presentation = Presentation(ppt_path)
+    presentation = pptx.Presentation(ppt_path)
     slide_number = 0
 
     for slide in presentation.slides:
@@ -31,13 +38,13 @@ def verify_slide_structure(ppt_path):
         if num_text_columns not in [1, 2, 3]:
             issues.append(f"Slide {slide_number}: Invalid column structure ({num_text_columns} detected, excluding title).")
         else:
-            logging.info(f"Slide {slide_number}: Valid Column Structure.")
+            logger.info(f"Slide {slide_number}: Valid Column Structure.")
 
         # 2. Validate text constraints
         for i, textbox in enumerate(textboxes):
             text = textbox.text.strip()
             num_lines = text.count("\n") + 1
-            language = detect(text)
+            language = langdetect.detect(text)
 
             # Add any specific text constraints checks here
             # Example: Check if the text is in English
@@ -46,9 +53,12 @@ def verify_slide_structure(ppt_path):
 
         # Log issues
         for issue in issues:
-            logging.warning(issue)
+            logger.warning(issue)
 
 if __name__ == "__main__":
+    # Configure logging
+    logging.basicConfig(filename=log_file_path, level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
     # Update this path for your file
     ppt_path = "path/to/your/presentation.pptx"
     verify_slide_structure(ppt_path)
@@ -1,34 +1,34 @@
 import os
 import re
+import sys
 import hashlib
 from collections import defaultdict
 from bs4 import BeautifulSoup
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.run_state import RunState, combined_digest  # noqa: E402
+from common.instrumentation import traced  # noqa: E402
+from common.markdown_tokens import MARKDOWN_TOKENS_VERSION, load_markdown_tokens, tokenize_markdown  # noqa: E402
+from common.report_writer import HtmlReport, Markup, esc  # noqa: E402
+from common.result_export import export_rows, export_stem  # noqa: E402
+
 # Configuration - Update these paths for your files
 MD_FOLDER = r"path/to/your/markdown/folder"
 XML_FOLDER = r"path/to/your/xml/folder"
+OUTPUT_HTML = "verification_report.html"
+# Optional run-state file: unchanged files reuse results from the previous run (None = always full run)
+STATE_FILE = None
+
+# Column types of the exported table format errors (one row per invalid table)
+TABLE_ERROR_EXPORT_COLUMNS = {
+    'md_folder': 'string',
+    'md_file': 'string',
+    'table_index': 'int64',
+}
 
 def find_tables(md_text):
-    # Detect Markdown tables more accurately
-    lines = md_text.splitlines()
-    tables = []
-    i = 0
-    while i < len(lines):
-        if '|' in lines[i]:
-            # Found potential table start
-            table_lines = []
-            # Collect consecutive lines with pipes
-            while i < len(lines) and '|' in lines[i]:
-                table_lines.append(lines[i])
-                i += 1
-            
-            # A valid table needs at least 2 lines (header + separator)
-            if len(table_lines) >= 2:
-                table_text = '\n'.join(table_lines)
-                tables.append(table_text)
-        else:
-            i += 1
-    return tables
+    # Runs of 2+ consecutive lines containing pipes (header + separator at least), outside code fences
+    return [table.text for table in tokenize_markdown(md_text).tables]
 
 def verify_table_format(table_text):
     """
@@ -82,13 +82,13 @@ def verify_table_format(table_text):
 
 def get_parent_topic_reference(md_text):
     # Assume parent topic reference is a Markdown link at the end
-    match = re.search(r'\[.+\]\(.+\.md\)\s*$', md_text.strip())
-    return match.group(0) if match else None
+    return tokenize_markdown(md_text).parent_ref
 
 def hash_content(md_text):
     # Hash content for uniqueness check (ignore whitespace)
     return hashlib.md5(md_text.strip().encode('utf-8')).hexdigest()
 
+@traced()
 def verify_xml_metadata(xml_path, md_files):
     messages = []
     with open(xml_path, 'r', encoding='utf-8') as f:
@@ -123,88 +123,43 @@ def verify_xml_metadata(xml_path, md_files):
         return {'status': 'ok', 'messages': []}
     return {'status': 'fail', 'messages': messages}
 
-def write_html_report(table_errors, repeated_refs, duplicate_files, xml_results, localized_results, output_path="verification_report.html"):
-    html = """
-    <html>
-    <head>
-        <title>Markdown & XML Verification Report</title>
-        <style>
-            body { font-family: Arial, sans-serif; margin: 40px; background: #f9f9f9; }
-            h2 { color: #2c3e50; border-bottom: 2px solid #eee; padding-bottom: 5px; }
-            ul { background: #fff; padding: 15px 30px; border-radius: 8px; box-shadow: 0 2px 8px #eee; }
-            li { margin-bottom: 8px; }
-            .ok { color: #27ae60; }
-            .fail { color: #c0392b; }
-            .section { margin-bottom: 40px; }
-        </style>
-    </head>
-    <body>
-        <h1>Markdown & XML Verification Report</h1>
-    """
-
-    # XML Metadata Results
-    html += '<div class="section"><h2>XML Metadata Verification</h2>'
-    for xml_file, result in xml_results.items():
+@traced()
+def _metadata_rows(report, key, results, ok_message):
+    for xml_file, result in results.items():
         if result['status'] == 'ok':
-            html += f'<p class="ok"><b>{xml_file}:</b> All XML headings and referenced md files are present and match.</p>'
+            report.add_row(key, [xml_file, Markup(f"<span class='ok'>{esc(ok_message)}</span>")])
         else:
-            html += f'<p class="fail"><b>{xml_file}:</b></p><ul>'
-            for msg in result['messages']:
-                html += f"<li>{msg}</li>"
-            html += "</ul>"
-    html += "</div>"
-
-    # Localized Metadata Results
-    html += '<div class="section"><h2>Localized Metadata Verification</h2>'
-    for xml_file, result in localized_results.items():
-        if result['status'] == 'ok':
-            html += f'<p class="ok"><b>{xml_file}:</b> All localized metadata is present and valid.</p>'
-        else:
-            html += f'<p class="fail"><b>{xml_file}:</b></p><ul>'
-            for msg in result['messages']:
-                html += f"<li>{msg}</li>"
-            html += "</ul>"
-    html += "</div>"
-
-    # Duplicate Content
-    html += '<div class="section"><h2>Duplicate Content</h2>'
-    if duplicate_files:
-        html += "<ul>"
-        for fname in duplicate_files:
-            html += f"<li>{fname}</li>"
-        html += "</ul>"
-    else:
-        html += '<p class="ok">No duplicate content detected.</p>'
-    html += "</div>"
+            messages = result['messages']
+            detail = Markup("<ul>" + "".join(f"<li>{esc(msg)}</li>" for msg in messages) + "</ul>")
+            report.add_row(key, [xml_file, Markup(f"<span class='fail'>{len(messages)} issue(s)</span>")],
+                           detail=detail, detail_title=xml_file, row_class="fail")
 
-    # Table Errors
-    html += '<div class="section"><h2>Table Format Errors</h2>'
-    if table_errors:
-        html += "<ul>"
-        for fname, indices in table_errors.items():
-            html += f"<li><b>{fname}</b>:  {len(indices)}</li>"
-        html += "</ul>"
-    else:
-        html += '<p class="ok">No table format errors found.</p>'
-    html += "</div>"
+def write_html_report(table_errors, repeated_refs, duplicate_files, xml_results, localized_results, output_path="verification_report.html"):
+    with HtmlReport(output_path, "Markdown & XML Verification Report") as report:
+        report.add_summary("XML files with metadata issues", sum(1 for r in xml_results.values() if r['status'] != 'ok'))
+        report.add_summary("XML files with localized metadata issues", sum(1 for r in localized_results.values() if r['status'] != 'ok'))
+        report.add_summary("Duplicate files", len(duplicate_files))
+        report.add_summary("Files with table format errors", len(table_errors))
+        report.add_summary("Repeated parent topic references", len(repeated_refs))
+
+        report.add_table("xml", "XML Metadata Verification", ["XML File", "Result"], "No XML files were checked.", details=True)
+        report.add_table("localized", "Localized Metadata Verification", ["XML File", "Result"], "No XML files were checked.", details=True)
+        report.add_table("duplicates", "Duplicate Content", ["File"], "No duplicate content detected.")
+        report.add_table("tables", "Table Format Errors", ["File", "Errors"], "No table format errors found.")
+        report.add_table("refs", "Repeated Parent Topic References", ["Reference"], "No repeated parent topic references found.")
 
-    # Repeated Parent Topic References
-    html += '<div class="section"><h2>Repeated Parent Topic References</h2>'
-    if repeated_refs:
-        html += "<ul>"
+        _metadata_rows(report, "xml", xml_results, "All XML headings and referenced md files are present and match.")
+        _metadata_rows(report, "localized", localized_results, "All localized metadata is present and valid.")
+        for fname in duplicate_files:
+            report.add_row("duplicates", [fname])
+        for fname, indices in table_errors.items():
+            report.add_row("tables", [fname, len(indices)])
         for ref in repeated_refs:
-            html += f"<li>{ref}</li>"
-        html += "</ul>"
-    else:
-        html += '<p class="ok">No repeated parent topic references found.</p>'
-    html += "</div>"
+            report.add_row("refs", [ref])
 
-    html += "</body></html>"
-    
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(html)
     print(f"\nHTML report written to {output_path}\n")
 
+@traced()
 def verify_localized_metadata(xml_path, required_langs=None):
     messages = []
     found_langs = set()
@@ -257,7 +212,28 @@ def verify_localized_metadata(xml_path, required_langs=None):
         return {'status': 'ok', 'messages': []}
     return {'status': 'fail', 'messages': messages}
 
-def main():
+@traced()
+def check_md_file(path):
+    """Per-file checks: invalid table indices, parent topic reference and content hash."""
+    tokens = load_markdown_tokens(path)
+
+    # Table format verification
+    invalid_tables = []
+    for idx, table in enumerate(tokens.tables, 1):
+        if not verify_table_format(table.text):
+            invalid_tables.append(idx)
+
+    return {
+        'invalid_tables': invalid_tables,
+        'parent_ref': tokens.parent_ref,
+        'hash': tokens.digest,  # same as hash_content() of the file text
+    }
+
+def main(state_file=None):
+    state_file = state_file if state_file is not None else STATE_FILE
+    state = RunState(state_file, "markdown_format_verification.main",
+                     {"md_folder": os.path.abspath(MD_FOLDER), "xml_folder": os.path.abspath(XML_FOLDER),
+                      "markdown_tokens": MARKDOWN_TOKENS_VERSION})
     md_files = [f for f in os.listdir(MD_FOLDER) if f.endswith('.md')]
     content_hashes = set()
     parent_refs = set()
@@ -267,41 +243,50 @@ def main():
     xml_results = {}
     localized_results = {}
 
+    md_digests = {}
     for md_file in md_files:
         path = os.path.join(MD_FOLDER, md_file)
-        with open(path, 'r', encoding='utf-8') as f:
-            md_text = f.read()
-        
-        # Table detection and format verification
-        tables = find_tables(md_text)
-        invalid_tables = []
-        for idx, table in enumerate(tables, 1):
-            if not verify_table_format(table):
-                invalid_tables.append(idx)
-        
+        md_digests[md_file] = state.file_digest(path)
+        result = state.get_or_compute(
+            "md:" + md_file, {"file": md_digests[md_file]}, lambda: check_md_file(path)
+        )
+
         # Only add to table_errors if there are actual formatting issues
+        invalid_tables = result['invalid_tables']
         if invalid_tables:
             table_errors[md_file] = invalid_tables
-        
+
         # Parent topic reference check
-        ref = get_parent_topic_reference(md_text)
+        ref = result['parent_ref']
         if ref:
             if ref in parent_refs:
                 repeated_refs.add(ref)
             parent_refs.add(ref)
-        
+
         # Content uniqueness
-        h = hash_content(md_text)
+        h = result['hash']
         if h in content_hashes:
             duplicate_files.add(md_file)
         content_hashes.add(h)
 
     # XML metadata verification
     xml_files = [f for f in os.listdir(XML_FOLDER) if f.endswith('.xml')]
+    md_set_digest = combined_digest(name + ":" + d for name, d in md_digests.items())
     for xml_file in xml_files:
         xml_path = os.path.join(XML_FOLDER, xml_file)
-        xml_results[xml_file] = verify_xml_metadata(xml_path, md_files)
-        localized_results[xml_file] = verify_localized_metadata(xml_path)
+        xml_digest = state.file_digest(xml_path)
+        # Metadata checks read the referenced md files too, so they depend on the whole md set
+        xml_results[xml_file] = state.get_or_compute(
+            "xml:" + xml_file, {"xml": xml_digest, "md_set": md_set_digest},
+            lambda: verify_xml_metadata(xml_path, md_files)
+        )
+        localized_results[xml_file] = state.get_or_compute(
+            "localized:" + xml_file, {"xml": xml_digest},
+            lambda: verify_localized_metadata(xml_path)
+        )
+    state.save()
+    if state.enabled:
+        print(f"Incremental run: {state.summary()}")
 
     # Print results for table errors only
     if table_errors:
@@ -312,7 +297,13 @@ def main():
         print("\nNo table formatting issues found.\n")
 
     # Write HTML report
-    write_html_report(table_errors, repeated_refs, duplicate_files, xml_results, localized_results)
+    write_html_report(table_errors, repeated_refs, duplicate_files, xml_results, localized_results, OUTPUT_HTML)
+    exported = export_rows(export_stem(OUTPUT_HTML, "table_errors"), TABLE_ERROR_EXPORT_COLUMNS, (
+        {'md_folder': MD_FOLDER, 'md_file': fname, 'table_index': idx}
+        for fname, indices in table_errors.items() for idx in indices
+    ))
+    if exported:
+        print(f"Table errors exported: {', '.join(exported.values())}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
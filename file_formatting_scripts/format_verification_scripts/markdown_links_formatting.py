@@ -7,51 +7,86 @@ Extracts ALL hyperlinks (internal and external) from PDF pages
 import os
 import sys
 import re
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 
-# Try multiple PDF libraries for maximum hyperlink detection
-try:
-    import PyPDF2
-    PYPDF2_AVAILABLE = True
-except ImportError:
-    PYPDF2_AVAILABLE = False
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.pdf_page_model import PdfDocumentModel, load_pdf_model  # noqa: E402
+from common.instrumentation import traced  # noqa: E402
+from common.lazy_import import lazy_import, module_available  # noqa: E402
+from common.markdown_tokens import load_markdown_tokens  # noqa: E402
+from common.result_export import ResultExporter, export_rows, export_stem  # noqa: E402
 
-try:
-    import pdfplumber
-    PDFPLUMBER_AVAILABLE = True
-except ImportError:
-    PDFPLUMBER_AVAILABLE = False
+# Try multiple PDF libraries for maximum hyperlink detection (imported on first use)
+PyPDF2 = lazy_import("PyPDF2")
+PYPDF2_AVAILABLE = module_available("PyPDF2")
 
-try:
-    import fitz  # PyMuPDF
-    PYMUPDF_AVAILABLE = True
-except ImportError:
-    PYMUPDF_AVAILABLE = False
+pdfplumber = lazy_import("pdfplumber")
+PDFPLUMBER_AVAILABLE = module_available("pdfplumber")
 
-print(f"PDF Libraries Available: PyPDF2={PYPDF2_AVAILABLE}, pdfplumber={PDFPLUMBER_AVAILABLE}, PyMuPDF={PYMUPDF_AVAILABLE}")
+PYMUPDF_AVAILABLE = module_available("fitz")
+
+# Markdown token link kinds -> link 'type' reported for Markdown links
+MD_LINK_TYPES = {
+    'standard': 'markdown_standard',
+    'reference': 'markdown_reference',
+    'autolink': 'markdown_autolink',
+    'bare_url': 'markdown_bare_url',
+    'html': 'markdown_html_link',
+}
+
+# Column types of the exported matching results (see _export_matching_results)
+PAGE_STATS_EXPORT_COLUMNS = {
+    'pdf': 'string',
+    'page': 'int64',
+    'pdf_links': 'int64',
+    'matched': 'int64',
+}
+LINK_EXPORT_COLUMNS = {
+    'pdf': 'string',
+    'status': 'string',
+    'match_type': 'string',
+    'confidence': 'string',
+    'pdf_page': 'Int64',
+    'pdf_uri': 'string',
+    'pdf_text': 'string',
+    'md_file': 'string',
+    'md_page': 'Int64',
+    'md_url': 'string',
+    'md_text': 'string',
+}
+
+
+def ensure_pdf_library():
+    """Report the available PDF libraries and install PyPDF2 if none is present (script use only)."""
+    global PYPDF2_AVAILABLE
+    print(f"PDF Libraries Available: PyPDF2={PYPDF2_AVAILABLE}, pdfplumber={PDFPLUMBER_AVAILABLE}, PyMuPDF={PYMUPDF_AVAILABLE}")
+
+    if not any([PYPDF2_AVAILABLE, PDFPLUMBER_AVAILABLE, PYMUPDF_AVAILABLE]):
+        print("Installing PyPDF2...")
+        import subprocess
+        subprocess.check_call([sys.executable, "-m", "pip", "install", "PyPDF2"])
+        PYPDF2_AVAILABLE = True
 
-if not any([PYPDF2_AVAILABLE, PDFPLUMBER_AVAILABLE, PYMUPDF_AVAILABLE]):
-    print("Installing PyPDF2...")
-    import subprocess
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "PyPDF2"])
-    import PyPDF2
-    PYPDF2_AVAILABLE = True
 
 class PDFLinkExtractor:
-    def __init__(self, pdf_path: str):
+    def __init__(self, pdf_path: str, model: Optional[PdfDocumentModel] = None):
         self.pdf_path = pdf_path
         self.doc = None
+        # Shared single-parse page model (reused instead of re-opening the PDF)
+        self.model = model
         # Keep file handle open for PyPDF2 (lazy stream access); None for other libs
         self._pdf_file_handle = None  # type: ignore
 
     def open_pdf(self):
         """Open the PDF document using the best available library"""
         try:
-            if PYMUPDF_AVAILABLE:
-                import fitz
-                self.doc = fitz.open(self.pdf_path)
-                print(f"Opened PDF with PyMuPDF: {os.path.basename(self.pdf_path)}")
+            if self.model is not None or PYMUPDF_AVAILABLE:
+                # The page model mirrors the PyMuPDF page API used below
+                if self.model is None:
+                    self.model = load_pdf_model(self.pdf_path)
+                self.doc = self.model
+                print(f"Opened PDF with PyMuPDF page model: {os.path.basename(self.pdf_path)}")
                 print(f"Total pages: {self.doc.page_count}")
                 return True
             elif PDFPLUMBER_AVAILABLE:
@@ -92,6 +127,7 @@ class PDFLinkExtractor:
             finally:
                 self._pdf_file_handle = None
     
+    @traced()
     def extract_page_links(self, page_num: int) -> List[Dict[str, Any]]:
         if not self.doc:
             return []
@@ -100,7 +136,7 @@ class PDFLinkExtractor:
         print(f"Scanning page {page_num} for ALL hyperlinks (including blue clickable text)...")
         
         try:
-            if PYMUPDF_AVAILABLE and hasattr(self.doc, 'page_count'):
+            if isinstance(self.doc, PdfDocumentModel):
                 # Use PyMuPDF - COMPREHENSIVE link detection
                 page = self.doc[page_num - 1]
                 
@@ -304,6 +340,7 @@ class PDFLinkExtractor:
         print(f"  External: {external_count}, Internal: {internal_count}, Text URLs: {text_url_count}")
         return links
     
+    @traced()
     def extract_all_links(self) -> Dict[int, List[Dict[str, Any]]]:
         """Extract links from all pages"""
         if not self.doc:
@@ -335,6 +372,7 @@ class PDFLinkExtractor:
         
         return all_links
     
+    @traced()
     def generate_html_report(self, all_links: Dict[int, List[Dict[str, Any]]], output_file: str = None):
         """Generate HTML report of all found links"""
         # Set output file path in same directory as PDF if not provided
@@ -1075,6 +1113,7 @@ class PDFLinkExtractor:
         
         return None
 
+    @traced()
     def match_with_markdown_files(self, all_links: Dict[int, List[Dict[str, Any]]], md_directory: str) -> Dict[str, Any]:
         """Match PDF links with corresponding Markdown files (page-wise if MD file names like 1_*.md)."""
         if not os.path.exists(md_directory):
@@ -1102,88 +1141,23 @@ class PDFLinkExtractor:
 
         # Report
         self._generate_matching_report(matching_results, md_directory)
+        self._export_matching_results(matching_results, md_directory)
         return matching_results
     
+    @traced()
     def _extract_markdown_links(self, md_files: List[str]) -> Dict[str, List[Dict[str, Any]]]:
-        """Extract all links from Markdown files"""
+        """Extract all links from Markdown files (standard, reference, autolink, bare URL and HTML <a>)"""
         md_links = {}
         
         for md_file in md_files:
             try:
-                with open(md_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                file_links = []
-                
-                # Extract different types of markdown links
-                
-                # 1. Standard markdown links [text](url)
-                standard_links = re.finditer(r'\[([^\]]*)\]\(([^)]+)\)', content)
-                for match in standard_links:
-                    text = match.group(1)
-                    url = match.group(2)
-                    file_links.append({
-                        'type': 'markdown_standard',
-                        'text': text,
-                        'url': url,
-                        'line': content[:match.start()].count('\n') + 1
-                    })
-                
-                # 2. Reference links [text][ref] and [ref]: url
-                ref_links = re.finditer(r'\[([^\]]*)\]\[([^\]]*)\]', content)
-                ref_definitions = re.finditer(r'^\s*\[([^\]]+)\]:\s*(.+)$', content, re.MULTILINE)
-                
-                # Build reference mapping
-                refs = {}
-                for ref_def in ref_definitions:
-                    ref_id = ref_def.group(1)
-                    ref_url = ref_def.group(2).strip()
-                    refs[ref_id] = ref_url
-                
-                for ref_link in ref_links:
-                    text = ref_link.group(1)
-                    ref_id = ref_link.group(2) or text  # If no ref_id, use text
-                    if ref_id in refs:
-                        file_links.append({
-                            'type': 'markdown_reference',
-                            'text': text,
-                            'url': refs[ref_id],
-                            'line': content[:ref_link.start()].count('\n') + 1
-                        })
-                
-                # 3. Autolinks <url>
-                autolinks = re.finditer(r'<(https?://[^>]+)>', content)
-                for match in autolinks:
-                    url = match.group(1)
-                    file_links.append({
-                        'type': 'markdown_autolink',
-                        'text': url,
-                        'url': url,
-                        'line': content[:match.start()].count('\n') + 1
-                    })
-                
-                # 4. Bare URLs (common in markdown)
-                bare_urls = re.finditer(r'(?<![\[\(<])(https?://[^\s\)>\]]+)', content)
-                for match in bare_urls:
-                    url = match.group(1)
-                    file_links.append({
-                        'type': 'markdown_bare_url',
-                        'text': url,
-                        'url': url,
-                        'line': content[:match.start()].count('\n') + 1
-                    })
-                
-                # 5. HTML links in markdown
-                html_links = re.finditer(r'<a\s+[^>]*href=["\']([^"\']+)["\'][^>]*>([^<]*)</a>', content, re.IGNORECASE)
-                for match in html_links:
-                    url = match.group(1)
-                    text = match.group(2)
-                    file_links.append({
-                        'type': 'markdown_html_link',
-                        'text': text,
-                        'url': url,
-                        'line': content[:match.start()].count('\n') + 1
-                    })
+                tokens = load_markdown_tokens(md_file)
+                file_links = [{
+                    'type': MD_LINK_TYPES[link.kind],
+                    'text': link.text,
+                    'url': link.url,
+                    'line': link.line
+                } for link in tokens.links]
                 
                 md_links[md_file] = file_links
                 print(f"  {os.path.basename(md_file)}: {len(file_links)} links")
@@ -1194,6 +1168,7 @@ class PDFLinkExtractor:
         
         return md_links
     
+    @traced()
     def _match_pdf_with_md_links(self, pdf_links: Dict[int, List[Dict[str, Any]]], 
                                 md_links: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
         """Match PDF links with Markdown links"""
@@ -1402,13 +1377,10 @@ class PDFLinkExtractor:
         return len(intersection) / len(union) if union else 0.0
     
     # ------------------ NEW: Markdown Validation & Reporting ------------------
+    @traced()
     def _validate_markdown_files(self, md_files: List[str]) -> Dict[str, Any]:
         """Validate markdown links ensuring <a href> and markdown links aren't empty '#' and anchors exist."""
         results: Dict[str, Any] = { 'files': {}, 'summary': { 'total_files': 0, 'total_links_checked': 0, 'invalid_count': 0, 'invalid_empty_anchor': 0, 'invalid_missing_target': 0 } }
-        header_slug_pattern = re.compile(r'^(#{1,6})\s+(.+)$', re.MULTILINE)
-        id_attr_pattern = re.compile(r'id=["\']([^"\']+)["\']', re.IGNORECASE)
-        html_link_pattern = re.compile(r'<a\s+[^>]*href=["\']([^"\']+)["\'][^>]*>(.*?)</a>', re.IGNORECASE)
-        md_link_pattern = re.compile(r'\[([^\]]*)\]\(([^)]+)\)')
 
         def slugify(text: str) -> str:
             t = text.strip().lower()
@@ -1419,15 +1391,11 @@ class PDFLinkExtractor:
         for md_file in md_files:
             file_result = { 'invalid_links': [], 'counts': { 'links_checked': 0, 'invalid': 0 } }
             try:
-                with open(md_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
+                tokens = load_markdown_tokens(md_file)
 
                 # Collect possible anchor targets
-                header_slugs = set()
-                for m in header_slug_pattern.finditer(content):
-                    header_slugs.add(slugify(m.group(2)))
-                id_attrs = set(a.group(1) for a in id_attr_pattern.finditer(content))
-                all_targets = header_slugs.union(id_attrs)
+                header_slugs = set(slugify(h.text) for h in tokens.headings)
+                all_targets = header_slugs.union(tokens.anchors)
 
                 def validate_link(raw_url: str, line_no: int, link_text: str, source_type: str):
                     url = raw_url.strip()
@@ -1447,19 +1415,13 @@ class PDFLinkExtractor:
                             results['summary']['invalid_count'] += 1
                             results['summary']['invalid_missing_target'] += 1
 
-                # Validate HTML links
-                for m in html_link_pattern.finditer(content):
-                    href = m.group(1)
-                    text = m.group(2)
-                    line_no = content[:m.start()].count('\n') + 1
-                    validate_link(href, line_no, text, 'html_a')
-
-                # Validate markdown standard links
-                for m in md_link_pattern.finditer(content):
-                    text = m.group(1)
-                    href = m.group(2)
-                    line_no = content[:m.start()].count('\n') + 1
-                    validate_link(href, line_no, text, 'md_standard')
+                # Validate HTML links, then markdown standard links
+                for link in tokens.links:
+                    if link.kind == 'html':
+                        validate_link(link.url, link.line, link.text, 'html_a')
+                for link in tokens.links:
+                    if link.kind == 'standard':
+                        validate_link(link.url, link.line, link.text, 'md_standard')
 
             except Exception as e:
                 file_result['error'] = str(e)
@@ -1470,6 +1432,45 @@ class PDFLinkExtractor:
 
         return results
 
+    def _export_matching_results(self, matching_results: Dict[str, Any], md_directory: str):
+        """Write page-wise statistics and every matched/unmatched link as JSONL/Parquet next to the matching report."""
+        stem = export_stem(os.path.join(md_directory, 'pdf_md_matching_report.html'))
+        page_wise = matching_results.get('statistics', {}).get('page_wise', {})
+        paths = export_rows(stem + '.pages', PAGE_STATS_EXPORT_COLUMNS, (
+            {'pdf': self.pdf_path, 'page': page, 'pdf_links': stats['pdf_links'], 'matched': stats['matched']}
+            for page, stats in sorted(page_wise.items())
+        ))
+
+        def link_row(status, pdf_link=None, md_link=None, match=None):
+            pdf_link = pdf_link or {}
+            md_link = md_link or {}
+            match = match or {}
+            return {
+                'pdf': self.pdf_path,
+                'status': status,
+                'match_type': match.get('match_type'),
+                'confidence': match.get('confidence'),
+                'pdf_page': pdf_link.get('pdf_page'),
+                'pdf_uri': pdf_link.get('uri'),
+                'pdf_text': pdf_link.get('text'),
+                'md_file': md_link.get('md_file'),
+                'md_page': md_link.get('md_page'),
+                'md_url': md_link.get('url'),
+                'md_text': md_link.get('text'),
+            }
+
+        with ResultExporter(stem + '.links', LINK_EXPORT_COLUMNS) as exporter:
+            for m in matching_results.get('matched_links', []):
+                exporter.write(link_row('matched', m['pdf_link'], m['md_link'], m))
+            for pdf_link in matching_results.get('pdf_only_links', []):
+                exporter.write(link_row('pdf_only', pdf_link=pdf_link))
+            for md_link in matching_results.get('md_only_links', []):
+                exporter.write(link_row('md_only', md_link=md_link))
+        paths = list(paths.values()) + list(exporter.paths.values())
+        if paths:
+            print(f"Matching results exported: {', '.join(paths)}")
+
+    @traced()
     def _generate_matching_report(self, matching_results: Dict[str, Any], md_directory: str):
         """Generate HTML report for PDF<->MD matching and markdown validation."""
         try:
@@ -1632,5 +1633,6 @@ def main_with_markdown_matching():
         extractor.close_pdf()
 
 if __name__ == "__main__":
+    ensure_pdf_library()
     # Use the enhanced version with Markdown matching
     main_with_markdown_matching()
@@ -1,30 +1,48 @@
 import os
+import sys
 import hashlib
-from pptx import Presentation
-from pptx.enum.shapes import MSO_SHAPE_TYPE
 from difflib import SequenceMatcher
-from PIL import Image
-from io import BytesIO
 from collections import defaultdict
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.extraction_cache import cached_extract  # noqa: E402
+from common.instrumentation import traced  # noqa: E402
+from common.lazy_import import lazy_import  # noqa: E402
+from common.report_writer import HtmlReport, Markup, esc  # noqa: E402
+
+# python-pptx is imported on first use
+pptx = lazy_import("pptx")
+pptx_shapes = lazy_import("pptx.enum.shapes")
+
+# Bump when extract_slide_content output changes so cached entries are invalidated
+SLIDE_EXTRACTOR_VERSION = "1"
+
 def hash_image(image_blob):
     """Return SHA256 hash of image bytes."""
     return hashlib.sha256(image_blob).hexdigest()
 
 def compare_text(old_text, new_text):
-    """Return HTML diff of two text blocks."""
+    """Return HTML diff of two text blocks (text is escaped)."""
     sm = SequenceMatcher(None, old_text, new_text)
-    html = ""
+    html = []
     for tag, i1, i2, j1, j2 in sm.get_opcodes():
         if tag == "equal":
-            html += old_text[i1:i2]
+            html.append(esc(old_text[i1:i2]))
         elif tag == "replace":
-            html += f'<span style="background:yellow;">{new_text[j1:j2]}</span>'
+            html.append(f'<span class="changed">{esc(new_text[j1:j2])}</span>')
         elif tag == "delete":
-            html += f'<span style="background:#faa;color:red;text-decoration:line-through;">{old_text[i1:i2]}</span>'
+            html.append(f'<span class="removed">{esc(old_text[i1:i2])}</span>')
         elif tag == "insert":
-            html += f'<span style="background:#cfc;color:green;">{new_text[j1:j2]}</span>'
-    return html
+            html.append(f'<span class="added">{esc(new_text[j1:j2])}</span>')
+    return "".join(html)
+
+def run_color_hex(run):
+    """Return a run's explicit RGB color as a hex string (cache-friendly), else None."""
+    try:
+        rgb = run.font.color.rgb
+    except AttributeError:
+        return None  # no explicit color, or a theme color without an RGB value
+    return str(rgb) if rgb else None
 
 def extract_slide_content(slide):
     """Extract text, notes, images, and tables from a slide."""
@@ -47,7 +65,7 @@ def extract_slide_content(slide):
                     "text": run.text,
                     "bold": run.font.bold,
                     "italic": run.font.italic,
-                    "color": run.font.color.rgb if run.font.color and run.font.color.rgb else None,
+                    "color": run_color_hex(run),
                     "font": run.font.name
                 })
             content["text"].append(para_text)
@@ -57,7 +75,7 @@ def extract_slide_content(slide):
         content["notes"] = slide.notes_slide.notes_text_frame.text
     # Images
     for shape in slide.shapes:
-        if shape.shape_type == MSO_SHAPE_TYPE.PICTURE:
+        if shape.shape_type == pptx_shapes.MSO_SHAPE_TYPE.PICTURE:
             image_blob = shape.image.blob
             image_hash = hash_image(image_blob)
             content["images"].append({
@@ -69,7 +87,7 @@ def extract_slide_content(slide):
             })
     # Tables
     for shape in slide.shapes:
-        if shape.shape_type == MSO_SHAPE_TYPE.TABLE:
+        if shape.shape_type == pptx_shapes.MSO_SHAPE_TYPE.TABLE:
             table_data = []
             table = shape.table
             for row in table.rows:
@@ -77,6 +95,14 @@ def extract_slide_content(slide):
             content["tables"].append(table_data)
     return content
 
+@traced()
+def extract_presentation_content(pptx_path):
+    """Extract content of every slide in a deck, cached by file content."""
+    def _walk():
+        prs = pptx.Presentation(pptx_path)
+        return [extract_slide_content(s) for s in prs.slides]
+    return cached_extract(pptx_path, "ppt_format_verification.slides", SLIDE_EXTRACTOR_VERSION, _walk)
+
 def compare_images(old_imgs, new_imgs):
     """Compare image lists by hash and position."""
     old_set = {(img['hash'], img['left'], img['top'], img['width'], img['height']) for img in old_imgs}
@@ -105,6 +131,7 @@ def compare_formatting(old_fmt, new_fmt):
             diffs.append((i, old_runs, new_runs))
     return diffs
 
+@traced()
 def compare_slides(old_slide, new_slide):
     """Compare all aspects of two slides."""
     result = {}
@@ -124,92 +151,110 @@ def compare_slides(old_slide, new_slide):
     result["formatting_diffs"] = compare_formatting(old_slide["formatting"], new_slide["formatting"])
     return result
 
-def generate_html_report(slide_diffs, summary, old_ppt, new_ppt):
-    html = [
-        "<html><head><meta charset='utf-8'><title>PPT Comparison Report</title>",
-        "<style>",
-        "body{font-family:Arial,sans-serif;}",
-        ".slide-section{margin-bottom:40px;}",
-        ".diff-block{border:1px solid #ccc;padding:10px;margin:10px 0;}",
-        ".added{background:#cfc;}",
-        ".removed{background:#faa;text-decoration:line-through;}",
-        ".changed{background:yellow;}",
-        ".summary-table{border-collapse:collapse; margin-bottom:20px;}",
-        ".summary-table td, .summary-table th{border:1px solid #ccc;padding:4px 8px;}",
-        "</style></head><body>",
-        f"<h1>PPT Comparison Report</h1>",
-        f"<h2>Old File: {old_ppt}</h2>",
-        f"<h2>New File: {new_ppt}</h2>",
-        "<h2>Summary of Changes</h2>",
-        summary,
-    ]
-    for idx, diff in enumerate(slide_diffs):
-        html.append(f"<div class='slide-section'><h2>Slide {idx+1}</h2>")
-        html.append("<div class='diff-block'><b>Text Diff:</b><br>" + diff["text_diff"] + "</div>")
-        html.append("<div class='diff-block'><b>Notes Diff:</b><br>" + diff["notes_diff"] + "</div>")
-        # Images
-        html.append("<div class='diff-block'><b>Images Added:</b><br>")
-        for img in diff["images_added"]:
-            html.append(f"<span class='added'>Image hash: {img[0]}, Pos: {img[1:]}</span><br>")
-        html.append("</div>")
-        html.append("<div class='diff-block'><b>Images Removed:</b><br>")
-        for img in diff["images_removed"]:
-            html.append(f"<span class='removed'>Image hash: {img[0]}, Pos: {img[1:]}</span><br>")
+EMPTY_SLIDE = {"text": [], "notes": "", "images": [], "tables": [], "formatting": []}
+
+SUMMARY_LABELS = [
+    ("total_slides", "Total Slides"),
+    ("text_changes", "Slides with Text Changes"),
+    ("notes_changes", "Slides with Notes Changes"),
+    ("images_added", "Total Images Added"),
+    ("images_removed", "Total Images Removed"),
+    ("table_changes", "Slides with Table Changes"),
+    ("formatting_changes", "Slides with Formatting Changes"),
+]
+
+def _slide_has_changes(diff):
+    return bool("<span" in diff["text_diff"] or "<span" in diff["notes_diff"] or diff["images_added"]
+                or diff["images_removed"] or diff["table_diffs"] or diff["formatting_diffs"])
+
+def _slide_detail_html(diff):
+    """Detail section body for one slide diff."""
+    html = []
+    html.append("<div class='content-box'><b>Text Diff:</b><br>" + diff["text_diff"] + "</div>")
+    html.append("<div class='content-box'><b>Notes Diff:</b><br>" + diff["notes_diff"] + "</div>")
+    # Images
+    html.append("<div class='content-box'><b>Images Added:</b><br>")
+    for img in diff["images_added"]:
+        html.append(f"<span class='added'>Image hash: {esc(img[0])}, Pos: {esc(img[1:])}</span><br>")
+    html.append("</div>")
+    html.append("<div class='content-box'><b>Images Removed:</b><br>")
+    for img in diff["images_removed"]:
+        html.append(f"<span class='removed'>Image hash: {esc(img[0])}, Pos: {esc(img[1:])}</span><br>")
+    html.append("</div>")
+    # Tables
+    if diff["table_diffs"]:
+        html.append("<div class='content-box'><b>Table Differences:</b><br>")
+        for i, old, new in diff["table_diffs"]:
+            html.append(f"<span class='removed'>Old Table {i+1}: {esc(old)}</span><br>")
+            html.append(f"<span class='added'>New Table {i+1}: {esc(new)}</span><br>")
         html.append("</div>")
-        # Tables
-        if diff["table_diffs"]:
-            html.append("<div class='diff-block'><b>Table Differences:</b><br>")
-            for i, old, new in diff["table_diffs"]:
-                html.append(f"<span class='removed'>Old Table {i+1}: {old}</span><br>")
-                html.append(f"<span class='added'>New Table {i+1}: {new}</span><br>")
-            html.append("</div>")
-        # Formatting
-        if diff["formatting_diffs"]:
-            html.append("<div class='diff-block'><b>Formatting Differences:</b><br>")
-            for i, old, new in diff["formatting_diffs"]:
-                html.append(f"<span class='removed'>Old Paragraph {i+1}: {old}</span><br>")
-                html.append(f"<span class='added'>New Paragraph {i+1}: {new}</span><br>")
-            html.append("</div>")
+    # Formatting
+    if diff["formatting_diffs"]:
+        html.append("<div class='content-box'><b>Formatting Differences:</b><br>")
+        for i, old, new in diff["formatting_diffs"]:
+            html.append(f"<span class='removed'>Old Paragraph {i+1}: {esc(old)}</span><br>")
+            html.append(f"<span class='added'>New Paragraph {i+1}: {esc(new)}</span><br>")
         html.append("</div>")
-    html.append("</body></html>")
-    return "\n".join(html)
+    return Markup("".join(html))
 
-def summarize_changes(slide_diffs):
-    total_slides = len(slide_diffs)
-    text_changes = sum(1 for d in slide_diffs if d["text_diff"].find("span") != -1)
-    notes_changes = sum(1 for d in slide_diffs if d["notes_diff"].find("span") != -1)
-    images_added = sum(len(d["images_added"]) for d in slide_diffs)
-    images_removed = sum(len(d["images_removed"]) for d in slide_diffs)
-    table_changes = sum(len(d["table_diffs"]) for d in slide_diffs)
-    formatting_changes = sum(len(d["formatting_diffs"]) for d in slide_diffs)
-    summary = f"""
-    <table class='summary-table'>
-    <tr><th>Total Slides</th><td>{total_slides}</td></tr>
-    <tr><th>Slides with Text Changes</th><td>{text_changes}</td></tr>
-    <tr><th>Slides with Notes Changes</th><td>{notes_changes}</td></tr>
-    <tr><th>Total Images Added</th><td>{images_added}</td></tr>
-    <tr><th>Total Images Removed</th><td>{images_removed}</td></tr>
-    <tr><th>Slides with Table Changes</th><td>{table_changes}</td></tr>
-    <tr><th>Slides with Formatting Changes</th><td>{formatting_changes}</td></tr>
-    </table>
+def _tally(counts, diff):
+    counts["total_slides"] += 1
+    counts["text_changes"] += diff["text_diff"].find("span") != -1
+    counts["notes_changes"] += diff["notes_diff"].find("span") != -1
+    counts["images_added"] += len(diff["images_added"])
+    counts["images_removed"] += len(diff["images_removed"])
+    counts["table_changes"] += len(diff["table_diffs"])
+    counts["formatting_changes"] += len(diff["formatting_diffs"])
+
+@traced()
+def generate_html_report(slide_diffs, old_ppt, new_ppt, output_html):
+    """
+    Write the comparison report, one index row and detail section per slide.
+    Args:
+        slide_diffs: Iterable of compare_slides() results; a generator is consumed
+            one slide at a time, so the whole deck's diffs are never held at once.
+        old_ppt (str): Old deck path (shown in the report).
+        new_ppt (str): New deck path (shown in the report).
+        output_html (str): Report path.
+    Returns:
+        dict: The summary counts (see summarize_changes).
     """
-    return summary
+    counts = dict.fromkeys((key for key, _ in SUMMARY_LABELS), 0)
+    with HtmlReport(output_html, "PPT Comparison Report") as report:
+        report.add_summary("Old File", old_ppt)
+        report.add_summary("New File", new_ppt)
+        report.add_table("slides", "Slides", ["Slide", "Status"], details=True)
+        for idx, diff in enumerate(slide_diffs):
+            _tally(counts, diff)
+            changed = _slide_has_changes(diff)
+            report.add_row("slides", [idx + 1, Markup("<span class='fail'>changed</span>") if changed
+                                      else Markup("<span class='ok'>unchanged</span>")],
+                           detail=_slide_detail_html(diff), detail_title=f"Slide {idx+1}",
+                           row_class="fail" if changed else None)
+        for key, label in SUMMARY_LABELS:
+            report.add_summary(label, counts[key])
+    return counts
 
-def main(old_pptx, new_pptx, output_html):
-    prs_old = Presentation(old_pptx)
-    prs_new = Presentation(new_pptx)
-    slides_old = [extract_slide_content(s) for s in prs_old.slides]
-    slides_new = [extract_slide_content(s) for s in prs_new.slides]
+@traced()
+def summarize_changes(slide_diffs):
+    """Return the summary counts for a list of slide diffs, keyed as in SUMMARY_LABELS."""
+    counts = dict.fromkeys((key for key, _ in SUMMARY_LABELS), 0)
+    for diff in slide_diffs:
+        _tally(counts, diff)
+    return counts
+
+def iter_slide_diffs(old_pptx, new_pptx):
+    """Yield compare_slides() results slide by slide (missing slides compare as empty)."""
+    slides_old = extract_presentation_content(old_pptx)
+    slides_new = extract_presentation_content(new_pptx)
     max_slides = max(len(slides_old), len(slides_new))
-    slide_diffs = []
     for i in range(max_slides):
-        old = slides_old[i] if i < len(slides_old) else {"text":[],"notes":"","images":[],"tables":[],"formatting":[]}
-        new = slides_new[i] if i < len(slides_new) else {"text":[],"notes":"","images":[],"tables":[],"formatting":[]}
-        slide_diffs.append(compare_slides(old, new))
-    summary = summarize_changes(slide_diffs)
-    html = generate_html_report(slide_diffs, summary, old_pptx, new_pptx)
-    with open(output_html, "w", encoding="utf-8") as f:
-        f.write(html)
+        old = slides_old[i] if i < len(slides_old) else EMPTY_SLIDE
+        new = slides_new[i] if i < len(slides_new) else EMPTY_SLIDE
+        yield compare_slides(old, new)
+
+def main(old_pptx, new_pptx, output_html):
+    generate_html_report(iter_slide_diffs(old_pptx, new_pptx), old_pptx, new_pptx, output_html)
     print(f"Comparison report generated: {output_html}")
 
 if __name__ == "__main__":
@@ -0,0 +1,36 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "comparison_scripts"))
+import image_verification as iv  # noqa: E402
+
+
+def _offset_change(change, shift, md_pages=119):
+    """MD image counts and PDF page counts with `shift` extra PDF pages inserted before MD prefix `change`."""
+    rng = random.Random(change)
+    md_counts = {prefix: rng.randint(0, 4) for prefix in range(1, md_pages + 1)}
+    pdf_counts = {(prefix if prefix < change else prefix + shift): count for prefix, count in md_counts.items()}
+    inserted = [rng.randint(0, 4) for _ in range(shift)]
+    if shift:
+        # The pages next to the change must not fit both offsets, or several splits tie
+        inserted[0] = (md_counts.get(change, 0) + 1) % 5
+        inserted[-1] = (md_counts.get(change - 1, 0) + 1) % 5
+    for i, count in enumerate(inserted):
+        pdf_counts[change + i] = count
+    md_page_map = {prefix: {"md_prefix": prefix, "md_image_count": count} for prefix, count in md_counts.items()}
+    return md_page_map, pdf_counts
+
+
+@pytest.mark.parametrize("change", [26, 40, 50, 63])
+def test_piecewise_offset_change_inside_window(change):
+    # AUTO_OFFSET_WINDOW is 25: prefix 40 and 63 fall mid-window, 26 and 51 start one
+    md_page_map, pdf_counts = _offset_change(change, 5)
+    assert iv.detect_page_offsets(md_page_map, pdf_counts, piecewise=True) == [(1, 0), (change, 5)]
+
+
+def test_single_offset():
+    md_page_map, pdf_counts = _offset_change(200, 0)
+    assert iv.detect_page_offsets(md_page_map, pdf_counts, piecewise=True) == [(1, 0)]
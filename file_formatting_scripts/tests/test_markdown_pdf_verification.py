@@ -0,0 +1,30 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "comparison_scripts"))
+import markdown_pdf_verification as mpv  # noqa: E402
+
+
+def _corpus():
+    # 10_x.md shares most of its words with page 10 but in reverse order, so no word shingle
+    # matches and page 10 is never an LSH candidate; page 35 repeats a run of it verbatim
+    rng = random.Random(0)
+    vocab = [f"term{i}" for i in range(2000)]
+    md_words = vocab[:60]
+    pages = {page: " ".join(rng.sample(vocab[100:], 60)) for page in range(1, 41)}
+    pages[10] = " ".join(md_words[:52][::-1] + vocab[1000:1008])
+    pages[35] = " ".join(md_words[:48] + vocab[1500:1512])
+    return {"10_x.md": " ".join(md_words)}, pages
+
+
+def test_window_match_kept_when_lsh_scores_lower():
+    md_content, pages = _corpus()
+    exhaustive = mpv.find_best_pdf_matches(md_content, pages, lsh=False, prefix_window=False)["10_x.md"]
+    assert exhaustive[0] == 10 and exhaustive[1] < 0.85
+    for lsh in (False, True):
+        page, similarity, _ = mpv.find_best_pdf_matches(md_content, pages, lsh=lsh, prefix_window=True)["10_x.md"]
+        assert page == 10
+        assert similarity == pytest.approx(exhaustive[1])
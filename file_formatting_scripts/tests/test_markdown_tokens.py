@@ -0,0 +1,30 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.markdown_tokens import Image, Link, tokenize_markdown  # noqa: E402
+
+
+def test_linked_markdown_image_is_image_and_link():
+    tokens = tokenize_markdown("See [![Logo](images/logo.png)](https://example.com) here.")
+    assert tokens.images == (Image(1, "markdown", "images/logo.png"),)
+    assert tokens.links == (Link(1, "standard", "![Logo](images/logo.png)", "https://example.com"),)
+
+
+def test_linked_html_image_is_image_and_link():
+    tokens = tokenize_markdown('[<img src="c.png">](https://x.org)')
+    assert tokens.images == (Image(1, "html", "c.png"),)
+    assert [link.url for link in tokens.links] == ["https://x.org"]
+
+
+def test_image_inside_html_link():
+    tokens = tokenize_markdown('<a href="https://x.org"><img src="d.png" id="logo"></a>')
+    assert tokens.images == (Image(1, "html", "d.png"),)
+    assert [link.url for link in tokens.links] == ["https://x.org"]
+    assert tokens.anchors == ("logo",)
+
+
+def test_plain_links_and_images_are_unchanged():
+    tokens = tokenize_markdown("![a](b.png) [x](y) [wow! ok](z)")
+    assert tokens.images == (Image(1, "markdown", "b.png"),)
+    assert [(link.text, link.url) for link in tokens.links] == [("x", "y"), ("wow! ok", "z")]
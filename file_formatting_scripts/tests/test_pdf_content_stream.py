@@ -0,0 +1,28 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.pdf_content_stream import count_image_operators  # noqa: E402
+
+
+def test_nested_parentheses_in_literal_string():
+    # Balanced nested parentheses are legal unescaped; the scan must stay linear on them
+    stream = b"BT /F1 12 Tf (" + b"Quarterly revenue by region, see note " * 20 + b"(a) more) Tj ET /Im0 Do"
+    assert count_image_operators([stream]) == (["Im0"], 0)
+
+
+def test_operators_inside_nested_string_are_skipped():
+    assert count_image_operators([b"(text (BI /X Do) BI) /Im1 Do"]) == (["Im1"], 0)
+
+
+def test_unterminated_string_runs_to_end_of_stream():
+    stream = b"/Im0 Do (unterminated " + b"a (b " * 2000
+    assert count_image_operators([stream]) == (["Im0"], 0)
+
+
+def test_name_bi_is_not_an_inline_image():
+    assert count_image_operators([b"/BI BMC EMC /Z Do"]) == (["Z"], 0)
+
+
+def test_inline_image_is_counted():
+    assert count_image_operators([b"q BI /W 1 /H 1 ID x EI Q /Im1 Do"]) == (["Im1"], 1)
@@ -0,0 +1,61 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.report_writer import HtmlReport  # noqa: E402
+
+
+def test_exception_writes_no_index(tmp_path):
+    path = str(tmp_path / "report.html")
+    with pytest.raises(RuntimeError):
+        with HtmlReport(path, "Report") as report:
+            report.add_table("rows", "Rows", ["Name"], details=True)
+            report.add_row("rows", ["a"], detail="<p>diff</p>")
+            raise RuntimeError("checker failed")
+    assert os.listdir(tmp_path) == []
+
+
+def test_failed_run_keeps_previous_report(tmp_path):
+    path = str(tmp_path / "report.html")
+    with HtmlReport(path, "Report", items_per_shard=1) as report:
+        report.add_table("rows", "Rows", ["Name"], details=True)
+        for name in "abc":
+            report.add_row("rows", [name], detail="<p>first run</p>")
+    with open(path, encoding="utf-8") as f:
+        index = f.read()
+    with pytest.raises(RuntimeError):
+        with HtmlReport(path, "Report", items_per_shard=1) as report:
+            report.add_table("rows", "Rows", ["Name"], details=True)
+            report.add_row("rows", ["a"], detail="<p>second run</p>")
+            raise RuntimeError("checker failed")
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == index
+    assert sorted(os.listdir(tmp_path)) == ["report.html", "report_files"]
+    assert sorted(os.listdir(tmp_path / "report_files")) == [
+        "part-0001.html", "part-0002.html", "part-0003.html", "report.css"]
+    with open(tmp_path / "report_files" / "part-0001.html", encoding="utf-8") as f:
+        assert "first run" in f.read()
+
+
+def test_smaller_run_replaces_previous_shards(tmp_path):
+    path = str(tmp_path / "report.html")
+    for count in (3, 1):
+        with HtmlReport(path, "Report", items_per_shard=1) as report:
+            report.add_table("rows", "Rows", ["Name"], details=True)
+            for number in range(count):
+                report.add_row("rows", [str(number)], detail="<p>diff</p>")
+    assert sorted(os.listdir(tmp_path)) == ["report.html", "report_files"]
+    assert sorted(os.listdir(tmp_path / "report_files")) == ["part-0001.html", "report.css"]
+
+
+def test_empty_table_without_message_is_left_out(tmp_path):
+    path = str(tmp_path / "report.html")
+    with HtmlReport(path, "Report") as report:
+        report.add_table("silent", "Silent Table", ["Name"])
+        report.add_table("clean", "Clean Table", ["Name"], empty_message="Nothing to report.")
+    with open(path, encoding="utf-8") as f:
+        html = f.read()
+    assert "Silent Table" not in html
+    assert "Clean Table" in html and "Nothing to report." in html
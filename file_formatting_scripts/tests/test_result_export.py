@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.result_export import ResultExporter  # noqa: E402
+
+
+def test_exception_discards_partial_export(tmp_path):
+    stem = str(tmp_path / "report")
+    with pytest.raises(RuntimeError):
+        with ResultExporter(stem, {"page": "Int64"}, formats=["jsonl"]) as exporter:
+            exporter.write({"page": 1})
+            raise RuntimeError("checker failed")
+    assert os.listdir(tmp_path) == []
+
+
+def test_clean_exit_publishes_export(tmp_path):
+    stem = str(tmp_path / "report")
+    with ResultExporter(stem, {"page": "Int64"}, formats=["jsonl"]) as exporter:
+        exporter.write({"page": 1})
+    assert os.listdir(tmp_path) == ["report.jsonl"]